@@ -0,0 +1,321 @@
+"""
+ELC Parking App - API Load Benchmark
+Author: Jie Liang
+Course: CS2450
+
+Drives the server's API with concurrent clients and reports throughput
+and p50/p95/p99 latency for each endpoint:
+- lots: GET /api/lots (every lot's summary and prediction)
+- lot: GET /api/lot/<id> for random lots
+- toggle: POST /api/lot/<id>/toggle/<i> for random spaces
+- bulk: POST /api/events with --batch random sensor events
+
+By default it starts parking_server.app in a child process (threaded,
+HTTP/1.1, change log and history in a temp directory) on a campus of
+--lots generated lots (see occupancy_simulator.synthetic_lots), so the
+clients and the server do not share an interpreter. --url points it at a
+server that is already running instead, e.g. under gunicorn.
+
+Results can be saved as JSON and compared with a run from another commit;
+--compare exits with status 1 when throughput or p95 got worse by more
+than --threshold. Run from the repository root:
+    python benchmarks/bench_api_load.py --lots 4 1000 --concurrency 1 8 \\
+        --duration 5 --output before.json
+    python benchmarks/bench_api_load.py --lots 4 1000 --concurrency 1 8 \\
+        --duration 5 --output after.json --compare before.json
+"""
+
+from datetime import datetime
+import argparse
+import json
+import math
+import os
+import platform
+import random
+import socket
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+
+SRC = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "src")
+sys.path.insert(0, SRC)
+
+import requests
+
+from campus_lots import load_lots
+from occupancy_simulator import synthetic_lots
+
+
+SCENARIOS = ("lots", "lot", "toggle", "bulk")
+STARTUP_TIMEOUT = 30  # seconds to wait for a child server to answer
+
+
+def percentile(ordered, pct):
+    """Nearest-rank percentile of an ascending list"""
+    if not ordered:
+        return None
+    rank = max(math.ceil(pct / 100 * len(ordered)) - 1, 0)
+    return ordered[min(rank, len(ordered) - 1)]
+
+
+def free_port():
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+# ============================================================================
+# SERVER UNDER TEST
+# ============================================================================
+
+def serve(port):
+    """Child process: serve parking_server.app the way its __main__ does"""
+    from werkzeug.serving import WSGIRequestHandler, make_server
+    import parking_server
+
+    parking_server.open_history()
+    WSGIRequestHandler.protocol_version = "HTTP/1.1"
+    server = make_server("127.0.0.1", port, parking_server.app, threaded=True)
+    try:
+        server.serve_forever()
+    finally:
+        parking_server.close_data()
+
+
+def start_server(lots, workdir):
+    """Start a child server on a campus of lots, return (process, base url)"""
+    lots_file = os.path.join(workdir, "lots.json")
+    with open(lots_file, "w", encoding="utf-8") as f:
+        json.dump({"lots": lots}, f)
+    port = free_port()
+    # parking_server reads its settings at import time, so they go in the environment
+    env = dict(os.environ, ELC_LOTS_FILE=lots_file, ELC_STATE_BACKEND="memory",
+               ELC_HISTORY_DB="parking_history.db")
+    process = subprocess.Popen(
+        [sys.executable, os.path.abspath(__file__), "--serve", str(port)],
+        cwd=workdir, env=env, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    url = f"http://127.0.0.1:{port}"
+    deadline = time.monotonic() + STARTUP_TIMEOUT
+    while time.monotonic() < deadline:
+        if process.poll() is not None:
+            raise RuntimeError(f"Benchmark server exited with status {process.returncode}")
+        try:
+            requests.get(url + "/api/config", timeout=1)
+            return process, url
+        except requests.ConnectionError:
+            time.sleep(0.1)
+    process.kill()
+    raise RuntimeError("Benchmark server did not start in time")
+
+
+def stop_server(process):
+    process.terminate()
+    try:
+        process.wait(timeout=10)
+    except subprocess.TimeoutExpired:
+        process.kill()
+
+
+# ============================================================================
+# LOAD
+# ============================================================================
+
+def make_request(scenario, lots, rng, batch):
+    """(method, path, json body) for one request of a scenario"""
+    lot = rng.choice(lots)
+    if scenario == "lots":
+        return "GET", "/api/lots", None
+    if scenario == "lot":
+        return "GET", f"/api/lot/{lot['lot_id']}", None
+    if scenario == "toggle":
+        return "POST", f"/api/lot/{lot['lot_id']}/toggle/{rng.randrange(lot['total_spaces'])}", None
+    events = []
+    for _ in range(batch):
+        lot = rng.choice(lots)
+        events.append({"lot_id": lot["lot_id"], "space_index": rng.randrange(lot["total_spaces"]),
+                       "occupied": rng.random() < 0.5})
+    return "POST", "/api/events", {"events": events}
+
+
+def client_loop(url, scenario, lots, batch, seed, stop, latencies, errors):
+    """One client: send requests back to back until stop is set"""
+    rng = random.Random(seed)
+    session = requests.Session()
+    while not stop.is_set():
+        method, path, body = make_request(scenario, lots, rng, batch)
+        started = time.perf_counter()
+        try:
+            response = session.request(method, url + path, json=body, timeout=30)
+            ok = response.status_code == 200
+        except requests.RequestException:
+            ok = False
+        elapsed = time.perf_counter() - started
+        if ok:
+            latencies.append(elapsed)
+        else:
+            errors.append(elapsed)
+    session.close()
+
+
+def run_scenario(url, scenario, lots, concurrency, duration, warmup, batch, seed):
+    """Run concurrency clients for warmup + duration seconds; stats for the timed part"""
+    # Open connections and fill the server's caches before timing
+    if warmup:
+        run_clients(url, scenario, lots, concurrency, warmup, batch, seed)
+    latencies, errors, seconds = run_clients(url, scenario, lots, concurrency, duration,
+                                             batch, seed + 1)
+    latencies.sort()
+    result = {
+        "scenario": scenario,
+        "lots": len(lots),
+        "concurrency": concurrency,
+        "batch": batch if scenario == "bulk" else None,
+        "requests": len(latencies),
+        "errors": len(errors),
+        "seconds": round(seconds, 3),
+        "throughput": round(len(latencies) / seconds, 1)
+    }
+    for pct in (50, 95, 99):
+        value = percentile(latencies, pct)
+        result[f"p{pct}_ms"] = None if value is None else round(value * 1000, 3)
+    result["max_ms"] = round(latencies[-1] * 1000, 3) if latencies else None
+    if scenario == "bulk":
+        result["events_per_second"] = round(result["throughput"] * batch, 1)
+    return result
+
+
+def run_clients(url, scenario, lots, concurrency, duration, batch, seed):
+    latencies, errors = [], []  # list.append is atomic, no lock needed
+    stop = threading.Event()
+    threads = [threading.Thread(target=client_loop,
+                                args=(url, scenario, lots, batch, seed * 1000 + n, stop,
+                                      latencies, errors), daemon=True)
+               for n in range(concurrency)]
+    started = time.perf_counter()
+    for thread in threads:
+        thread.start()
+    time.sleep(duration)
+    stop.set()
+    for thread in threads:
+        thread.join()
+    return latencies, errors, time.perf_counter() - started
+
+
+# ============================================================================
+# RESULTS
+# ============================================================================
+
+def git_commit():
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], cwd=SRC,
+                              capture_output=True, text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def result_key(result):
+    return (result["scenario"], result["lots"], result["concurrency"], result["batch"])
+
+
+def print_results(results):
+    print(f"{'scenario':>8} {'lots':>6} {'conc':>5} {'req/s':>9} {'p50 ms':>8} "
+          f"{'p95 ms':>8} {'p99 ms':>8} {'errors':>7}")
+    for r in results:
+        print(f"{r['scenario']:>8} {r['lots']:>6} {r['concurrency']:>5} {r['throughput']:>9.1f} "
+              f"{r['p50_ms'] or 0:>8.2f} {r['p95_ms'] or 0:>8.2f} {r['p99_ms'] or 0:>8.2f} "
+              f"{r['errors']:>7}")
+
+
+def compare(results, baseline, threshold):
+    """Print changes against a baseline run; return the results that regressed"""
+    before = {result_key(r): r for r in baseline["results"]}
+    regressions = []
+    print(f"\nAgainst {baseline.get('commit') or 'baseline'} (regression = worse by more "
+          f"than {threshold:.0%}):")
+    for r in results:
+        old = before.get(result_key(r))
+        if old is None or not old["throughput"] or not old["p95_ms"] or not r["p95_ms"]:
+            continue
+        speed = r["throughput"] / old["throughput"] - 1
+        p95 = r["p95_ms"] / old["p95_ms"] - 1
+        worse = speed < -threshold or p95 > threshold
+        if worse:
+            regressions.append(r)
+        print(f"{r['scenario']:>8} {r['lots']:>6} {r['concurrency']:>5}  "
+              f"req/s {speed:+7.1%}  p95 {p95:+7.1%}{'  REGRESSION' if worse else ''}")
+    return regressions
+
+
+def main():
+    if len(sys.argv) == 3 and sys.argv[1] == "--serve":
+        serve(int(sys.argv[2]))
+        return
+
+    parser = argparse.ArgumentParser(description="Load test the parking server API")
+    parser.add_argument("--url", help="benchmark this running server instead of starting one")
+    parser.add_argument("--lots", type=int, nargs="+", default=[4, 1000],
+                        help="campus sizes to start servers with (ignored with --url)")
+    parser.add_argument("--scenarios", nargs="+", choices=SCENARIOS, default=list(SCENARIOS))
+    parser.add_argument("--concurrency", type=int, nargs="+", default=[1, 8])
+    parser.add_argument("--duration", type=float, default=5, help="timed seconds per run")
+    parser.add_argument("--warmup", type=float, default=1, help="untimed seconds before each run")
+    parser.add_argument("--batch", type=int, default=100, help="events per bulk request")
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--output", help="save results to this JSON file")
+    parser.add_argument("--compare", help="JSON results of an earlier run to compare with")
+    parser.add_argument("--threshold", type=float, default=0.2,
+                        help="fractional change counted as a regression")
+    args = parser.parse_args()
+
+    results = []
+    if args.url:
+        campuses = [(None, requests.get(args.url.rstrip("/") + "/api/config",
+                                        timeout=10).json()["lots"])]
+    else:
+        campuses = [(count, None) for count in args.lots]
+    for count, lots in campuses:
+        with tempfile.TemporaryDirectory() as workdir:
+            if lots is None:
+                # Four lots is the real campus from lots.json
+                lots = load_lots() if count == 4 else synthetic_lots(count, args.seed)
+                process, url = start_server(lots, workdir)
+            else:
+                process, url = None, args.url.rstrip("/")
+            try:
+                for scenario in args.scenarios:
+                    for concurrency in args.concurrency:
+                        result = run_scenario(url, scenario, lots, concurrency, args.duration,
+                                              args.warmup, args.batch, args.seed)
+                        print_results([result])
+                        results.append(result)
+            finally:
+                if process is not None:
+                    stop_server(process)
+
+    print()
+    print_results(results)
+    report = {
+        "commit": git_commit(),
+        "timestamp": datetime.now().isoformat(timespec="seconds"),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "server": args.url or "child process",
+        "settings": {"duration": args.duration, "warmup": args.warmup, "batch": args.batch,
+                     "seed": args.seed},
+        "results": results
+    }
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump(report, f, indent=2)
+        print(f"\nSaved results to {args.output}")
+    if args.compare:
+        with open(args.compare, encoding="utf-8") as f:
+            baseline = json.load(f)
+        if compare(results, baseline, args.threshold):
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,126 @@
+"""
+ELC Parking App - Lot Card Redraw Benchmark
+Author: Jie Liang
+Course: CS2450
+
+Times redrawing the client's lot list at several campus sizes:
+- rebuild: destroy every card and build one per lot again (how
+  display_lots used to redraw on every refresh)
+- refresh: VirtualLotGrid after a poll in which some lots changed
+- scroll: VirtualLotGrid jumping to a random place in the list
+and counts the widgets each approach keeps alive.
+
+Needs a display (or Xvfb). Run from the repository root:
+    python benchmarks/bench_lot_cards.py --lots 50 250 1000 --rounds 20
+"""
+
+import argparse
+import os
+import random
+import sys
+import time
+import tkinter as tk
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "src"))
+
+from parking_app_UPDATED import LotCard, ParkingLot, VirtualLotGrid
+
+
+PERMIT_TYPES = ("Student", "Staff", "Both", "Open")
+
+
+def make_lots(count, rng):
+    lots = []
+    for i in range(count):
+        total = rng.randint(20, 120)
+        lot = ParkingLot(str(i), f"Lot {i}", total, rng.choice(PERMIT_TYPES), rng.randint(1, 8))
+        lot.update_occupancy(rng.randint(0, total))
+        lots.append(lot)
+    return lots
+
+
+def count_widgets(widget):
+    return sum(1 + count_widgets(child) for child in widget.winfo_children())
+
+
+def change_some(lots, changed, rng):
+    for lot in rng.sample(lots, changed):
+        lot.update_occupancy(rng.randint(0, lot.total_spaces))
+
+
+def bench_rebuild(root, lots, rounds):
+    container = tk.Frame(root)
+    container.pack(fill=tk.BOTH, expand=True)
+    cards = []
+    start = time.perf_counter()
+    for _ in range(rounds):
+        for card in cards:
+            card.destroy()
+        cards = []
+        for idx, lot in enumerate(lots):
+            card = LotCard(container)
+            card.update(lot, idx + 1)
+            card.frame.grid(row=idx // 2, column=idx % 2, padx=10, pady=10, sticky="nsew")
+            cards.append(card)
+        root.update_idletasks()
+    elapsed = (time.perf_counter() - start) / rounds
+    widgets = count_widgets(container)
+    container.destroy()
+    return elapsed, widgets
+
+
+def bench_virtual(root, lots, rounds, changed, rng):
+    container = tk.Frame(root)
+    container.pack(fill=tk.BOTH, expand=True)
+    grid = VirtualLotGrid(container)
+    root.update()
+    grid.set_lots(lots)
+    root.update_idletasks()
+
+    refresh = scroll = 0.0
+    for _ in range(rounds):
+        change_some(lots, changed, rng)
+        start = time.perf_counter()
+        grid.set_lots(lots)
+        root.update_idletasks()
+        refresh += time.perf_counter() - start
+
+        start = time.perf_counter()
+        grid.yview("moveto", rng.random())
+        root.update_idletasks()
+        scroll += time.perf_counter() - start
+    widgets = count_widgets(container)
+    container.destroy()
+    return refresh / rounds, scroll / rounds, widgets
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark lot list redraws")
+    parser.add_argument("--lots", type=int, nargs="+", default=[50, 250, 1000])
+    parser.add_argument("--rounds", type=int, default=20)
+    parser.add_argument("--changed", type=float, default=0.1,
+                        help="share of lots whose occupancy changes per refresh")
+    parser.add_argument("--seed", type=int, default=1)
+    args = parser.parse_args()
+
+    try:
+        root = tk.Tk()
+    except tk.TclError as e:
+        sys.exit(f"A display is needed to benchmark Tk widgets ({e})")
+    root.geometry("900x500")  # about the lot area of the 900x700 app window
+
+    rng = random.Random(args.seed)
+    print(f"{'lots':>6} {'rebuild ms':>11} {'widgets':>8} {'refresh ms':>11} "
+          f"{'scroll ms':>10} {'widgets':>8}")
+    for count in args.lots:
+        lots = make_lots(count, rng)
+        changed = max(1, int(count * args.changed))
+        rebuild, rebuild_widgets = bench_rebuild(root, lots, args.rounds)
+        refresh, scroll, virtual_widgets = bench_virtual(root, lots, args.rounds, changed, rng)
+        print(f"{count:>6} {rebuild * 1000:>11.2f} {rebuild_widgets:>8} {refresh * 1000:>11.2f} "
+              f"{scroll * 1000:>10.2f} {virtual_widgets:>8}")
+    root.destroy()
+
+
+if __name__ == "__main__":
+    main()
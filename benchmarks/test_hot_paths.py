@@ -0,0 +1,118 @@
+"""
+ELC Parking App - Hot Path Microbenchmarks
+Author: Jie Liang
+Course: CS2450
+
+pytest-benchmark timings of the model code that runs on every refresh
+and redraw, on the real four lots and generated campuses of 100, 1,000
+and 10,000 lots (see occupancy_simulator.synthetic_lots):
+- the status and header color of every lot (each redraw)
+- can_user_park for every lot (the permitted-lots filter)
+- ParkingSystem.get_lot_by_id for 100 lots spread over the list
+- applying a full /api/lots response to the model (each poll)
+- ParkingSystem.get_recommended_lots, offline and with a server ranking
+- the server's get_occupied_count for every lot
+
+Not part of the unit tests; run from the repository root. Save a
+baseline, then fail a later run whose mean is more than 25% slower:
+    python -m pytest benchmarks/test_hot_paths.py --benchmark-save=baseline
+    python -m pytest benchmarks/test_hot_paths.py \\
+        --benchmark-compare=0001 --benchmark-compare-fail=mean:25%
+Baselines go to .benchmarks/ (or --benchmark-storage) and are only
+comparable on the same machine and Python.
+"""
+
+import copy
+import os
+import sys
+
+import pytest
+
+pytest.importorskip("pytest_benchmark")
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "src"))
+
+import parking_server
+from campus_lots import load_lots
+from occupancy_simulator import synthetic_lots
+from parking_app_UPDATED import ParkingSystem, UserType
+
+
+LOT_COUNTS = (4, 100, 1000, 10000)
+LOOKUPS = 100  # get_lot_by_id calls per round
+
+
+@pytest.fixture(scope="module", params=LOT_COUNTS, ids=lambda count: f"{count}lots")
+def lot_configs(request):
+    # Four lots is the real campus from lots.json
+    return load_lots() if request.param == 4 else synthetic_lots(request.param, seed=1)
+
+
+@pytest.fixture
+def system(lot_configs):
+    """The ParkingSystem singleton serving lot_configs, with some lots filled"""
+    system = ParkingSystem()
+    saved = (system.get_all_lots(), system._config_version, system._rankings,
+             system._server_connected)
+    system.apply_config({"version": "bench", "lots": lot_configs})
+    for number, lot in enumerate(system.get_all_lots()):
+        lot.update_occupancy(lot.total_spaces * (number % 10) // 9)
+    yield system
+    lots, system._config_version, system._rankings, system._server_connected = saved
+    system._set_lots(lots)
+
+
+@pytest.fixture
+def server_store(lot_configs):
+    """parking_server serving lot_configs"""
+    parking_server.install_lots(parking_server.seed_lots(lot_configs))
+    yield parking_server.STORE
+    parking_server.install_lots(copy.deepcopy(parking_server.PARKING_LOTS))
+
+
+def test_status_colors(benchmark, system):
+    lots = system.get_all_lots()
+    colors = benchmark(lambda: [(lot.get_status(), lot.get_status_color()) for lot in lots])
+    assert len(colors) == len(lots)
+
+
+def test_can_user_park(benchmark, system):
+    lots = system.get_all_lots()
+    allowed = benchmark(lambda: [lot for lot in lots if lot.can_user_park(UserType.STUDENT)])
+    assert allowed
+
+
+def test_get_lot_by_id(benchmark, system):
+    lots = system.get_all_lots()
+    step = max(len(lots) // LOOKUPS, 1)
+    lot_ids = [lot.lot_id for lot in lots[::step]][:LOOKUPS]
+    found = benchmark(lambda: [system.get_lot_by_id(lot_id) for lot_id in lot_ids])
+    assert None not in found
+
+
+def test_apply_lot_updates(benchmark, system):
+    response = [{"lot_id": lot.lot_id, "occupied_spaces": lot.total_spaces // 2,
+                 "predicted_available_at_arrival": lot.total_spaces // 3}
+                for lot in system.get_all_lots()]
+    benchmark(system._apply_lot_updates, response)
+    assert system.get_all_lots()[-1].predicted_available is not None
+
+
+def test_recommended_lots_offline(benchmark, system):
+    recommended = benchmark(system.get_recommended_lots, UserType.STUDENT)
+    assert recommended
+
+
+def test_recommended_lots_ranked(benchmark, system):
+    # The server's ranking, best first, as refresh_recommendations stores it
+    ranking = [lot.lot_id for lot in reversed(system.get_all_lots())]
+    system._rankings = {user_type.value: ranking for user_type in UserType}
+    system._server_connected = True
+    recommended = benchmark(system.get_recommended_lots, UserType.STUDENT)
+    assert recommended
+
+
+def test_server_occupied_counts(benchmark, server_store):
+    lot_ids = server_store.lot_ids()
+    counts = benchmark(lambda: [parking_server.get_occupied_count(lot_id) for lot_id in lot_ids])
+    assert len(counts) == len(lot_ids)
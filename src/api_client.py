@@ -0,0 +1,75 @@
+"""
+ELC Parking App - API Client
+Author: Jie Liang
+Course: CS2450
+
+HTTP transport the desktop app uses to talk to parking_server.py.
+
+1. One requests.Session, so polls reuse pooled keep-alive connections
+   instead of paying a TCP handshake each time
+2. Every request has a (connect, read) timeout, and idempotent GETs are
+   retried with exponential backoff on connection errors and 502/503/504
+3. submit() runs any call on a small thread pool and returns a Future, so
+   the Tk main thread never waits on the network
+"""
+
+from concurrent.futures import ThreadPoolExecutor
+
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
+
+CONNECT_TIMEOUT = 2   # seconds to open a connection
+READ_TIMEOUT = 5      # seconds to wait for a response
+RETRIES = 2           # extra attempts for a failed GET
+BACKOFF = 0.2         # seconds before the first retry, doubling after that
+POOL_SIZE = 4         # keep-alive connections kept open to the server
+WORKERS = 2           # background threads for submit()
+
+
+class ApiClient:
+    """Pooled, retrying HTTP client for the parking server API"""
+
+    def __init__(self, base_url, connect_timeout=CONNECT_TIMEOUT, read_timeout=READ_TIMEOUT,
+                 retries=RETRIES, backoff=BACKOFF, pool_size=POOL_SIZE, workers=WORKERS):
+        self._base_url = base_url.rstrip("/")
+        self._timeout = (connect_timeout, read_timeout)
+        retry = Retry(total=retries, connect=retries, read=retries, status=retries,
+                      backoff_factor=backoff, status_forcelist=(502, 503, 504),
+                      allowed_methods=frozenset({"GET"}), raise_on_status=False)
+        adapter = HTTPAdapter(pool_connections=1, pool_maxsize=pool_size, max_retries=retry)
+        self.session = requests.Session()
+        self.session.mount("http://", adapter)
+        self.session.mount("https://", adapter)
+        self._pool = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="api")
+
+    @property
+    def base_url(self):
+        return self._base_url
+
+    def get(self, path, etag=None, **kwargs):
+        """GET base_url + path, sending If-None-Match when an ETag is given
+
+        Raises requests.RequestException once retries are exhausted.
+        """
+        headers = {"If-None-Match": etag} if etag else {}
+        kwargs.setdefault("timeout", self._timeout)
+        return self.session.get(self._base_url + path, headers=headers, **kwargs)
+
+    def post(self, path, payload):
+        """POST payload as JSON to base_url + path (never retried: it may have applied)"""
+        return self.session.post(self._base_url + path, json=payload, timeout=self._timeout)
+
+    def stream(self, path, read_timeout):
+        """Open a streaming GET (e.g. /stream), use it as a context manager"""
+        return self.get(path, stream=True, timeout=(self._timeout[0], read_timeout))
+
+    def submit(self, fn, *args, **kwargs):
+        """Run fn(*args, **kwargs) on the background pool, return a Future"""
+        return self._pool.submit(fn, *args, **kwargs)
+
+    def close(self):
+        """Stop the background pool and close pooled connections"""
+        self._pool.shutdown(wait=False, cancel_futures=True)
+        self.session.close()
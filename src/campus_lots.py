@@ -0,0 +1,87 @@
+"""
+ELC Parking App - Lot Configuration
+Author: Jie Liang
+Course: CS2450
+
+The one list of parking lots, shared by the server and the desktop app.
+
+Lots live in lots.json (or the file named by ELC_LOTS_FILE):
+    {"lots": [{"lot_id": "17", "name": "Lot 17", "total_spaces": 35,
+               "permit_type": "Student", "drive_time": 2, "walk_time": 4}]}
+Optional per-lot fields:
+- "permit_rules": time-windowed permit rules (see permits.py)
+- "simulated_occupancy": [low, high] occupied spaces the desktop app
+  draws from when it cannot reach the server
+
+The server seeds its lots from this file and serves their config at
+/api/config with config_version() as the ETag. The desktop app ships the
+same file as its fallback, caches the last config it downloaded, and only
+downloads it again when the version changes.
+"""
+
+import hashlib
+import json
+import os
+
+from permits import PERMIT_TYPE_RULES, compile_rules
+
+
+LOTS_FILE = os.environ.get(
+    "ELC_LOTS_FILE", os.path.join(os.path.dirname(os.path.abspath(__file__)), "lots.json"))
+
+# Required fields and the JSON types they must have
+REQUIRED_FIELDS = {
+    "lot_id": str,
+    "name": str,
+    "total_spaces": int,
+    "permit_type": str,
+    "drive_time": (int, float),
+    "walk_time": (int, float)
+}
+
+
+def load_lots(path=LOTS_FILE):
+    """Lot configs from a lots.json file, validated"""
+    with open(path, encoding="utf-8") as f:
+        return validate_lots(json.load(f))
+
+
+def validate_lots(data):
+    """The "lots" list of a config document; raises ValueError if it is invalid"""
+    lots = data.get("lots") if isinstance(data, dict) else None
+    if not isinstance(lots, list) or not lots:
+        raise ValueError('Lot config needs a non-empty "lots" list')
+    seen = set()
+    for lot in lots:
+        if not isinstance(lot, dict):
+            raise ValueError(f"Lot config entries must be objects, got {lot!r}")
+        name = lot.get("lot_id")
+        for field, kind in REQUIRED_FIELDS.items():
+            value = lot.get(field)
+            if not isinstance(value, kind) or isinstance(value, bool):
+                raise ValueError(f"Lot {name!r}: {field} is missing or has the wrong type")
+        if name in seen:
+            raise ValueError(f"Lot {name!r} is listed twice")
+        seen.add(name)
+        if lot["total_spaces"] <= 0:
+            raise ValueError(f"Lot {name!r}: total_spaces must be positive")
+        if lot["permit_type"] not in PERMIT_TYPE_RULES and "permit_rules" not in lot:
+            raise ValueError(f"Lot {name!r}: unknown permit_type {lot['permit_type']!r}")
+        try:
+            compile_rules(lot["permit_type"], lot.get("permit_rules"))
+        except (KeyError, TypeError, ValueError, AttributeError) as e:
+            raise ValueError(f"Lot {name!r}: invalid permit_rules ({e})")
+        simulated = lot.get("simulated_occupancy")
+        if simulated is not None and not (
+                isinstance(simulated, list) and len(simulated) == 2 and
+                all(isinstance(n, int) for n in simulated) and
+                0 <= simulated[0] <= simulated[1] <= lot["total_spaces"]):
+            raise ValueError(f"Lot {name!r}: simulated_occupancy must be [low, high] "
+                             f"within 0..total_spaces")
+    return lots
+
+
+def config_version(lots):
+    """Short hash of lot configs; changes whenever any lot's config does"""
+    text = json.dumps(lots, sort_keys=True, separators=(",", ":"))
+    return hashlib.sha256(text.encode("utf-8")).hexdigest()[:16]
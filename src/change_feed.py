@@ -0,0 +1,72 @@
+"""
+ELC Parking App - Change Feed
+Author: Jie Liang
+Course: CS2450
+
+In-memory fan-out hub for occupancy changes pushed by /api/stream.
+
+Every committed change is published once into a bounded ring buffer keyed
+by state version. Subscribers do not get their own queue: each one keeps a
+cursor (the last version it has seen) and reads whatever is newer, so the
+buffer never grows with the number of subscribers and a slow subscriber
+can never make the server buffer more. A subscriber that falls further
+behind than the buffer holds is told to resync from a snapshot.
+
+Publishing is an append plus notify_all, which wakes every thread blocked
+in wait(). Under the stream hub (stream_hub.py) that is a single watcher
+thread, and the hub fans the change out to its clients on an event loop.
+Where /api/stream is served by request threads instead (gunicorn, tests),
+each open stream is one waiting thread, and each publish wakes all of them.
+"""
+
+from collections import deque
+from itertools import islice
+import threading
+
+
+class ChangeFeed:
+    """Bounded, versioned ring buffer of change events"""
+
+    def __init__(self, capacity=10000):
+        self._events = deque(maxlen=capacity)  # (version, event) pairs
+        self._cond = threading.Condition()
+        self._version = 0
+
+    @property
+    def version(self):
+        return self._version
+
+    def reset(self, version):
+        """Forget buffered events and continue numbering from version"""
+        with self._cond:
+            self._events.clear()
+            self._version = version
+            self._cond.notify_all()
+
+    def publish(self, version, event):
+        """Add the event for a newly committed version and wake subscribers"""
+        with self._cond:
+            self._events.append((version, event))
+            self._version = version
+            self._cond.notify_all()
+
+    def wait(self, since, timeout=None):
+        """Block until something newer than since exists, return latest version"""
+        with self._cond:
+            self._cond.wait_for(lambda: self._version > since, timeout)
+            return self._version
+
+    def read_since(self, since):
+        """Return (events, complete) for every version after since
+
+        complete is False when some of those versions were already evicted;
+        the caller should then fall back to a full snapshot.
+        """
+        with self._cond:
+            if since >= self._version:
+                return [], True
+            if not self._events or self._events[0][0] > since + 1:
+                return [], False
+            # Versions are consecutive, so the start position is arithmetic
+            start = since + 1 - self._events[0][0]
+            return list(islice(self._events, start, None)), True
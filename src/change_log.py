@@ -0,0 +1,150 @@
+"""
+ELC Parking App - Append-only Change Log
+Author: Jie Liang
+Course: CS2450
+
+Crash-safe persistence for parking_server.py:
+1. Every change is appended to a log file as one compact JSON line
+2. Log writes are fsynced in groups instead of one at a time
+3. Snapshots are written atomically (temp file + rename) and the log is
+   truncated afterwards, so startup only replays snapshot + log tail
+
+Log records must be idempotent (absolute states, never toggles) so that
+replaying a record that already made it into the snapshot is harmless.
+"""
+
+import json
+import os
+import threading
+import time
+
+
+class ChangeLog:
+    """Write-ahead log plus snapshot file for the parking state"""
+
+    def __init__(self, snapshot_path, group_size=64, group_interval=0.05,
+                 snapshot_every=5000):
+        self.snapshot_path = snapshot_path
+        self.log_path = os.path.splitext(snapshot_path)[0] + ".log"
+        self.group_size = group_size          # fsync after this many records...
+        self.group_interval = group_interval  # ...or after this many seconds
+        self.snapshot_every = snapshot_every  # records between snapshots
+        self._lock = threading.Lock()
+        self._file = None
+        self._pending = 0
+        self._records_since_snapshot = 0
+        self._last_sync = time.monotonic()
+        self._closed = threading.Event()
+        self._flusher = None
+
+    def load(self):
+        """Return (snapshot, records) found on disk
+
+        snapshot is None if no snapshot exists. A torn record at the end of
+        the log (crash mid-append) is dropped and cut off the file, so the
+        next append starts on a fresh line; everything before it is kept.
+        """
+        snapshot = None
+        if os.path.exists(self.snapshot_path):
+            with open(self.snapshot_path, 'r') as f:
+                snapshot = json.load(f)
+
+        records = []
+        if os.path.exists(self.log_path):
+            with open(self.log_path, 'rb+') as f:
+                complete = 0  # bytes up to the end of the last good record
+                torn = False
+                for line in f:
+                    try:
+                        if not line.endswith(b"\n"):
+                            raise ValueError("unterminated record")
+                        records.append(json.loads(line))
+                    except ValueError:
+                        torn = True
+                        break
+                    complete += len(line)
+                if torn:
+                    print(f"Ignoring torn record at end of {self.log_path}")
+                    f.truncate(complete)
+                    os.fsync(f.fileno())
+        self._records_since_snapshot = len(records)
+        return snapshot, records
+
+    def append(self, record):
+        """Append one record, return True when a snapshot is due"""
+        line = json.dumps(record, separators=(',', ':')) + "\n"
+        with self._lock:
+            if self._file is None:
+                self._open()
+            self._file.write(line)
+            self._file.flush()
+            self._pending += 1
+            self._records_since_snapshot += 1
+            if (self._pending >= self.group_size or
+                    time.monotonic() - self._last_sync >= self.group_interval):
+                self._sync_locked()
+            return self._records_since_snapshot >= self.snapshot_every
+
+    def sync(self):
+        """Force pending records to disk"""
+        with self._lock:
+            self._sync_locked()
+
+    def write_snapshot(self, state):
+        """Atomically replace the snapshot with state, then compact the log"""
+        with self._lock:
+            tmp_path = self.snapshot_path + ".tmp"
+            with open(tmp_path, 'w') as f:
+                json.dump(state, f, separators=(',', ':'))
+                f.flush()
+                os.fsync(f.fileno())
+            os.replace(tmp_path, self.snapshot_path)
+            _fsync_dir(self.snapshot_path)
+
+            # Snapshot is durable, so the log can start over
+            if self._file is not None:
+                self._file.close()
+                self._file = None
+            with open(self.log_path, 'w') as f:
+                os.fsync(f.fileno())
+            self._pending = 0
+            self._records_since_snapshot = 0
+            self._last_sync = time.monotonic()
+
+    def close(self):
+        """Flush everything and stop the background flusher"""
+        self._closed.set()
+        with self._lock:
+            self._sync_locked()
+            if self._file is not None:
+                self._file.close()
+                self._file = None
+
+    def _open(self):
+        self._file = open(self.log_path, 'a')
+        if self._flusher is None:
+            self._flusher = threading.Thread(target=self._flush_loop, daemon=True)
+            self._flusher.start()
+
+    def _sync_locked(self):
+        if self._file is not None and self._pending:
+            os.fsync(self._file.fileno())
+        self._pending = 0
+        self._last_sync = time.monotonic()
+
+    def _flush_loop(self):
+        # Make sure a quiet period never leaves a partial group unsynced
+        while not self._closed.wait(self.group_interval):
+            if self._pending:
+                self.sync()
+
+
+def _fsync_dir(path):
+    """fsync the directory holding path so a rename survives power loss"""
+    if not hasattr(os, "O_DIRECTORY"):
+        return
+    fd = os.open(os.path.dirname(os.path.abspath(path)), os.O_DIRECTORY)
+    try:
+        os.fsync(fd)
+    finally:
+        os.close(fd)
@@ -0,0 +1,87 @@
+"""
+ELC Parking App - Lot Recommendations
+Author: Jie Liang
+Course: CS2450
+
+Ranks the lots a user may park in, best first, for /api/recommendations.
+
+A lot's score is the expected minutes from leaving to reaching the ELC,
+lower is better:
+
+    drive_time + walk_time
+    + FULL_PENALTY_MINUTES x risk of finding the lot full
+    - OPEN_BONUS_MINUTES x share of the lot expected to be free
+
+The risk comes from the free spaces predicted at arrival (falling back to
+current availability): none when at least SAFE_SPACES are expected free,
+certain when none are.
+
+Which lots each user type may use comes from a PermitIndex (permits.py)
+built once per lot config, and each ranking is cached until the state
+version, the forecast or the permit time window changes, so most requests
+are a dictionary lookup.
+"""
+
+from permits import PERMIT_BITS, PermitIndex, compile_rules
+
+
+FULL_PENALTY_MINUTES = 15  # time lost finding another lot when this one is full
+SAFE_SPACES = 5            # free spaces at arrival that make a lot a safe bet
+OPEN_BONUS_MINUTES = 2     # nudge toward emptier lots when the times are close
+
+# User types are the permit classes; each holds the one permit it is named after
+USER_TYPES = tuple(PERMIT_BITS)
+
+
+class LotRecommender:
+    """Ranked, cached lot recommendations per user type"""
+
+    def __init__(self, store):
+        self._store = store
+        configs = {lot_id: store.lot_config(lot_id) for lot_id in store.lot_ids()}
+        self._index = PermitIndex(
+            (lot_id, compile_rules(config["permit_type"], config.get("permit_rules")))
+            for lot_id, config in configs.items())
+        self._travel = {lot_id: config["drive_time"] + config["walk_time"]
+                        for lot_id, config in configs.items()}
+        self._totals = {lot_id: config["total_spaces"] for lot_id, config in configs.items()}
+        self._cache = {}  # user type -> ((version, forecast, permit window), scores)
+
+    def segment(self, when=None):
+        """Id of the current permit time window (eligibility changes with it)"""
+        return self._index.segment(when)
+
+    def eligible(self, user_type, when=None):
+        """Ids of the lots a user type may park in at when"""
+        return self._index.eligible(PERMIT_BITS[user_type], when)
+
+    def rank_ids(self, user_type, forecast, when=None):
+        """(score, lot_id, predicted) tuples for a user type, best first"""
+        key = (self._store.version, forecast.generation, self._index.segment(when))
+        cached = self._cache.get(user_type)
+        if cached is not None and cached[0] == key:
+            return cached[1]
+        scores = sorted(self._score(lot_id, forecast)
+                        for lot_id in self.eligible(user_type, when))
+        self._cache[user_type] = (key, scores)
+        return scores
+
+    def rank(self, user_type, forecast, limit=None, when=None):
+        """Scored lot summaries for a user type, best first"""
+        ranking = []
+        for rank, (score, lot_id, predicted) in enumerate(
+                self.rank_ids(user_type, forecast, when)[:limit], 1):
+            lot = self._store.summary(lot_id)
+            lot["predicted_available_at_arrival"] = predicted
+            lot["score"] = round(score, 2)
+            lot["rank"] = rank
+            ranking.append(lot)
+        return ranking
+
+    def _score(self, lot_id, forecast):
+        predicted = forecast.prediction(lot_id)
+        expected_free = self._store.available_count(lot_id) if predicted is None else predicted
+        risk = max(0.0, 1 - expected_free / SAFE_SPACES)
+        score = (self._travel[lot_id] + FULL_PENALTY_MINUTES * risk -
+                 OPEN_BONUS_MINUTES * expected_free / self._totals[lot_id])
+        return score, lot_id, predicted
@@ -0,0 +1,296 @@
+"""
+ELC Parking App - Lot Store
+Author: Jie Liang
+Course: CS2450
+
+Thread-safe home for the parking state served by parking_server.py.
+
+Locking:
+1. Each lot has its own lock, so writes to different lots do not wait on
+   each other and readers get a consistent copy of one lot
+2. A short commit lock hands out state versions, updates the shared
+   permit/campus counters and calls on_commit (change log + change feed)
+   so committed changes are always seen in version order
+3. Locks are always taken lots first (sorted by id), then the commit lock,
+   which keeps multi-lot batches and snapshots deadlock-free
+
+Lots are plain dicts (the same shape the server has always used) whose
+"spaces" entry is a SpaceBitmap.
+"""
+
+from contextlib import contextmanager
+from datetime import datetime
+import random
+import threading
+
+from space_bitmap import SpaceBitmap
+
+
+# Lot fields that never change after startup
+LOT_CONFIG_FIELDS = ("lot_id", "name", "total_spaces", "permit_type",
+                     "drive_time", "walk_time")
+# Config fields a lot may leave out (see campus_lots.py)
+OPTIONAL_CONFIG_FIELDS = ("permit_rules", "simulated_occupancy")
+
+
+class LotStore:
+    """Parking lots with per-lot locks and running occupancy counters"""
+
+    def __init__(self, lots, on_commit=None):
+        self._lots = lots
+        self._lot_locks = {lot_id: threading.RLock() for lot_id in lots}
+        self._commit_lock = threading.Lock()
+        self._version = max((lot["version"] for lot in lots.values()), default=0)
+        self.on_commit = on_commit  # called with each committed change record
+        self.rebuild_counters()
+
+    # ------------------------------------------------------------------------
+    # Reads
+    # ------------------------------------------------------------------------
+
+    def __contains__(self, lot_id):
+        return lot_id in self._lots
+
+    def lot_ids(self):
+        return list(self._lots)
+
+    def lot_config(self, lot_id):
+        """Static lot metadata (safe to read without locking)"""
+        return lot_config(self._lots[lot_id])
+
+    @property
+    def version(self):
+        """Version of the latest committed change"""
+        return self._version
+
+    def lot_version(self, lot_id):
+        return self._lots[lot_id]["version"]
+
+    def occupied_count(self, lot_id):
+        return self._counts[lot_id]
+
+    def available_count(self, lot_id):
+        return self._lots[lot_id]["total_spaces"] - self._counts[lot_id]
+
+    def permit_occupied_count(self, permit_type):
+        return self._permit_counts.get(permit_type, 0)
+
+    def campus_occupied_count(self):
+        return self._campus_count
+
+    def summary(self, lot_id):
+        """Consistent copy of a lot's metadata and occupancy"""
+        with self._lot_locks[lot_id]:
+            return self._summary(lot_id)
+
+    def summaries(self):
+        """Summaries of every lot (each one consistent on its own)"""
+        return [self.summary(lot_id) for lot_id in self._lots]
+
+    def snapshot(self, lot_id):
+        """Consistent (summary, spaces copy) pair for one lot"""
+        with self._lot_locks[lot_id]:
+            return self._summary(lot_id), self._lots[lot_id]["spaces"].copy()
+
+    def is_occupied(self, lot_id, space_index):
+        return self._lots[lot_id]["spaces"][space_index]
+
+    # ------------------------------------------------------------------------
+    # Writes
+    # ------------------------------------------------------------------------
+
+    def toggle_space(self, lot_id, space_index):
+        """Flip one space, return its new state"""
+        with self._lot_locks[lot_id]:
+            occupied = not self._lots[lot_id]["spaces"][space_index]
+            delta = self._set(lot_id, space_index, occupied)
+            self._commit({"op": "set", "lot": lot_id, "i": space_index, "v": int(occupied)},
+                         {lot_id: delta})
+            return occupied
+
+    def fill_lot(self, lot_id, occupied):
+        """Mark every space in a lot occupied (True) or empty (False)"""
+        with self._lot_locks[lot_id]:
+            spaces = SpaceBitmap(self._lots[lot_id]["total_spaces"], occupied)
+            delta = self._assign(lot_id, spaces)
+            self._commit({"op": "fill", "lot": lot_id, "v": int(occupied)}, {lot_id: delta})
+
+    def randomize_lot(self, lot_id, occupied_count, rng=random):
+        """Park occupied_count cars in random spaces of a lot"""
+        with self._lot_locks[lot_id]:
+            spaces = SpaceBitmap(self._lots[lot_id]["total_spaces"])
+            spaces.assign_random(occupied_count, rng)
+            delta = self._assign(lot_id, spaces)
+            self._commit({"op": "assign", "lot": lot_id, "on": spaces.occupied_indices()},
+                         {lot_id: delta})
+
+    def apply_events(self, events):
+        """Apply validated (lot_id, space_index, occupied) events atomically
+
+        Every lot in the batch is locked for the whole batch, so readers see
+        it either entirely applied or not at all. Returns a changed flag per
+        event; the batch is committed as one record.
+        """
+        lot_ids = sorted({lot_id for lot_id, _, _ in events})
+        with self._locked(lot_ids):
+            changed = []
+            sets = []
+            deltas = dict.fromkeys(lot_ids, 0)
+            for lot_id, space_index, occupied in events:
+                delta = self._set(lot_id, space_index, occupied)
+                changed.append(bool(delta))
+                if delta:
+                    deltas[lot_id] += delta
+                    sets.append([lot_id, space_index, int(occupied)])
+            if sets:
+                self._commit({"op": "batch", "sets": sets}, deltas)
+            return changed
+
+    def replay(self, record):
+        """Re-apply a change record from the change log (startup only)"""
+        op = record["op"]
+        deltas = {}
+        if op == "set":
+            deltas[record["lot"]] = self._set(record["lot"], record["i"], bool(record["v"]))
+        elif op == "batch":
+            for lot_id, space_index, occupied in record["sets"]:
+                deltas[lot_id] = deltas.get(lot_id, 0) + self._set(lot_id, space_index, bool(occupied))
+        elif op == "fill":
+            lot = self._lots[record["lot"]]
+            deltas[record["lot"]] = self._assign(
+                record["lot"], SpaceBitmap(lot["total_spaces"], bool(record["v"])))
+        elif op == "assign":
+            spaces = SpaceBitmap(self._lots[record["lot"]]["total_spaces"])
+            spaces.set_indices(record["on"])
+            deltas[record["lot"]] = self._assign(record["lot"], spaces)
+        self._apply_totals(deltas)
+        if "ver" in record:
+            self._stamp(record)
+            self._version = max(self._version, record["ver"])
+
+    @contextmanager
+    def lock_all(self):
+        """Hold every lot and the commit lock (consistent full snapshots)"""
+        with self._locked(sorted(self._lots)), self._commit_lock:
+            yield self._lots
+
+    # ------------------------------------------------------------------------
+    # Counters
+    # ------------------------------------------------------------------------
+
+    def rebuild_counters(self):
+        """Recount every lot from scratch"""
+        counts = {lot_id: lot["spaces"].count() for lot_id, lot in self._lots.items()}
+        permits = {}
+        for lot_id, lot in self._lots.items():
+            permits[lot["permit_type"]] = permits.get(lot["permit_type"], 0) + counts[lot_id]
+        self._counts = counts
+        self._permit_counts = permits
+        self._campus_count = sum(counts.values())
+
+    def check_counters(self):
+        """Compare running counters with a full recount, return the mismatches"""
+        with self.lock_all():
+            mismatches = []
+            permits = {}
+            for lot_id, lot in self._lots.items():
+                actual = lot["spaces"].count()
+                permits[lot["permit_type"]] = permits.get(lot["permit_type"], 0) + actual
+                if self._counts.get(lot_id) != actual:
+                    mismatches.append({"scope": "lot", "key": lot_id,
+                                       "counter": self._counts.get(lot_id), "actual": actual})
+            for permit_type, actual in permits.items():
+                if self._permit_counts.get(permit_type) != actual:
+                    mismatches.append({"scope": "permit", "key": permit_type,
+                                       "counter": self._permit_counts.get(permit_type),
+                                       "actual": actual})
+            campus = sum(permits.values())
+            if self._campus_count != campus:
+                mismatches.append({"scope": "campus", "key": None,
+                                   "counter": self._campus_count, "actual": campus})
+            return mismatches
+
+    # ------------------------------------------------------------------------
+    # Internals (callers hold the relevant lot locks)
+    # ------------------------------------------------------------------------
+
+    def _summary(self, lot_id):
+        lot = self._lots[lot_id]
+        occupied = self._counts[lot_id]
+        return {
+            "lot_id": lot["lot_id"],
+            "name": lot["name"],
+            "total_spaces": lot["total_spaces"],
+            "occupied_spaces": occupied,
+            "available_spaces": lot["total_spaces"] - occupied,
+            "permit_type": lot["permit_type"],
+            "drive_time": lot["drive_time"],
+            "walk_time": lot["walk_time"],
+            "version": lot["version"],
+            "last_update": lot["last_update"]
+        }
+
+    def _set(self, lot_id, space_index, occupied):
+        """Set one space, return the occupied-count delta (0 if unchanged)"""
+        spaces = self._lots[lot_id]["spaces"]
+        if spaces[space_index] == occupied:
+            return 0
+        spaces[space_index] = occupied
+        delta = 1 if occupied else -1
+        self._counts[lot_id] += delta
+        return delta
+
+    def _assign(self, lot_id, spaces):
+        """Replace a lot's spaces, return the occupied-count delta"""
+        delta = spaces.count() - self._counts[lot_id]
+        self._lots[lot_id]["spaces"] = spaces
+        self._counts[lot_id] += delta
+        return delta
+
+    def _commit(self, record, deltas):
+        with self._commit_lock:
+            self._apply_totals(deltas)
+            self._version += 1
+            record["ver"] = self._version
+            record["ts"] = datetime.now().isoformat()
+            self._stamp(record)
+            if self.on_commit is not None:
+                self.on_commit(record)
+
+    def _apply_totals(self, deltas):
+        """Carry per-lot count changes into the permit and campus counters"""
+        for lot_id, delta in deltas.items():
+            if delta:
+                self._permit_counts[self._lots[lot_id]["permit_type"]] += delta
+                self._campus_count += delta
+
+    def _stamp(self, record):
+        for lot_id in record_lot_ids(record):
+            self._lots[lot_id]["version"] = record["ver"]
+            self._lots[lot_id]["last_update"] = record["ts"]
+
+    @contextmanager
+    def _locked(self, lot_ids):
+        acquired = []
+        try:
+            for lot_id in lot_ids:
+                self._lot_locks[lot_id].acquire()
+                acquired.append(lot_id)
+            yield
+        finally:
+            for lot_id in reversed(acquired):
+                self._lot_locks[lot_id].release()
+
+
+def record_lot_ids(record):
+    """Ids of the lots a change record touches"""
+    if record["op"] == "batch":
+        return list(dict.fromkeys(lot_id for lot_id, _, _ in record["sets"]))
+    return [record["lot"]]
+
+
+def lot_config(lot):
+    """The static config fields of a lot dict"""
+    config = {field: lot[field] for field in LOT_CONFIG_FIELDS}
+    config.update((field, lot[field]) for field in OPTIONAL_CONFIG_FIELDS if field in lot)
+    return config
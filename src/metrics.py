@@ -0,0 +1,242 @@
+"""
+ELC Parking App - Server Metrics
+Author: Jie Liang
+Course: CS2450
+
+Counters, histograms and gauges served at /metrics in the Prometheus text
+format, cheap enough to leave on at high request rates.
+
+1. Every series is registered up front with its label values (routes,
+   status classes, persistence operations) and gets a fixed cell number,
+   so recording is a list index, not a dict lookup on label tuples
+2. Each thread adds into its own list of cells, so recording takes no lock
+   and threads never contend. A scrape sums the lists; when a thread
+   exits, its totals are folded into a retired list under the lock
+3. Gauges are read only at scrape time from a callback (e.g. occupancy
+   per lot from the store), so they cost nothing between scrapes
+Metrics are per process: under several gunicorn workers each worker
+reports its own.
+"""
+
+from bisect import bisect_left
+import threading
+import weakref
+
+
+# Request latency buckets in seconds, from a cached 304 to a slow snapshot
+LATENCY_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5)
+# Response size buckets in bytes
+SIZE_BUCKETS = (100, 1000, 10000, 100000, 1000000, 10000000)
+
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+
+class _Shard:
+    """One thread's cells (an object so its end can be noticed)"""
+
+    __slots__ = ("values", "__weakref__")
+
+    def __init__(self, size):
+        self.values = [0] * size
+
+
+class MetricsRegistry:
+    """Metrics, their cells and the per-thread shards that hold the counts"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._local = threading.local()
+        self._metrics = []
+        self._size = 0
+        self._live = {}  # id(values) -> values for threads still running
+        self._retired = []  # totals of threads that have exited
+
+    def counter(self, name, help_text, labelnames=(), labelsets=((),)):
+        """Register a counter with one series per label value tuple"""
+        return self._add(Counter(self, name, help_text, labelnames, labelsets))
+
+    def histogram(self, name, help_text, buckets, labelnames=(), labelsets=((),)):
+        """Register a histogram (upper bucket bounds, ascending) per label tuple"""
+        return self._add(Histogram(self, name, help_text, labelnames, labelsets, buckets))
+
+    def gauge(self, name, help_text, labelnames, read):
+        """Register a gauge whose read() yields (label values, value) at scrape"""
+        return self._add(Gauge(name, help_text, labelnames, read))
+
+    def _add(self, metric):
+        with self._lock:
+            self._metrics.append(metric)
+        return metric
+
+    def _allocate(self, count):
+        """Reserve count new cells; returns the first cell number"""
+        with self._lock:
+            first = self._size
+            self._size += count
+            for values in list(self._live.values()) + [self._retired]:
+                values.extend([0] * count)
+            return first
+
+    def values(self):
+        """The calling thread's cells"""
+        try:
+            return self._local.shard.values
+        except AttributeError:
+            return self._new_shard()
+
+    def _new_shard(self):
+        with self._lock:
+            shard = _Shard(self._size)
+            self._live[id(shard.values)] = shard.values
+        weakref.finalize(shard, self._retire, shard.values)
+        self._local.shard = shard
+        return shard.values
+
+    def _retire(self, values):
+        """Fold an exited thread's cells into the retired totals"""
+        with self._lock:
+            del self._live[id(values)]
+            for cell, value in enumerate(values):
+                if value:
+                    self._retired[cell] += value
+
+    def totals(self):
+        """Every cell summed over all threads, live and exited"""
+        with self._lock:
+            totals = list(self._retired)
+            for values in self._live.values():
+                for cell, value in enumerate(values):
+                    if value:
+                        totals[cell] += value
+        return totals
+
+    def render(self):
+        """All metrics in the Prometheus text exposition format"""
+        totals = self.totals()
+        with self._lock:
+            metrics = list(self._metrics)
+        lines = []
+        for metric in metrics:
+            lines.append(f"# HELP {metric.name} {metric.help_text}")
+            lines.append(f"# TYPE {metric.name} {metric.kind}")
+            lines.extend(metric.samples(totals))
+        return "\n".join(lines) + "\n"
+
+
+class Counter:
+    """Monotonic count per label tuple"""
+
+    kind = "counter"
+
+    def __init__(self, registry, name, help_text, labelnames, labelsets):
+        self.name = name
+        self.help_text = help_text
+        self._labelnames = tuple(labelnames)
+        labelsets = [tuple(labels) for labels in labelsets]
+        first = registry._allocate(len(labelsets))
+        self._series = {labels: CounterSeries(registry, first + n)
+                        for n, labels in enumerate(labelsets)}
+
+    def labels(self, *values):
+        """The series for registered label values (KeyError if not registered)"""
+        return self._series[values]
+
+    def samples(self, totals):
+        for labels, series in self._series.items():
+            yield f"{self.name}{format_labels(self._labelnames, labels)} " \
+                  f"{format_value(totals[series.cell])}"
+
+
+class CounterSeries:
+    __slots__ = ("_registry", "cell")
+
+    def __init__(self, registry, cell):
+        self._registry = registry
+        self.cell = cell
+
+    def inc(self, amount=1):
+        self._registry.values()[self.cell] += amount
+
+
+class Histogram:
+    """Bucketed observations per label tuple, with their sum and count"""
+
+    kind = "histogram"
+
+    def __init__(self, registry, name, help_text, labelnames, labelsets, buckets):
+        self.name = name
+        self.help_text = help_text
+        self._labelnames = tuple(labelnames)
+        self._bounds = tuple(buckets)
+        labelsets = [tuple(labels) for labels in labelsets]
+        # Per series: one cell per bucket, one for +Inf, one for the sum
+        width = len(self._bounds) + 2
+        first = registry._allocate(width * len(labelsets))
+        self._series = {labels: HistogramSeries(registry, self._bounds, first + n * width)
+                        for n, labels in enumerate(labelsets)}
+
+    def labels(self, *values):
+        """The series for registered label values (KeyError if not registered)"""
+        return self._series[values]
+
+    def samples(self, totals):
+        bounds = [format_value(bound) for bound in self._bounds] + ["+Inf"]
+        for labels, series in self._series.items():
+            cells = totals[series.first:series.first + len(bounds) + 1]
+            count = 0
+            for bound, in_bucket in zip(bounds, cells):
+                count += in_bucket  # buckets are cumulative in the exposition
+                yield f"{self.name}_bucket" \
+                      f"{format_labels(self._labelnames + ('le',), labels + (bound,))} {count}"
+            label_text = format_labels(self._labelnames, labels)
+            yield f"{self.name}_sum{label_text} {format_value(cells[-1])}"
+            yield f"{self.name}_count{label_text} {count}"
+
+
+class HistogramSeries:
+    __slots__ = ("_registry", "_bounds", "first", "_sum")
+
+    def __init__(self, registry, bounds, first):
+        self._registry = registry
+        self._bounds = bounds
+        self.first = first
+        self._sum = first + len(bounds) + 1
+
+    def observe(self, value):
+        values = self._registry.values()
+        values[self.first + bisect_left(self._bounds, value)] += 1
+        values[self._sum] += value
+
+
+class Gauge:
+    """Current values read from a callback at scrape time"""
+
+    kind = "gauge"
+
+    def __init__(self, name, help_text, labelnames, read):
+        self.name = name
+        self.help_text = help_text
+        self._labelnames = tuple(labelnames)
+        self._read = read
+
+    def samples(self, totals):
+        for labels, value in self._read():
+            yield f"{self.name}{format_labels(self._labelnames, tuple(labels))} " \
+                  f"{format_value(value)}"
+
+
+def format_labels(names, values):
+    if not names:
+        return ""
+    pairs = ",".join(f'{name}="{escape_label(str(value))}"' for name, value in zip(names, values))
+    return "{" + pairs + "}"
+
+
+def escape_label(value):
+    return value.replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def format_value(value):
+    if isinstance(value, float) and value.is_integer():
+        return repr(int(value)) if abs(value) < 1e15 else repr(value)
+    return repr(value)
@@ -0,0 +1,168 @@
+"""
+ELC Parking App - Availability Forecast
+Author: Jie Liang
+Course: CS2450
+
+Predicts how many spaces each lot will have free drive_time minutes from
+now ("will there be a space when I arrive"), blending two signals:
+1. Trend: the lot's recent net arrival rate (arrivals minus departures per
+   minute, exponentially weighted), damped over the horizon because a rush
+   of arrivals rarely lasts
+2. Profile: how the lot's occupancy usually moves between now and the
+   arrival time on this day of the week, fit from the hourly rollups kept
+   by OccupancySeries. The more weeks of data it has seen, the more it is
+   trusted over the trend
+
+observe() only counts arrivals and departures. Once a minute tick() folds
+those counts into the rates, refits the profiles when due and recomputes
+every lot's expected change in one vectorized pass; requests add that to
+the lot's live occupancy.
+"""
+
+from datetime import datetime, timezone
+import threading
+
+import numpy as np
+
+
+TREND_MINUTES = 15    # how long a change in arrival rate tends to persist
+RATE_HALF_LIFE = 10   # minutes for the arrival-rate average to forget half
+REFIT_MINUTES = 60    # minutes between profile refits
+WEEK_HOURS = 7 * 24
+
+
+class AvailabilityForecaster:
+    """Per-lot availability predictions, refreshed once a minute"""
+
+    def __init__(self, store, series, refit_minutes=REFIT_MINUTES):
+        self._series = series
+        self._lot_ids = store.lot_ids()
+        self._rows = {lot_id: row for row, lot_id in enumerate(self._lot_ids)}
+        configs = [store.lot_config(lot_id) for lot_id in self._lot_ids]
+        self._totals = np.array([config["total_spaces"] for config in configs], dtype=float)
+        self._horizons = np.array([config["drive_time"] for config in configs], dtype=float)
+        self._levels = np.array([store.occupied_count(lot_id) for lot_id in self._lot_ids],
+                                dtype=float)
+        lots = len(self._lot_ids)
+        self._arrivals = np.zeros(lots)
+        self._departures = np.zeros(lots)
+        self._rates = np.zeros(lots)                              # net arrivals per minute
+        self._profile = np.full((lots, WEEK_HOURS), np.nan)       # mean occupied fraction
+        self._profile_weeks = np.zeros(WEEK_HOURS)                # samples behind each hour
+        self._refit_minutes = refit_minutes
+        self._next_refit = None
+        self._minute = None
+        self._changes = None  # expected occupancy change by arrival, per lot
+        self._lock = threading.Lock()
+        self.generation = 0  # bumped whenever predictions change
+
+    def observe(self, lot_counts):
+        """Count arrivals and departures implied by new lot occupancies"""
+        with self._lock:
+            for lot_id, level in lot_counts.items():
+                row = self._rows.get(lot_id)
+                if row is None:
+                    continue
+                delta = level - self._levels[row]
+                if delta > 0:
+                    self._arrivals[row] += delta
+                else:
+                    self._departures[row] -= delta
+                self._levels[row] = level
+
+    def prediction(self, lot_id):
+        """Predicted free spaces at arrival, or None before the first tick
+
+        The expected change is cached per minute but applied to the lot's
+        live occupancy, so a lot that just filled up is never shown as free.
+        """
+        row = self._rows.get(lot_id)
+        changes = self._changes
+        if row is None or changes is None:
+            return None
+        total = self._totals[row]
+        occupied = min(max(round(self._levels[row] + changes[row]), 0), total)
+        return int(total - occupied)
+
+    def tick(self, now):
+        """Refresh rates and predictions once per minute, return True if it did"""
+        minute = int(now // 60)
+        with self._lock:
+            if minute == self._minute:
+                return False
+            elapsed = 1 if self._minute is None else max(minute - self._minute, 1)
+            decay = 0.5 ** (elapsed / RATE_HALF_LIFE)
+            net = (self._arrivals - self._departures) / elapsed
+            self._rates = decay * self._rates + (1 - decay) * net
+            self._arrivals[:] = 0
+            self._departures[:] = 0
+            self._minute = minute
+            levels = self._levels.copy()
+            rates = self._rates.copy()
+
+        if self._next_refit is None or minute >= self._next_refit:
+            self.refit(now)
+            self._next_refit = minute + self._refit_minutes
+        changes = self.predict(now, levels, rates)
+        with self._lock:
+            self._changes = changes
+            self.generation += 1
+        return True
+
+    def refit(self, now):
+        """Rebuild the day-of-week/hour-of-day profiles from the hourly rollups"""
+        lot_ids, hours, means = self._series.hourly_means(now)
+        if hours.size == 0:
+            return
+        onehot = np.zeros((hours.size, WEEK_HOURS))
+        onehot[np.arange(hours.size), week_hour(hours)] = 1
+        weeks = onehot.sum(axis=0)
+        series_rows = {lot_id: row for row, lot_id in enumerate(lot_ids)}
+        rows = [series_rows[lot_id] for lot_id in self._lot_ids]
+        with np.errstate(invalid="ignore", divide="ignore"):
+            profile = (means[rows] @ onehot) / weeks / self._totals[:, None]
+        self._profile = np.where(weeks > 0, profile, np.nan)
+        self._profile_weeks = weeks
+
+    def predict(self, now, levels, rates):
+        """Expected occupancy change per lot by now + drive time (vectorized)"""
+        horizons = self._horizons
+        trend = levels + rates * TREND_MINUTES * (1 - np.exp(-horizons / TREND_MINUTES))
+
+        now_times = np.full_like(horizons, now)
+        arrival_times = now + horizons * 60
+        change = self._profile_at(arrival_times) - self._profile_at(now_times)
+        seasonal = levels + np.nan_to_num(change) * self._totals
+        weeks = np.minimum(self._profile_weeks[week_hour(now_times)],
+                           self._profile_weeks[week_hour(arrival_times)])
+        weight = np.where(np.isnan(change), 0, weeks / (weeks + 1))
+
+        return weight * seasonal + (1 - weight) * trend - levels
+
+    def _profile_at(self, times):
+        """Profile value at each lot's time, interpolated between hour centres"""
+        position = (_local_hours(times) - 0.5) % WEEK_HOURS
+        before = np.floor(position).astype(int)
+        after = (before + 1) % WEEK_HOURS
+        fraction = position - before
+        rows = np.arange(len(self._lot_ids))
+        return (self._profile[rows, before] * (1 - fraction) +
+                self._profile[rows, after] * fraction)
+
+
+def week_hour(times):
+    """Hour of the local week (0 = Monday 00:00) for epoch seconds"""
+    return np.floor(_local_hours(times)).astype(int) % WEEK_HOURS
+
+
+def _local_hours(times):
+    times = np.asarray(times, dtype=float)
+    # Each time gets the UTC offset in force at that moment, so history
+    # recorded before a daylight-saving change keeps its wall-clock hours.
+    # Offsets are looked up once per distinct time (hourly rollups and a
+    # handful of arrival times)
+    distinct, inverse = np.unique(times, return_inverse=True)
+    offsets = np.array([datetime.fromtimestamp(t, timezone.utc).astimezone().utcoffset()
+                        .total_seconds() for t in distinct])
+    # The Unix epoch fell on a Thursday, three days after a Monday
+    return ((times + offsets[inverse].reshape(times.shape)) / 3600 + 3 * 24) % WEEK_HOURS
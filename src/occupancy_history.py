@@ -0,0 +1,334 @@
+"""
+ELC Parking App - Occupancy History
+Author: Jie Liang
+Course: CS2450
+
+Optional SQLite store of every occupancy change, for analysis and
+forecasting. Kept apart from the live state so it can grow to years of
+data without slowing writes:
+1. record() only appends to an in-memory buffer; a background thread
+   writes it in batches with executemany (one prepared statement each)
+2. Raw events go to one table per calendar month (UTC), indexed by lot and
+   time, so queries touch only the months they cover and expiring old
+   data is a DROP TABLE instead of a huge DELETE
+3. Closed minutes are rolled up into occupancy_1m and closed hours into
+   occupancy_1h; raw partitions and minute rollups past their retention
+   are dropped once they have been rolled up. Hourly rollups are kept
+
+Each raw row holds the lot's occupancy right after the change, so a
+rollup bucket stores samples, sum, min, max and last of that value.
+rollup_columns() reads a whole range of buckets for every lot as NumPy
+arrays, which is how the server backfills its in-memory series.
+"""
+
+from datetime import datetime, timezone
+import sqlite3
+import threading
+import time
+
+import numpy as np
+
+
+RAW_COLUMNS = "ts REAL NOT NULL, ver INTEGER NOT NULL, lot_id TEXT NOT NULL, " \
+              "space_index INTEGER NOT NULL, occupied INTEGER NOT NULL, " \
+              "lot_occupied INTEGER NOT NULL"
+
+ROLLUP_COLUMNS = "lot_id TEXT NOT NULL, bucket INTEGER NOT NULL, samples INTEGER NOT NULL, " \
+                 "occupied_sum INTEGER NOT NULL, occupied_min INTEGER NOT NULL, " \
+                 "occupied_max INTEGER NOT NULL, occupied_last INTEGER NOT NULL, " \
+                 "PRIMARY KEY (lot_id, bucket)"
+
+ROLLUP_TABLES = {"1m": "occupancy_1m", "1h": "occupancy_1h"}
+# One rollup bucket as rollup_columns() returns it
+ROLLUP_DTYPE = np.dtype([("lot_id", object), ("bucket", np.int64), ("samples", np.int64),
+                         ("sum", np.int64), ("min", np.int64), ("max", np.int64),
+                         ("last", np.int64)])
+
+# space_index used for whole-lot changes (fill / randomize)
+WHOLE_LOT = -1
+
+
+class OccupancyHistory:
+    """Time-partitioned occupancy event history with rollups"""
+
+    def __init__(self, path, batch_size=500, flush_interval=1.0, rollup_interval=60,
+                 raw_retention_days=30, minute_retention_days=365):
+        self.path = path
+        self.batch_size = batch_size            # flush after this many rows...
+        self.flush_interval = flush_interval    # ...or after this many seconds
+        self.rollup_interval = rollup_interval  # seconds between rollup passes
+        self.raw_retention = raw_retention_days * 86400
+        self.minute_retention = minute_retention_days * 86400
+        self._buffer = []
+        self._buffer_lock = threading.Lock()
+        self._db_lock = threading.Lock()
+        self._wake = threading.Event()
+        self._closed = threading.Event()
+        self._conn = sqlite3.connect(path, check_same_thread=False, timeout=30)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        with self._conn:
+            self._conn.execute(f"CREATE TABLE IF NOT EXISTS occupancy_1m ({ROLLUP_COLUMNS})")
+            self._conn.execute(f"CREATE TABLE IF NOT EXISTS occupancy_1h ({ROLLUP_COLUMNS})")
+            for table in ROLLUP_TABLES.values():
+                self._conn.execute(f"CREATE INDEX IF NOT EXISTS {table}_bucket "
+                                   f"ON {table} (bucket)")
+            self._conn.execute("CREATE TABLE IF NOT EXISTS history_state "
+                               "(key TEXT PRIMARY KEY, value REAL NOT NULL)")
+        self._partitions = set(self._list_partitions())
+        self._writer = threading.Thread(target=self._run, daemon=True)
+        self._writer.start()
+
+    # ------------------------------------------------------------------------
+    # Recording
+    # ------------------------------------------------------------------------
+
+    def record(self, record, lot_counts):
+        """Queue the rows for a committed change record
+
+        lot_counts maps each lot the record touches to its occupancy right
+        after the change.
+        """
+        ts = _timestamp(record["ts"])
+        ver = record["ver"]
+        op = record["op"]
+        if op == "set":
+            rows = [(ts, ver, record["lot"], record["i"], record["v"], lot_counts[record["lot"]])]
+        elif op == "batch":
+            rows = [(ts, ver, lot_id, space_index, occupied, lot_counts[lot_id])
+                    for lot_id, space_index, occupied in record["sets"]]
+        else:
+            occupied = record.get("v", 1 if record.get("on") else 0)
+            rows = [(ts, ver, record["lot"], WHOLE_LOT, occupied, lot_counts[record["lot"]])]
+        with self._buffer_lock:
+            self._buffer.extend(rows)
+            if len(self._buffer) >= self.batch_size:
+                self._wake.set()
+
+    def flush(self):
+        """Write every buffered row now"""
+        with self._buffer_lock:
+            rows, self._buffer = self._buffer, []
+        if not rows:
+            return
+        by_partition = {}
+        for row in rows:
+            by_partition.setdefault(_partition_name(row[0]), []).append(row)
+        with self._db_lock, self._conn:
+            for name, partition_rows in by_partition.items():
+                self._ensure_partition(name)
+                self._conn.executemany(f"INSERT INTO {name} VALUES (?, ?, ?, ?, ?, ?)",
+                                       partition_rows)
+
+    def close(self):
+        """Stop the writer thread after writing what is buffered"""
+        if self._closed.is_set():
+            return
+        self._closed.set()
+        self._wake.set()
+        self._writer.join()
+        self.flush()
+        self._conn.close()
+
+    # ------------------------------------------------------------------------
+    # Rollups and retention
+    # ------------------------------------------------------------------------
+
+    def rollup(self, now=None):
+        """Roll closed minutes and hours up, then expire old data"""
+        now = time.time() if now is None else now
+        self.flush()
+        with self._db_lock, self._conn:
+            # Leave the current minute alone: its events may still be buffered
+            minute_end = int(now - self.flush_interval) // 60 * 60
+            rolled = self._get_state("rolled_1m")
+            if rolled is None:
+                rolled = self._first_event_minute(minute_end)
+            if rolled < minute_end:
+                for name in self._partitions_between(rolled, minute_end):
+                    self._roll_raw(name, rolled, minute_end)
+                self._set_state("rolled_1m", minute_end)
+
+            hour_end = minute_end // 3600 * 3600
+            rolled_hours = self._get_state("rolled_1h")
+            if rolled_hours is None:
+                rolled_hours = rolled // 3600 * 3600
+            if rolled_hours < hour_end:
+                self._roll_minutes(rolled_hours, hour_end)
+                self._set_state("rolled_1h", hour_end)
+
+            self._expire(now, minute_end, hour_end)
+
+    def _roll_raw(self, name, start, end):
+        self._conn.execute(f"""
+            INSERT OR REPLACE INTO occupancy_1m
+            SELECT lot_id, CAST(ts / 60 AS INTEGER) * 60 AS minute, COUNT(*),
+                   SUM(lot_occupied), MIN(lot_occupied), MAX(lot_occupied),
+                   (SELECT last.lot_occupied FROM {name} AS last
+                    WHERE last.lot_id = raw.lot_id AND last.ts < CAST(raw.ts / 60 AS INTEGER) * 60 + 60
+                    ORDER BY last.ts DESC, last.ver DESC LIMIT 1)
+            FROM {name} AS raw
+            WHERE ts >= ? AND ts < ?
+            GROUP BY lot_id, minute
+        """, (start, end))
+
+    def _roll_minutes(self, start, end):
+        self._conn.execute("""
+            INSERT OR REPLACE INTO occupancy_1h
+            SELECT lot_id, bucket / 3600 * 3600 AS hour, SUM(samples), SUM(occupied_sum),
+                   MIN(occupied_min), MAX(occupied_max),
+                   (SELECT last.occupied_last FROM occupancy_1m AS last
+                    WHERE last.lot_id = m.lot_id AND last.bucket < m.bucket / 3600 * 3600 + 3600
+                    ORDER BY last.bucket DESC LIMIT 1)
+            FROM occupancy_1m AS m
+            WHERE bucket >= ? AND bucket < ?
+            GROUP BY lot_id, hour
+        """, (start, end))
+
+    def _expire(self, now, minute_end, hour_end):
+        # Only data that has already been rolled up may go
+        raw_cutoff = min(now - self.raw_retention, minute_end)
+        for name in sorted(self._partitions):
+            if _partition_end(name) <= raw_cutoff:
+                self._conn.execute(f"DROP TABLE {name}")
+                self._partitions.discard(name)
+        minute_cutoff = min(now - self.minute_retention, hour_end)
+        self._conn.execute("DELETE FROM occupancy_1m WHERE bucket < ?", (minute_cutoff,))
+
+    # ------------------------------------------------------------------------
+    # Queries
+    # ------------------------------------------------------------------------
+
+    def events(self, lot_id, start, end):
+        """Raw (ts, space_index, occupied, lot_occupied) rows for a lot, oldest first"""
+        self.flush()
+        rows = []
+        with self._db_lock:
+            for name in self._partitions_between(start, end):
+                rows.extend(self._conn.execute(
+                    f"SELECT ts, space_index, occupied, lot_occupied FROM {name} "
+                    "WHERE lot_id = ? AND ts >= ? AND ts < ? ORDER BY ts, ver",
+                    (lot_id, start, end)))
+        return rows
+
+    def lot_levels(self, start, end):
+        """(ts, lot_id, lot_occupied) rows for every lot, oldest first"""
+        self.flush()
+        rows = []
+        with self._db_lock:
+            for name in self._partitions_between(start, end):
+                rows.extend(self._conn.execute(
+                    f"SELECT ts, lot_id, lot_occupied FROM {name} "
+                    "WHERE ts >= ? AND ts < ? ORDER BY ts, ver", (start, end)))
+        return rows
+
+    def rollups(self, lot_id, start, end, resolution="1m"):
+        """(bucket, samples, average, min, max, last) rows for a lot, oldest first"""
+        table = ROLLUP_TABLES[resolution]
+        with self._db_lock:
+            return [(bucket, samples, total / samples, low, high, last)
+                    for bucket, samples, total, low, high, last in self._conn.execute(
+                        f"SELECT bucket, samples, occupied_sum, occupied_min, occupied_max, "
+                        f"occupied_last FROM {table} WHERE lot_id = ? AND bucket >= ? "
+                        "AND bucket < ? ORDER BY bucket", (lot_id, start, end))]
+
+    def rolled_until(self, resolution="1m"):
+        """End of the time already rolled up at a resolution, or None"""
+        with self._db_lock:
+            return self._get_state("rolled_" + resolution)
+
+    def rollup_columns(self, start, end, resolution="1m"):
+        """Buckets of every lot in [start, end) as a ROLLUP_DTYPE array, unordered
+
+        Rows go from the cursor straight into the array, with no list of
+        tuples in between.
+        """
+        table = ROLLUP_TABLES[resolution]
+        with self._db_lock:
+            cursor = self._conn.execute(
+                f"SELECT lot_id, bucket, samples, occupied_sum, occupied_min, occupied_max, "
+                f"occupied_last FROM {table} WHERE bucket >= ? AND bucket < ?", (start, end))
+            return np.fromiter(cursor, ROLLUP_DTYPE)
+
+    def last_levels(self, lot_ids, before, resolution="1m"):
+        """{lot_id: occupancy at the end of its last bucket before a time}
+
+        Lots with no bucket before then are left out.
+        """
+        table = ROLLUP_TABLES[resolution]
+        levels = {}
+        with self._db_lock:
+            for lot_id in lot_ids:
+                row = self._conn.execute(
+                    f"SELECT occupied_last FROM {table} WHERE lot_id = ? AND bucket < ? "
+                    "ORDER BY bucket DESC LIMIT 1", (lot_id, before)).fetchone()
+                if row is not None:
+                    levels[lot_id] = row[0]
+        return levels
+
+    # ------------------------------------------------------------------------
+    # Internals
+    # ------------------------------------------------------------------------
+
+    def _run(self):
+        next_rollup = time.monotonic() + self.rollup_interval
+        while not self._closed.is_set():
+            self._wake.wait(self.flush_interval)
+            self._wake.clear()
+            try:
+                self.flush()
+                if time.monotonic() >= next_rollup:
+                    self.rollup()
+                    next_rollup = time.monotonic() + self.rollup_interval
+            except sqlite3.Error as e:
+                print(f"Warning: could not write occupancy history ({e})")
+
+    def _list_partitions(self):
+        return [name for (name,) in self._conn.execute(
+            "SELECT name FROM sqlite_master WHERE type = 'table' AND name LIKE 'events_%'")]
+
+    def _ensure_partition(self, name):
+        if name not in self._partitions:
+            self._conn.execute(f"CREATE TABLE IF NOT EXISTS {name} ({RAW_COLUMNS})")
+            self._conn.execute(f"CREATE INDEX IF NOT EXISTS {name}_lot_ts ON {name} (lot_id, ts)")
+            self._partitions.add(name)
+
+    def _partitions_between(self, start, end):
+        return [name for name in sorted(self._partitions)
+                if _partition_start(name) < end and _partition_end(name) > start]
+
+    def _first_event_minute(self, default):
+        for name in sorted(self._partitions):
+            first = self._conn.execute(f"SELECT MIN(ts) FROM {name}").fetchone()[0]
+            if first is not None:
+                return int(first) // 60 * 60
+        return default
+
+    def _get_state(self, key):
+        row = self._conn.execute("SELECT value FROM history_state WHERE key = ?", (key,)).fetchone()
+        return None if row is None else int(row[0])
+
+    def _set_state(self, key, value):
+        self._conn.execute("INSERT OR REPLACE INTO history_state VALUES (?, ?)", (key, value))
+
+
+def _timestamp(iso):
+    """Epoch seconds for a record's local-time ISO timestamp"""
+    return datetime.fromisoformat(iso).timestamp()
+
+
+def _partition_name(ts):
+    month = datetime.fromtimestamp(ts, timezone.utc)
+    return f"events_{month.year:04d}{month.month:02d}"
+
+
+def _partition_start(name):
+    year, month = int(name[7:11]), int(name[11:13])
+    return datetime(year, month, 1, tzinfo=timezone.utc).timestamp()
+
+
+def _partition_end(name):
+    year, month = int(name[7:11]), int(name[11:13])
+    if month == 12:
+        year, month = year + 1, 0
+    return datetime(year, month + 1, 1, tzinfo=timezone.utc).timestamp()
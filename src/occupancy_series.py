@@ -0,0 +1,246 @@
+"""
+ELC Parking App - Occupancy Time Series
+Author: Jie Liang
+Course: CS2450
+
+In-memory occupancy rollups behind GET /api/lot/<lot_id>/history.
+
+Two tiers of fixed-width buckets are kept in NumPy ring buffers shaped
+(lots, buckets): one-minute buckets for the last two days and one-hour
+buckets for the last five weeks. Every lot shares one time axis, so
+moving to a new bucket is a single slice assignment for all lots.
+
+Per bucket and lot we keep the occupancy integrated over time (so means
+are time-weighted), the min and max, and the occupancy at the end of the
+bucket. A change only touches its own lot's current bucket; queries
+aggregate buckets into the requested width with vectorized reductions
+instead of scanning raw events.
+
+At startup closed buckets are loaded a whole tier at a time from the
+history's minute and hour rollups (load). Those count changes rather than
+seconds, so a loaded bucket's mean is the average of its starting level
+and the level after each change.
+"""
+
+from itertools import repeat
+import threading
+
+import numpy as np
+
+
+MINUTE = 60
+HOUR = 3600
+
+
+class _Tier:
+    """Ring of equal-width buckets for every lot"""
+
+    def __init__(self, width, capacity, levels, now):
+        self.width = width
+        self.capacity = capacity
+        lots = len(levels)
+        self.area = np.zeros((lots, capacity))             # occupancy x seconds
+        self.low = np.zeros((lots, capacity), np.int32)
+        self.high = np.zeros((lots, capacity), np.int32)
+        self.last = np.zeros((lots, capacity), np.int32)   # occupancy at bucket end
+        self.buckets = np.full(capacity, -1, np.int64)     # bucket number held by each slot
+        self.current = int(now // width)
+        self.since = np.full(lots, float(now))             # time the level was last integrated
+        slot = self.current % capacity
+        self.buckets[slot] = self.current
+        self.low[:, slot] = self.high[:, slot] = self.last[:, slot] = levels
+
+    def add_lot(self, level, now):
+        self.area = np.vstack([self.area, np.zeros(self.capacity)])
+        for name in ("low", "high", "last"):
+            setattr(self, name, np.vstack([getattr(self, name),
+                                           np.full(self.capacity, level, np.int32)]))
+        self.since = np.append(self.since, now)
+
+    def advance(self, now, levels):
+        """Close buckets up to now; buckets nobody touched hold a flat level"""
+        bucket = int(now // self.width)
+        if bucket <= self.current:
+            return
+        slot = self.current % self.capacity
+        end = (self.current + 1) * self.width
+        self.area[:, slot] += levels * (end - self.since)
+        first = max(self.current + 1, bucket - self.capacity + 1)
+        new = np.arange(first, bucket + 1)
+        slots = new % self.capacity
+        self.buckets[slots] = new
+        self.area[:, slots] = levels[:, None] * self.width
+        self.area[:, bucket % self.capacity] = 0
+        self.low[:, slots] = self.high[:, slots] = self.last[:, slots] = levels[:, None]
+        self.since[:] = bucket * self.width
+        self.current = bucket
+
+    def load(self, rows, numbers, rollup, levels):
+        """Fill the closed buckets from rollups, before any change is recorded
+
+        rows and numbers give each rollup entry's lot row and bucket number;
+        levels is every lot's occupancy before the first bucket. Buckets
+        from the earliest entry on are filled, lots without an entry in a
+        bucket holding their level through it.
+        """
+        if numbers.size == 0:
+            return
+        first = max(int(numbers.min()), self.current - self.capacity + 1)
+        keep = (numbers >= first) & (numbers < self.current)
+        rows, cols = rows[keep], numbers[keep] - first
+        count = self.current - first
+        if count <= 0:
+            return
+        shape = (len(levels), count)
+
+        changed = np.zeros(shape, bool)
+        changed[rows, cols] = True
+        after = np.zeros(shape, np.int64)
+        after[rows, cols] = rollup["last"][keep]
+        # Carry each lot's last level forward through buckets without changes
+        held = np.where(changed, np.arange(count), -1)
+        np.maximum.accumulate(held, axis=1, out=held)
+        after = np.where(held >= 0, np.take_along_axis(after, np.maximum(held, 0), axis=1),
+                         levels[:, None])
+        before = np.hstack([levels[:, None], after[:, :-1]])
+
+        mean = before.astype(float)
+        mean[rows, cols] = (before[rows, cols] + rollup["sum"][keep]) / (rollup["samples"][keep] + 1)
+        low, high = before.copy(), before.copy()
+        low[rows, cols] = np.minimum(before[rows, cols], rollup["min"][keep])
+        high[rows, cols] = np.maximum(before[rows, cols], rollup["max"][keep])
+
+        numbers = np.arange(first, self.current)
+        slots = numbers % self.capacity
+        self.buckets[slots] = numbers
+        self.area[:, slots] = mean * self.width
+        self.low[:, slots] = low
+        self.high[:, slots] = high
+        self.last[:, slots] = after
+
+    def change(self, row, level, old_level, now):
+        slot = self.current % self.capacity
+        now = max(now, self.since[row])
+        self.area[row, slot] += old_level * (now - self.since[row])
+        self.since[row] = now
+        self.low[row, slot] = min(self.low[row, slot], level)
+        self.high[row, slot] = max(self.high[row, slot], level)
+        self.last[row, slot] = level
+
+    def query(self, row, start, end, width, level, now):
+        """Aggregate [start, end) into width-second buckets for one lot"""
+        first = max(int(start // self.width), self.current - self.capacity + 1)
+        stop = min(-(-int(end) // self.width), self.current + 1)
+        # Never split an output bucket at the edge of what the ring still holds
+        per_bucket = width // self.width
+        first = -(-first // per_bucket) * per_bucket
+        if first >= stop:
+            return None
+        numbers = np.arange(first, stop)
+        slots = numbers % self.capacity
+        valid = self.buckets[slots] == numbers
+        numbers, slots = numbers[valid], slots[valid]
+        if numbers.size == 0:
+            return None
+
+        area = self.area[row, slots]
+        duration = np.full(numbers.size, float(self.width))
+        if numbers[-1] == self.current:
+            # The open bucket has only lasted until now
+            area[-1] += level * (now - self.since[row])
+            duration[-1] = max(now - self.current * self.width, 1e-9)
+
+        groups = numbers // per_bucket
+        starts = np.flatnonzero(np.r_[True, groups[1:] != groups[:-1]])
+        ends = np.r_[starts[1:], numbers.size] - 1
+        return {
+            "t": (groups[starts] * width).tolist(),
+            "mean": np.round(np.add.reduceat(area, starts) /
+                             np.add.reduceat(duration, starts), 2).tolist(),
+            "min": np.minimum.reduceat(self.low[row, slots], starts).tolist(),
+            "max": np.maximum.reduceat(self.high[row, slots], starts).tolist(),
+            "last": self.last[row, slots][ends].tolist()
+        }
+
+
+class OccupancySeries:
+    """Minute and hour occupancy rollups for every lot, updated per change"""
+
+    def __init__(self, lot_counts, now, minute_days=2, hour_days=35):
+        self._lock = threading.Lock()
+        self._rows = {lot_id: row for row, lot_id in enumerate(lot_counts)}
+        self._levels = np.array(list(lot_counts.values()), dtype=np.int64)
+        self._tiers = [_Tier(MINUTE, minute_days * 1440, self._levels, now),
+                       _Tier(HOUR, hour_days * 24, self._levels, now)]
+
+    @property
+    def retention(self):
+        """Seconds of history each bucket width can reach back"""
+        return {tier.width: tier.width * tier.capacity for tier in self._tiers}
+
+    def record(self, lot_counts, now):
+        """Note the occupancy of lots that just changed"""
+        with self._lock:
+            for tier in self._tiers:
+                tier.advance(now, self._levels)
+            for lot_id, level in lot_counts.items():
+                row = self._rows.get(lot_id)
+                if row is None:
+                    row = self._add_lot(lot_id, level, now)
+                old_level = self._levels[row]
+                for tier in self._tiers:
+                    tier.change(row, level, old_level, now)
+                self._levels[row] = level
+
+    def load(self, width, rollup, levels_before):
+        """Fill the closed buckets of the width-second tier from history rollups
+
+        Call before recording any change. rollup is an array of buckets
+        with the fields of occupancy_history.ROLLUP_DTYPE; levels_before maps
+        lot ids to their occupancy before the first bucket, defaulting to the
+        level the series started with. Buckets of lots the series does not
+        hold are skipped.
+        """
+        with self._lock:
+            tier = next(tier for tier in self._tiers if tier.width == width)
+            rows = np.fromiter(map(self._rows.get, rollup["lot_id"], repeat(-1)), np.int64,
+                               count=len(rollup))
+            known = rows >= 0
+            levels = np.array([levels_before.get(lot_id, level)
+                               for lot_id, level in zip(self._rows, self._levels)], np.int64)
+            rollup = rollup[known]
+            tier.load(rows[known], rollup["bucket"] // width, rollup, levels)
+
+    def query(self, lot_id, start, end, width, now):
+        """Columns t/mean/min/max/last for width-second buckets in [start, end)
+
+        width must be a whole number of minutes; whole hours are served from
+        the hour tier. Returns None if the lot has no data in the range.
+        """
+        with self._lock:
+            row = self._rows.get(lot_id)
+            if row is None:
+                return None
+            for tier in self._tiers:
+                tier.advance(now, self._levels)
+            tier = self._tiers[1] if width % HOUR == 0 else self._tiers[0]
+            return tier.query(row, start, min(end, now), width, self._levels[row], now)
+
+    def hourly_means(self, now):
+        """(lot ids, hour start times, means shaped (lots, hours)) for closed hours"""
+        with self._lock:
+            tier = self._tiers[1]
+            tier.advance(now, self._levels)
+            numbers = np.arange(tier.current - tier.capacity + 1, tier.current)
+            slots = numbers % tier.capacity
+            valid = tier.buckets[slots] == numbers
+            numbers, slots = numbers[valid], slots[valid]
+            means = tier.area[:, slots] / tier.width
+            return list(self._rows), numbers * tier.width, means
+
+    def _add_lot(self, lot_id, level, now):
+        row = self._rows[lot_id] = len(self._rows)
+        self._levels = np.append(self._levels, level)
+        for tier in self._tiers:
+            tier.add_lot(level, now)
+        return row
@@ -0,0 +1,243 @@
+"""
+ELC Parking App - Campus Occupancy Simulator
+Author: Jie Liang
+Course: CS2450
+
+Seeded arrival/departure event streams for load and capacity testing,
+from four lots up to thousands of lots and hundreds of thousands of spaces.
+
+Each lot follows a time-of-day demand profile for its permit type
+(students peak late morning, staff fill by 8am and leave at 5pm, ...),
+scaled by the busy-time occupancy in its "simulated_occupancy" range. Every
+step (one simulated minute by default):
+1. Every parked car leaves with the chance implied by the permit type's
+   mean stay, plus extra departures when demand is falling
+2. Arrivals replace departures at the demand level, plus the rise in
+   demand, spread over the lot's free spaces (a full lot turns cars away)
+Both are one Bernoulli draw per space over flat arrays of every space on
+campus, so a step costs a few vectorized passes whatever the lot count.
+The same seed, lots and start time always produce the same events.
+
+replay() plays steps into the server's ingest path, POST /api/events, at a
+chosen multiple of real time. Run this file to replay or to size load:
+    python occupancy_simulator.py --start 2024-01-08T06:00 --minutes 240 \\
+        --speed 60 --url http://localhost:5000
+    python occupancy_simulator.py --synthetic 2000 --write-lots campus.json
+"""
+
+from collections import namedtuple
+from datetime import datetime
+import argparse
+import json
+import sys
+import time
+
+import numpy as np
+
+from campus_lots import LOTS_FILE, load_lots, validate_lots
+
+
+# Share of a lot's busy-time demand present at each hour of a weekday
+DEMAND_PROFILES = {
+    "Student": [0.02, 0.02, 0.02, 0.02, 0.02, 0.05, 0.10, 0.30, 0.65, 0.90, 1.00, 1.00,
+                0.95, 0.90, 0.80, 0.65, 0.45, 0.30, 0.25, 0.25, 0.20, 0.10, 0.05, 0.02],
+    "Staff": [0.02, 0.02, 0.02, 0.02, 0.02, 0.05, 0.25, 0.70, 0.95, 1.00, 1.00, 0.95,
+              0.90, 0.95, 1.00, 0.95, 0.70, 0.30, 0.10, 0.05, 0.05, 0.02, 0.02, 0.02],
+    "Both": [0.02, 0.02, 0.02, 0.02, 0.02, 0.05, 0.15, 0.45, 0.80, 0.95, 1.00, 1.00,
+             0.95, 0.95, 0.90, 0.80, 0.55, 0.30, 0.20, 0.15, 0.10, 0.05, 0.02, 0.02],
+    "Open": [0.05, 0.05, 0.05, 0.05, 0.05, 0.05, 0.10, 0.25, 0.45, 0.65, 0.80, 0.90,
+             1.00, 0.90, 0.80, 0.70, 0.60, 0.65, 0.70, 0.60, 0.40, 0.20, 0.10, 0.05]
+}
+WEEKEND_DEMAND = {"Student": 0.2, "Staff": 0.1, "Both": 0.2, "Open": 0.5}
+STAY_MINUTES = {"Student": 150, "Staff": 420, "Both": 240, "Open": 120}
+BUSY_OCCUPANCY = 0.8  # busy-time share of spaces taken when a lot has no range
+
+# Most events per POST /api/events (the server's MAX_BATCH_EVENTS)
+BATCH_EVENTS = 5000
+
+# One step's events: parallel arrays of lot rows, space indexes and new states
+SimulatedEvents = namedtuple("SimulatedEvents", "time lots spaces occupied")
+
+
+class CampusSimulator:
+    """Vectorized, seeded occupancy model for every space on campus"""
+
+    def __init__(self, lots, seed=None, start=None, step_seconds=60):
+        """lots: lot configs (see campus_lots.py); start: epoch seconds, default now"""
+        self._rng = np.random.default_rng(seed)
+        self.lot_ids = [lot["lot_id"] for lot in lots]
+        self.time = float(time.time() if start is None else start)
+        self.step_seconds = step_seconds
+
+        capacity = np.array([lot["total_spaces"] for lot in lots])
+        self._capacity = capacity
+        self._starts = np.concatenate(([0], np.cumsum(capacity)[:-1]))
+        self._lot_of_space = np.repeat(np.arange(len(lots)), capacity)
+        self._space_in_lot = np.arange(capacity.sum()) - self._starts[self._lot_of_space]
+        self.occupied = np.zeros(capacity.sum(), dtype=bool)
+
+        permit_types = [lot["permit_type"] if lot["permit_type"] in DEMAND_PROFILES else "Open"
+                        for lot in lots]
+        self._weekday = np.array([DEMAND_PROFILES[kind] for kind in permit_types])
+        self._weekend = np.array([WEEKEND_DEMAND[kind] for kind in permit_types])
+        stays = np.array([STAY_MINUTES[kind] for kind in permit_types], dtype=float)
+        self._leave_chance = 1 - np.exp(-step_seconds / 60 / stays)
+        # Busy-time occupied share: the middle of the lot's range, varied per lot
+        busy = np.array([sum(lot["simulated_occupancy"]) / 2 / lot["total_spaces"]
+                         if "simulated_occupancy" in lot else BUSY_OCCUPANCY for lot in lots])
+        self._busy = np.clip(busy * self._rng.uniform(0.9, 1.1, len(lots)), 0, 1)
+
+    @property
+    def total_spaces(self):
+        return int(self._capacity.sum())
+
+    def counts(self):
+        """Occupied spaces per lot"""
+        return np.add.reduceat(self.occupied, self._starts, dtype=np.int64)
+
+    def demand(self, when=None):
+        """Expected occupied spaces per lot at epoch seconds when (default now)"""
+        moment = datetime.fromtimestamp(self.time if when is None else when)
+        position = moment.hour + moment.minute / 60 + moment.second / 3600 - 0.5
+        before = int(np.floor(position)) % 24
+        after = (before + 1) % 24
+        fraction = position - np.floor(position)
+        shape = self._weekday[:, before] * (1 - fraction) + self._weekday[:, after] * fraction
+        if moment.weekday() >= 5:
+            shape = shape * self._weekend
+        return shape * self._busy * self._capacity
+
+    def warm_start(self):
+        """Fill every lot to its expected level at the current time (no events)"""
+        share = self.demand() / self._capacity
+        self.occupied = self._rng.random(self.occupied.size) < share[self._lot_of_space]
+
+    def step(self):
+        """Advance one step and return the events it produced"""
+        now_demand = self.demand()
+        self.time += self.step_seconds
+        change = self.demand() - now_demand
+        counts = self.counts()
+        free = self._capacity - counts
+
+        with np.errstate(divide="ignore", invalid="ignore"):
+            leave = self._leave_chance + np.maximum(-change, 0) / counts
+            arrivals = now_demand * self._leave_chance + np.maximum(change, 0)
+            arrive = arrivals / free
+        leave = np.nan_to_num(np.minimum(leave, 1))
+        arrive = np.nan_to_num(np.minimum(arrive, 1))
+
+        chance = np.where(self.occupied, leave[self._lot_of_space], arrive[self._lot_of_space])
+        flipped = np.flatnonzero(self._rng.random(self.occupied.size) < chance)
+        self.occupied[flipped] ^= True
+        return SimulatedEvents(self.time, self._lot_of_space[flipped],
+                               self._space_in_lot[flipped], self.occupied[flipped])
+
+    def events_json(self, events):
+        """A step's events in the /api/events format"""
+        lot_ids = self.lot_ids
+        return [{"lot_id": lot_ids[lot], "space_index": int(space), "occupied": bool(occupied)}
+                for lot, space, occupied in zip(events.lots.tolist(), events.spaces.tolist(),
+                                                events.occupied.tolist())]
+
+
+def replay(simulator, post, minutes, speed=1.0, batch_size=BATCH_EVENTS,
+           clock=time.monotonic, sleep=time.sleep):
+    """Play minutes of simulation into post(events), speed x faster than real time
+
+    post receives lists of at most batch_size /api/events dicts. A speed of
+    0 plays as fast as post keeps up. Returns totals and the worst lag
+    behind the schedule, in seconds.
+    """
+    steps = int(minutes * 60 // simulator.step_seconds)
+    started = clock()
+    stats = {"steps": steps, "events": 0, "batches": 0, "max_lag": 0.0}
+    for number in range(1, steps + 1):
+        events = simulator.events_json(simulator.step())
+        for offset in range(0, len(events), batch_size):
+            post(events[offset:offset + batch_size])
+            stats["batches"] += 1
+        stats["events"] += len(events)
+        if speed:
+            due = started + number * simulator.step_seconds / speed
+            lag = clock() - due
+            stats["max_lag"] = max(stats["max_lag"], lag)
+            if lag < 0:
+                sleep(-lag)
+    stats["elapsed"] = clock() - started
+    return stats
+
+
+def synthetic_lots(count, seed=None):
+    """A campus of count lots with varied sizes, permits and travel times"""
+    rng = np.random.default_rng(seed)
+    kinds = list(DEMAND_PROFILES)
+    lots = []
+    for number in range(count):
+        total = int(rng.integers(40, 800))
+        busy = float(rng.uniform(0.5, 1.0))
+        lots.append({
+            "lot_id": f"S{number:04d}",
+            "name": f"Lot S{number:04d}",
+            "total_spaces": total,
+            "permit_type": kinds[int(rng.integers(len(kinds)))],
+            "drive_time": int(rng.integers(1, 15)),
+            "walk_time": int(rng.integers(1, 15)),
+            "simulated_occupancy": [int(total * busy * 0.85), int(total * min(busy * 1.15, 1))]
+        })
+    return lots
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Simulate campus parking occupancy")
+    parser.add_argument("--lots-file", default=LOTS_FILE, help="lots.json to simulate")
+    parser.add_argument("--synthetic", type=int, help="simulate this many generated lots instead")
+    parser.add_argument("--write-lots", help="write the simulated lots as a lots.json and exit")
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--start", default=None,
+                        help="local start time, e.g. 2024-01-08T06:00 (default now)")
+    parser.add_argument("--minutes", type=float, default=60)
+    parser.add_argument("--speed", type=float, default=1.0,
+                        help="simulated minutes per real minute (0 = as fast as possible)")
+    parser.add_argument("--warm", action="store_true",
+                        help="start with lots at their expected level instead of empty")
+    parser.add_argument("--url", help="server to replay into, e.g. http://localhost:5000")
+    args = parser.parse_args()
+
+    if args.synthetic:
+        lots = validate_lots({"lots": synthetic_lots(args.synthetic, args.seed)})
+    else:
+        lots = load_lots(args.lots_file)
+    if args.write_lots:
+        with open(args.write_lots, "w", encoding="utf-8") as f:
+            json.dump({"lots": lots}, f, indent=2)
+        print(f"Wrote {len(lots)} lots to {args.write_lots}")
+        return
+
+    start = datetime.fromisoformat(args.start).timestamp() if args.start else None
+    simulator = CampusSimulator(lots, seed=args.seed, start=start)
+    if args.warm:
+        simulator.warm_start()
+    print(f"Simulating {len(lots)} lots, {simulator.total_spaces} spaces, "
+          f"{args.minutes:g} minutes from {datetime.fromtimestamp(simulator.time):%Y-%m-%d %H:%M}")
+
+    if args.url:
+        from api_client import ApiClient
+        client = ApiClient(args.url.rstrip("/") + "/api")
+
+        def post(events):
+            response = client.post("/events", {"events": events})
+            if response.status_code != 200:
+                sys.exit(f"Server rejected a batch: {response.status_code} {response.text[:200]}")
+    else:
+        def post(events):
+            pass
+
+    stats = replay(simulator, post, args.minutes, speed=args.speed)
+    rate = stats["events"] / max(stats["elapsed"], 1e-9)
+    print(f"{stats['events']} events in {stats['batches']} batches over {stats['elapsed']:.1f} s "
+          f"({rate:.0f} events/s), worst lag {max(stats['max_lag'], 0):.2f} s")
+
+
+if __name__ == "__main__":
+    main()
@@ -10,7 +10,9 @@
 # - Encapsulation: Private attributes with @property decorators
 # - Singleton: Single ParkingSystem instance for data consistency
 #
-# CLASSES: UserType, ParkingStatus, ParkingLot, User, ParkingSystem, ParkingAppGUI
+# CLASSES: UserType, ParkingStatus, ParkingLot, User, ParkingSystem,
+#          MainThreadDispatcher, RefreshWorker, LotCard, VirtualLotGrid,
+#          ParkingAppGUI
 
 
 # Import required libraries for GUI, datetime handling, networking (requests),
@@ -19,15 +21,44 @@ import tkinter as tk
 from tkinter import ttk, messagebox
 from datetime import datetime
 from enum import Enum
+import json
+import math
+import os
+import queue
 import random
 import requests
 import threading
 import time
+from api_client import ApiClient
+from campus_lots import LOTS_FILE, config_version, load_lots, validate_lots
+from permits import PERMIT_BITS, PermitIndex, compile_rules, rules_allow
 
 # Server configuration to connect to parking_server.py
 SERVER_URL = "http://localhost:5000"
 API_BASE = f"{SERVER_URL}/api"
 
+# Last lot config downloaded from /api/config, so later starts only revalidate it
+CONFIG_CACHE = os.environ.get(
+    "ELC_CONFIG_CACHE", os.path.join(os.path.expanduser("~"), ".elc_parking", "lots_config.json"))
+
+# How often the Tk main loop applies results posted by background threads (ms)
+UPDATE_POLL_MS = 50
+
+# Seconds between polls while the push stream is unavailable
+REFRESH_INTERVAL = 10
+
+# The server sends a keep-alive every 15 s, so a silent stream is a dead one
+STREAM_READ_TIMEOUT = 30
+
+# Lot grid layout: cards per row and the height of a row of cards (pixels)
+GRID_COLUMNS = 2
+CARD_HEIGHT = 260
+CARD_PAD = 10
+
+# Filter choice in the dashboard that turns a filter off; the permit
+# filter lists it before the permit types in the lot config
+ALL = "All"
+
 
 # Enum: Limit user type to prevent invalid values
 class UserType(Enum):
@@ -48,15 +79,31 @@ class ParkingStatus(Enum):
 
 # Represents a parking lot with capacity tracking
 # Encapsulation: parkinglot data and behavior together
+# __slots__: no per-lot __dict__, campuses can have thousands of lots
 class ParkingLot:
+    __slots__ = ("_lot_id", "_name", "_total_spaces", "_occupied_spaces", "_permit_type",
+                 "_permit_rules", "_drive_time", "_walk_time", "_predicted_available",
+                 "_simulated_low", "_simulated_high")
 
-    def __init__(self, lot_id, name, total_spaces, permit_type, drive_time):
+    def __init__(self, lot_id, name, total_spaces, permit_type, drive_time, walk_time=0,
+                 permit_rules=None, simulated_occupancy=None):
         self._lot_id = lot_id
         self._name = name
         self._total_spaces = total_spaces
         self._occupied_spaces = 0
         self._permit_type = permit_type  # "Student", "Staff", "Both", "Open"
+        self._permit_rules = compile_rules(permit_type, permit_rules)  # see permits.py
         self._drive_time = drive_time
+        self._walk_time = walk_time  # minutes from the lot to the ELC
+        self._predicted_available = None  # free spaces expected on arrival
+        # Occupied spaces to draw from when simulating without a server
+        self._simulated_low, self._simulated_high = simulated_occupancy or (0, total_spaces)
+    # Build a lot from its entry in lots.json or /api/config (see campus_lots.py)
+    @classmethod
+    def from_config(cls, config):
+        return cls(config["lot_id"], config["name"], config["total_spaces"],
+                   config["permit_type"], config["drive_time"], config["walk_time"],
+                   config.get("permit_rules"), config.get("simulated_occupancy"))
     
     @property
     def lot_id(self):
@@ -78,10 +125,22 @@ class ParkingLot:
     def permit_type(self):
         return self._permit_type
     
+    @property
+    def permit_rules(self):
+        return self._permit_rules
+    
     @property
     def drive_time(self):
         return self._drive_time
     
+    @property
+    def walk_time(self):
+        return self._walk_time
+    
+    @property
+    def predicted_available(self):
+        return self._predicted_available
+    
     # Determine lot status based on availability
     def get_status(self):
         availability_ratio = self.available_spaces / self._total_spaces
@@ -108,24 +167,30 @@ class ParkingLot:
     # Update occupied spaces
     def update_occupancy(self, occupied):
         self._occupied_spaces = max(0, min(occupied, self._total_spaces))
+    # Pick a plausible occupancy when the server is unavailable
+    def simulate_occupancy(self):
+        self.update_occupancy(random.randint(self._simulated_low, self._simulated_high))
+    # Update the server's forecast of free spaces when the driver arrives
+    def update_prediction(self, available):
+        if available is not None:
+            available = max(0, min(available, self._total_spaces))
+        self._predicted_available = available
     # Check if user can park based on permit type
-    def can_user_park(self, user_type):
-        if self._permit_type == "Open":
-            return True
-        elif self._permit_type == "Both":
-            return user_type in [UserType.STUDENT, UserType.STAFF]
-        elif self._permit_type == "Student":
-            return user_type == UserType.STUDENT
-        elif self._permit_type == "Staff":
-            return user_type == UserType.STAFF
-        return False
+    def can_user_park(self, user_type, when=None):
+        return self.admits(PERMIT_BITS[user_type.value], when)
+    # Check if any of the permits in a permit bitmask is valid here at when
+    def admits(self, permit_mask, when=None):
+        return rules_allow(self._permit_rules, permit_mask, when)
 
 # Represents a user with a specific type of parking permit 
 class User:   
+    __slots__ = ("_user_id", "_name", "_user_type", "_permit_mask")
+
     def __init__(self, user_id, name, user_type):
         self._user_id = user_id
         self._name = name
         self._user_type = user_type
+        self._permit_mask = PERMIT_BITS[user_type.value]  # bit per permit held
     
     @property
     def name(self):
@@ -135,9 +200,36 @@ class User:
     def user_type(self):
         return self._user_type
     
+    @property
+    def permit_mask(self):
+        return self._permit_mask
+    
     # Based on the user's parking permit,shows the lots they can access
     def get_permitted_lots(self, all_lots):
-        return [lot for lot in all_lots if lot.can_user_park(self._user_type)]
+        return [lot for lot in all_lots if lot.admits(self._permit_mask)]
+
+# The cached {"etag", "config"} from CONFIG_CACHE, or None if missing or invalid
+def load_config_cache(path=None):
+    try:
+        with open(path or CONFIG_CACHE, encoding="utf-8") as f:
+            cached = json.load(f)
+        validate_lots(cached["config"])
+        return cached
+    except (OSError, ValueError, KeyError, TypeError):
+        return None
+# Write the cache atomically (a crash never leaves half a file); best effort.
+# Fetches on different threads may save at once, so writes take turns
+_CACHE_LOCK = threading.Lock()
+def save_config_cache(cached, path=None):
+    path = path or CONFIG_CACHE
+    try:
+        with _CACHE_LOCK:
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            with open(path + ".tmp", "w", encoding="utf-8") as f:
+                json.dump(cached, f)
+            os.replace(path + ".tmp", path)
+    except OSError:
+        pass
 
 # be a clients side of the parking system to communicate
 # with parking lots availability for user
@@ -156,70 +248,510 @@ class ParkingSystem:
             return
         self._initialized = True
         self._lots = []
+        self._lots_by_id = {}  # lot id -> lot, so updates find lots in O(1)
+        self._lots_by_permit = {}  # permit type -> lots, in list order
         self._server_connected = False
+        self._lots_etag = None  # version of the last /api/lots we applied
+        self._rankings = {}  # user type value -> lot ids, best first (from the server)
+        self._rankings_etag = None
+        self._permit_index = None  # built on first use, reset when lots change
+        self._config_version = None  # version of the lot config in use
+        self._config_etag = None
+        self._api = ApiClient(API_BASE)  # pooled keep-alive connections
         self._initialize_lots()
-    # Initialize the 4 parking lots near ELC
+    # Initialize the lots from the last downloaded config, or the lots.json
+    # shipped with the app; the server's /api/config replaces them once reached
     def _initialize_lots(self):
-        self._lots = [
-            ParkingLot("17", "Lot 17", 35, "Student", 2),
-            ParkingLot("18", "Lot 18", 45, "Staff", 1),
-            ParkingLot("19", "Lot 19", 60, "Both", 2),
-            ParkingLot("14", "Lot 14", 50, "Open", 3)
-        ]
+        cached = load_config_cache()
+        if cached is not None:
+            self._config_etag = cached.get("etag")
+            self.apply_config(cached["config"])
+        else:
+            lots = load_lots(LOTS_FILE)
+            self.apply_config({"version": config_version(lots), "lots": lots})
+    # Replace the lots with those of a config document ({"version", "lots"}),
+    # keeping the occupancy already known for lots that stay
+    def apply_config(self, config):
+        old_lots = {lot.lot_id: lot for lot in self._lots}
+        lots = []
+        for lot_config in validate_lots(config):
+            lot = ParkingLot.from_config(lot_config)
+            old = old_lots.get(lot.lot_id)
+            if old is not None:
+                lot.update_occupancy(old.total_spaces - old.available_spaces)
+                lot.update_prediction(old.predicted_available)
+            lots.append(lot)
+        self._set_lots(lots)
+        self._config_version = config["version"]
+    # Replace the lot list and rebuild the indexes over it
+    def _set_lots(self, lots):
+        by_permit = {}
+        for lot in lots:
+            by_permit.setdefault(lot.permit_type, []).append(lot)
+        self._lots = lots
+        self._lots_by_id = {lot.lot_id: lot for lot in lots}
+        self._lots_by_permit = by_permit
+        self._permit_index = None
+    # Fetch /api/config if it changed since the copy we hold and apply it
+    # (on the main thread); True if the server answered
+    def refresh_config(self):
+        update = {}
+        answered = self._fetch_config(update)
+        self.apply_update(update)
+        return answered
+    # Add /api/config to update if it changed since the copy we hold, and
+    # cache it; True if the server answered
+    def _fetch_config(self, update):
+        try:
+            response = self._api.get("/config", self._config_etag)
+            if response.status_code == 200:
+                config = response.json()
+                validate_lots(config)
+                update["config"] = config
+                update["config_etag"] = response.headers.get("ETag")
+                save_config_cache({"etag": update["config_etag"], "config": config})
+            return response.status_code in (200, 304)
+        except (requests.RequestException, ValueError, KeyError, TypeError):
+            return False
     # Get all parking lots
     def get_all_lots(self):
         return self._lots
     # Get specific lot by ID
     def get_lot_by_id(self, lot_id):
-        for lot in self._lots:
-            if lot.lot_id == lot_id:
-                return lot
-        return None
+        return self._lots_by_id.get(lot_id)
+    # Get the lots with a permit type ("Student", "Staff", ...), in list order
+    def get_lots_by_permit_type(self, permit_type):
+        return list(self._lots_by_permit.get(permit_type, ()))
+    # Get the permit types the configured lots use, in list order
+    def get_permit_types(self):
+        return list(self._lots_by_permit)
     # Check if server is available
     def check_server_connection(self):
         try:
-            response = requests.get(f"{API_BASE}/lots", timeout=2)
+            response = self._api.get("/lots")
             self._server_connected = response.status_code == 200
             return self._server_connected
         except:
             self._server_connected = False
             return False
-    # Refresh parking data from server or simulate
+    # Refresh parking data from server or simulate, on the calling thread.
+    # Background threads use fetch_data and post the update instead
     def refresh_data(self):
+        return self.apply_update(self.fetch_data())
+    # Fetch what a refresh needs without touching the model, so it is safe
+    # on any thread; returns an update for apply_update. Sends the last ETag
+    # so an unchanged server answers 304 with no body
+    def fetch_data(self):
+        update = {}
         try:
-            response = requests.get(f"{API_BASE}/lots", timeout=2)
+            response = self._api.get("/lots", self._lots_etag, params={"view": "occupancy"})
+            if response.status_code not in (200, 304):
+                return {"server": False}
+            if response.headers.get("X-Lot-Config") != self._config_version:
+                self._fetch_config(update)
             if response.status_code == 200:
-                lots_data = response.json()
-                for lot_data in lots_data:
-                    lot = self.get_lot_by_id(lot_data['lot_id'])
-                    if lot:
-                        lot.update_occupancy(lot_data['occupied_spaces'])
-                self._server_connected = True
-                return True
-        except:
+                self._add_lot_updates(update, response.json())
+                update["lots_etag"] = response.headers.get("ETag")
+            update["server"] = True
+            self._fetch_recommendations(update)
+            return update
+        except Exception:
             # Simulate data if server unavailable
+            return {"server": False, "simulate": True}
+    # Apply an update from fetch_data, refresh_* or the push stream to the
+    # model; returns whether the server is connected. The GUI reads the
+    # model on the main thread, so call this there (the dispatcher does)
+    def apply_update(self, update):
+        if "config" in update:
+            self.apply_config(update["config"])
+            self._config_etag = update["config_etag"]
+        if "lots" in update:
+            self._apply_lot_updates(update["lots"])
+        if "lots_etag" in update:
+            self._lots_etag = update["lots_etag"]
+        if "rankings" in update:
+            self._rankings = update["rankings"]
+            self._rankings_etag = update["rankings_etag"]
+        if update.get("simulate"):
+            self._lots_etag = None  # simulated data no longer matches the server
+            self._rankings = {}
             for lot in self._lots:
-                if lot.lot_id == "17":
-                    lot.update_occupancy(random.randint(28, 35))
-                elif lot.lot_id == "18":
-                    lot.update_occupancy(random.randint(40, 45))
-                elif lot.lot_id == "19":
-                    lot.update_occupancy(random.randint(45, 60))
-                else:  # Lot 14
-                    lot.update_occupancy(random.randint(15, 40))
-            self._server_connected = False
+                lot.simulate_occupancy()
+        if "server" in update:
+            self._server_connected = update["server"]
+        return self._server_connected
+    # Run a call (e.g. refresh_data) on the client's background threads so
+    # the GUI never waits on the network; returns a Future
+    def submit(self, fn, *args):
+        return self._api.submit(fn, *args)
+    # Release the pooled connections and background threads
+    def close(self):
+        self._api.close()
+    # Fetch the server's ranking of lots for every user type (best first)
+    # and apply it (on the main thread)
+    def refresh_recommendations(self):
+        update = {}
+        answered = self._fetch_recommendations(update)
+        self.apply_update(update)
+        return answered
+    # Add the server's rankings to update if they changed; True if it answered
+    def _fetch_recommendations(self, update):
+        try:
+            response = self._api.get("/recommendations", self._rankings_etag)
+            if response.status_code == 200:
+                update["rankings"] = response.json()["rankings"]
+                update["rankings_etag"] = response.headers.get("ETag")
+            return response.status_code in (200, 304)
+        except (requests.RequestException, ValueError, KeyError):
+            update["rankings"] = {}
+            update["rankings_etag"] = None
             return False
+    # Add lot summaries from /api/lots or the push stream to update. A lot
+    # we have no config for means the config changed: fetch that too
+    def _add_lot_updates(self, update, lots_data):
+        lots_by_id = self._lots_by_id
+        if "config" not in update and \
+                any(lot_data['lot_id'] not in lots_by_id for lot_data in lots_data):
+            self._fetch_config(update)
+        update["lots"] = lots_data
+    # Apply lot summaries to the model; lots we have no config for are skipped
+    def _apply_lot_updates(self, lots_data):
+        lots_by_id = self._lots_by_id
+        for lot_data in lots_data:
+            lot = lots_by_id.get(lot_data['lot_id'])
+            if lot:
+                lot.update_occupancy(lot_data['occupied_spaces'])
+                # Only /api/lots carries forecasts; stream updates keep the last one
+                if 'predicted_available_at_arrival' in lot_data:
+                    lot.update_prediction(lot_data['predicted_available_at_arrival'])
+    # Follow the server's push stream (/api/stream), calling on_update with
+    # an update for apply_update after each event; the model is not touched
+    # here. Blocks until the connection drops (returns False) or
+    # should_stop() returns True; callers fall back to polling after that.
+    # Rankings change with every write, so they are refetched at most once
+    # per REFRESH_INTERVAL rather than after every event
+    def listen_for_changes(self, on_update, should_stop):
+        rankings_fetched = None
+        try:
+            with self._api.stream("/stream", STREAM_READ_TIMEOUT) as response:
+                if response.status_code != 200:
+                    return False
+                data_lines = []
+                for line in response.iter_lines(decode_unicode=True):
+                    if should_stop():
+                        return True
+                    if line.startswith("data:"):
+                        data_lines.append(line[5:].strip())
+                    elif not line and data_lines:
+                        # Blank line ends an event
+                        update = {"server": True}
+                        self._add_lot_updates(update, json.loads("\n".join(data_lines))["lots"])
+                        data_lines = []
+                        now = time.monotonic()
+                        if rankings_fetched is None or now - rankings_fetched >= REFRESH_INTERVAL:
+                            rankings_fetched = now
+                            self._fetch_recommendations(update)
+                        on_update(update)
+        except (requests.RequestException, ValueError, KeyError):
+            pass
+        return False
+    # Which lots each permit mask may use, precomputed until lot config changes
+    def get_permit_index(self):
+        if self._permit_index is None:
+            self._permit_index = PermitIndex((lot, lot.permit_rules) for lot in self._lots)
+        return self._permit_index
     # Check if currently connected to server
     def is_server_connected(self):
         return self._server_connected
-    # Get lots user is permitted to park in
+    # Get lots user is permitted to park in, best first: the server's ranking
+    # (availability, forecast, drive and walk time) when connected,
+    # otherwise list order
     def get_recommended_lots(self, user_type):
-        return [lot for lot in self._lots if lot.can_user_park(user_type)]
+        permitted = list(self.get_permit_index().eligible(PERMIT_BITS[user_type.value]))
+        ranking = self._rankings.get(user_type.value) if self._server_connected else None
+        if not ranking:
+            return permitted
+        position = {lot_id: rank for rank, lot_id in enumerate(ranking)}
+        return sorted(permitted, key=lambda lot: position.get(lot.lot_id, len(position)))
+
+
+# Runs callbacks posted from any thread on the Tk main loop. Tk is not
+# thread-safe, so background threads never touch widgets (or call
+# root.after) themselves: they post, and process() drains the queue from
+# a root.after timer on the main thread
+class MainThreadDispatcher:
+    def __init__(self, root, interval_ms=UPDATE_POLL_MS):
+        self._root = root
+        self._interval_ms = interval_ms
+        self._queue = queue.Queue()
+        self._running = False
+    # Queue callback(*args) for the main thread; safe from any thread
+    def post(self, callback, *args):
+        self._queue.put((callback, args))
+    # Queue callback(result) for when a Future finishes without error
+    def post_result(self, future, callback):
+        def done(future):
+            if not future.cancelled() and future.exception() is None:
+                self.post(callback, future.result())
+        future.add_done_callback(done)
+    # Start draining the queue (call on the main thread)
+    def start(self):
+        if not self._running:
+            self._running = True
+            self._root.after(self._interval_ms, self.process)
+    # Stop draining; anything still queued is dropped
+    def stop(self):
+        self._running = False
+    # Apply everything posted so far, then check again after interval_ms.
+    # Back-to-back identical updates (e.g. a burst of stream events) are
+    # applied once
+    def process(self):
+        last = None
+        try:
+            while self._running:
+                try:
+                    item = self._queue.get_nowait()
+                except queue.Empty:
+                    break
+                if item != last:
+                    callback, args = item
+                    callback(*args)
+                    last = item
+        finally:
+            if self._running:
+                self._root.after(self._interval_ms, self.process)
 
 
+# Background thread that keeps ParkingSystem current: follows the server's
+# push stream while it is available and polls every interval seconds
+# otherwise. It only fetches: each update is posted to the dispatcher, which
+# applies it to the model and redraws (on_live() after a stream event,
+# on_refresh(server_used) after a poll) on the main thread
+class RefreshWorker:
+    def __init__(self, parking_system, dispatcher, on_live, on_refresh,
+                 interval=REFRESH_INTERVAL):
+        self._parking_system = parking_system
+        self._dispatcher = dispatcher
+        self._on_live = on_live
+        self._on_refresh = on_refresh
+        self._interval = interval
+        self._stop = threading.Event()
+        self._thread = None
+    # Start the thread (once)
+    def start(self):
+        if self._thread is None:
+            self._thread = threading.Thread(target=self.run, daemon=True)
+            self._thread.start()
+    # Ask the thread to finish; it wakes at once unless a request is in flight
+    def stop(self):
+        self._stop.set()
+    def is_alive(self):
+        return self._thread is not None and self._thread.is_alive()
+    def join(self, timeout=None):
+        if self._thread is not None:
+            self._thread.join(timeout)
+    def run(self):
+        connected = self._parking_system.is_server_connected()
+        while not self._stop.is_set():
+            if connected:
+                # Returns only once the stream drops
+                try:
+                    stopped = self._parking_system.listen_for_changes(
+                        lambda update: self._dispatcher.post(self._apply_live, update),
+                        self._stop.is_set)
+                except Exception:
+                    stopped = False
+                if not stopped:
+                    # Stop trusting the server's ranking until a poll reaches it
+                    self._dispatcher.post(self._parking_system.apply_update, {"server": False})
+            if self._stop.wait(self._interval):
+                break
+            try:
+                update = self._parking_system.fetch_data()
+            except Exception:
+                continue
+            connected = update["server"]
+            self._dispatcher.post(self._apply_refresh, update)
+    # Main thread: apply a stream update, then redraw
+    def _apply_live(self, update):
+        self._parking_system.apply_update(update)
+        self._on_live()
+    # Main thread: apply a poll's update, then redraw
+    def _apply_refresh(self, update):
+        self._on_refresh(self._parking_system.apply_update(update))
+
 
 # Interface CLASSES
-#
+
+# Lots whose id or name contains query (ignoring case) and that match the
+# permit type and status filters (None or "All" matches every lot)
+def filter_lots(lots, query="", permit_type=None, status=None):
+    query = query.strip().lower()
+    return [lot for lot in lots
+            if (not query or query in lot.lot_id.lower() or query in lot.name.lower())
+            and permit_type in (None, ALL, lot.permit_type)
+            and status in (None, ALL, lot.get_status().value)]
+# Indexes of the items in view when count items are laid out columns per
+# row, each row row_height high, and the view shows [top, top + height)
+def visible_range(count, columns, row_height, top, height):
+    first_row = max(int(top // row_height), 0)
+    last_row = math.ceil((top + height) / row_height)
+    return range(min(first_row * columns, count), min(last_row * columns, count))
+# What a lot's card shows, as {(widget name, option): value}. LotCard
+# applies only the entries that differ from what is already on screen
+def lot_card_view(lot, priority):
+    color = lot.get_status_color()
+    predicted = lot.predicted_available
+    return {
+        ("header", "bg"): color,
+        ("priority", "bg"): color,
+        ("priority", "text"): f"#{priority} PRIORITY" if priority == 1 else f"Option #{priority}",
+        ("status", "bg"): color,
+        ("status", "text"): f"● {lot.get_status().value.upper()}",
+        ("name", "text"): f"LOT {lot.lot_id}",
+        ("permit", "text"): lot.permit_type.upper() + " PARKING",
+        ("available", "text"): f"{lot.available_spaces} / {lot.total_spaces}",
+        ("available", "fg"): color,
+        ("fill", "bg"): color,
+        ("fill", "width"): int((lot.available_spaces / lot.total_spaces) * 300),
+        ("drive", "text"): f"🚗 {lot.drive_time} min drive · 🚶 {lot.walk_time} min walk",
+        # Forecast for when the driver gets there, not just right now
+        ("prediction", "text"): "" if predicted is None else f"≈ {predicted} free on arrival"
+    }
+# The entries of view that differ from shown
+def changed_options(shown, view):
+    return {key: value for key, value in view.items() if shown.get(key) != value}
+
+
+# A lot's card, built once and then updated in place: a refresh, a new
+# ranking or showing a different lot in it (see VirtualLotGrid) only
+# reconfigures the labels, colors and progress width that changed
+class LotCard:
+    def __init__(self, parent):
+        self.frame = tk.Frame(parent, bg="white", relief=tk.RAISED, bd=2)
+        self._shown = {}  # (widget name, option) -> value on screen
+        
+        # Header with priority
+        header = tk.Frame(self.frame, height=40)
+        header.pack(fill=tk.X)
+        header.pack_propagate(False)
+        priority = tk.Label(header, font=("Arial", 9, "bold"), fg="white")
+        priority.pack(side=tk.LEFT, padx=10, pady=8)
+        status = tk.Label(header, font=("Arial", 9, "bold"), fg="white")
+        status.pack(side=tk.RIGHT, padx=10, pady=8)
+        
+        # Content
+        content = tk.Frame(self.frame, bg="white")
+        content.pack(fill=tk.BOTH, expand=True, padx=15, pady=15)
+        
+        # Lot name
+        name = tk.Label(content, font=("Arial", 20, "bold"), bg="white")
+        name.pack(anchor=tk.W)
+        permit = tk.Label(content, font=("Arial", 9), bg="white", fg="#666")
+        permit.pack(anchor=tk.W, pady=(0, 10))
+        
+        # Availability
+        avail_frame = tk.Frame(content, bg="white")
+        avail_frame.pack(fill=tk.X, pady=10)
+        available = tk.Label(avail_frame, font=("Arial", 24, "bold"), bg="white")
+        available.pack(side=tk.LEFT)
+        tk.Label(
+            avail_frame,
+            text="spaces\navailable",
+            font=("Arial", 9),
+            bg="white",
+            fg="#666",
+            justify=tk.LEFT
+        ).pack(side=tk.LEFT, padx=10)
+        
+        # Progress bar
+        progress_frame = tk.Frame(content, bg="#e0e0e0", height=20)
+        progress_frame.pack(fill=tk.X, pady=10)
+        progress_frame.pack_propagate(False)
+        fill = tk.Frame(progress_frame)
+        fill.pack(side=tk.LEFT, fill=tk.Y)
+        
+        # Dshows the drive time TO the parking lot
+        details_frame = tk.Frame(content, bg="white")
+        details_frame.pack(fill=tk.X, pady=10)
+        drive = tk.Label(details_frame, font=("Arial", 10), bg="white", fg="#666")
+        drive.pack(side=tk.LEFT, padx=5)
+        prediction = tk.Label(details_frame, font=("Arial", 10, "bold"), bg="white", fg="#666")
+        prediction.pack(side=tk.RIGHT, padx=5)
+        
+        self._widgets = {"header": header, "priority": priority, "status": status,
+                         "name": name, "permit": permit, "available": available,
+                         "fill": fill, "drive": drive, "prediction": prediction}
+    # Show lot as the priority-th choice; returns how many options changed
+    def update(self, lot, priority):
+        changes = changed_options(self._shown, lot_card_view(lot, priority))
+        by_widget = {}
+        for (name, option), value in changes.items():
+            by_widget.setdefault(name, {})[option] = value
+        for name, options in by_widget.items():
+            self._widgets[name].configure(**options)
+        self._shown.update(changes)
+        return len(changes)
+    # Destroy the card's widgets
+    def destroy(self):
+        self.frame.destroy()
+
+
+# Scrollable lot grid that only has widgets for the rows in view. A pool
+# of LotCards, placed on a Canvas, is bound to whichever lots are visible
+# and rebound while scrolling, so the number of widgets and the cost of a
+# redraw depend on the window size, not on how many lots there are
+class VirtualLotGrid:
+    def __init__(self, parent, columns=GRID_COLUMNS, row_height=CARD_HEIGHT + 2 * CARD_PAD):
+        self._columns = columns
+        self._row_height = row_height
+        self._lots = []
+        self._pool = []  # (LotCard, canvas window item), reused in order
+        self.canvas = tk.Canvas(parent, bg="#f5f5f5", highlightthickness=0)
+        scrollbar = ttk.Scrollbar(parent, orient=tk.VERTICAL, command=self.yview)
+        self.canvas.configure(yscrollcommand=scrollbar.set)
+        scrollbar.pack(side=tk.RIGHT, fill=tk.Y)
+        self.canvas.pack(side=tk.LEFT, fill=tk.BOTH, expand=True)
+        self.canvas.bind("<Configure>", lambda event: self.redraw())
+        # Wheel events go to the card under the pointer, so listen app-wide
+        self.canvas.bind_all("<MouseWheel>", lambda event: self.yview(
+            "scroll", -1 if event.delta > 0 else 1, "units"))
+        self.canvas.bind_all("<Button-4>", lambda event: self.yview("scroll", -1, "units"))
+        self.canvas.bind_all("<Button-5>", lambda event: self.yview("scroll", 1, "units"))
+    # Show lots in this order (best first)
+    def set_lots(self, lots):
+        self._lots = lots
+        rows = math.ceil(len(lots) / self._columns)
+        self.canvas.configure(scrollregion=(0, 0, 0, rows * self._row_height),
+                              yscrollincrement=self._row_height // 4)
+        self.redraw()
+    # Scrollbar and mouse wheel commands
+    def yview(self, *args):
+        self.canvas.yview(*args)
+        self.redraw()
+    # Bind the card pool to the lots in view; returns how many are shown
+    def redraw(self):
+        width = self.canvas.winfo_width()
+        top = self.canvas.canvasy(0)
+        visible = visible_range(len(self._lots), self._columns, self._row_height,
+                                top, self.canvas.winfo_height())
+        card_width = max(width // self._columns - 2 * CARD_PAD, 1)
+        while len(self._pool) < len(visible):
+            card = LotCard(self.canvas)
+            item = self.canvas.create_window(0, 0, window=card.frame, anchor=tk.NW)
+            self._pool.append((card, item))
+        for (card, item), idx in zip(self._pool, visible):
+            row, column = divmod(idx, self._columns)
+            card.update(self._lots[idx], idx + 1)
+            self.canvas.coords(item, column * (width // self._columns) + CARD_PAD,
+                               row * self._row_height + CARD_PAD)
+            self.canvas.itemconfigure(item, width=card_width, height=CARD_HEIGHT,
+                                      state=tk.NORMAL)
+        for card, item in self._pool[len(visible):]:
+            self.canvas.itemconfigure(item, state=tk.HIDDEN)
+        return len(visible)
+
+
 # Main GUI application
 # OOP PRINCIPLE: Separation of concerns - 
 # GUI separate user interface from data model
@@ -240,13 +772,34 @@ class ParkingAppGUI:
         self.current_user = None
         self.user_type = UserType.STUDENT  # Default
         
+        # Background results are applied on this (the Tk) thread
+        self.dispatcher = MainThreadDispatcher(root)
+        
         # Auto-refresh
-        self.auto_refresh_enabled = True
-        self.refresh_thread = None
+        self.refresh_worker = None
         
-        # Check server on startup
-        server_available = self.parking_system.check_server_connection()
-        if not server_available:
+        # Create UI
+        self.create_header()
+        self.create_user_selection()
+        self.create_main_dashboard()
+        self.create_footer()
+        
+        # Initial load in the background: the window is shown right away and
+        # fills in (or warns about the server) once the first fetch returns
+        self.display_lots()
+        self.update_label.configure(text="Connecting to server...")
+        self.dispatcher.post_result(self.parking_system.submit(self.parking_system.fetch_data),
+                                    self.on_first_load)
+        self.dispatcher.start()
+        
+        # Handle window close
+        self.root.protocol("WM_DELETE_WINDOW", self.on_closing)
+    
+    def on_first_load(self, update):
+        """Show the first data and start auto-refresh"""
+        server_used = self.parking_system.apply_update(update)
+        self.show_refresh(server_used)
+        if not server_used:
             messagebox.showwarning(
                 "Server Not Available",
                 "Cannot connect to parking server.\n\n"
@@ -256,20 +809,8 @@ class ParkingAppGUI:
                 "2. then Restart this app"
             )
         
-        # Create UI
-        self.create_header()
-        self.create_user_selection()
-        self.create_main_dashboard()
-        self.create_footer()
-        
-        # Initial load
-        self.refresh_parking_data()
-        
         # Start auto-refresh
         self.start_auto_refresh()
-        
-        # Handle window close
-        self.root.protocol("WM_DELETE_WINDOW", self.on_closing)
     # Create application header
     def create_header(self):
         header_frame = tk.Frame(self.root, bg="#2196F3", height=80)
@@ -341,9 +882,33 @@ class ParkingAppGUI:
         )
         self.update_label.pack(anchor=tk.W, pady=(0, 10))
         
-        # Lots grid
+        # Search and filters; any change redraws the list
+        filter_frame = tk.Frame(self.dashboard_frame, bg="#f5f5f5")
+        filter_frame.pack(fill=tk.X, pady=(0, 10))
+        self.search_var = tk.StringVar()
+        self.permit_filter = tk.StringVar(value=ALL)
+        self.status_filter = tk.StringVar(value=ALL)
+        
+        tk.Label(filter_frame, text="Search:", font=("Arial", 10), bg="#f5f5f5").pack(side=tk.LEFT)
+        tk.Entry(filter_frame, textvariable=self.search_var, width=20).pack(side=tk.LEFT, padx=5)
+        tk.Label(filter_frame, text="Permit:", font=("Arial", 10), bg="#f5f5f5").pack(side=tk.LEFT, padx=(10, 0))
+        self.permit_choices = self.permit_filter_choices()
+        self.permit_combo = ttk.Combobox(filter_frame, textvariable=self.permit_filter,
+                                         values=self.permit_choices, state="readonly", width=10)
+        self.permit_combo.pack(side=tk.LEFT, padx=5)
+        tk.Label(filter_frame, text="Status:", font=("Arial", 10), bg="#f5f5f5").pack(side=tk.LEFT, padx=(10, 0))
+        ttk.Combobox(filter_frame, textvariable=self.status_filter,
+                     values=(ALL,) + tuple(status.value for status in ParkingStatus),
+                     state="readonly", width=10).pack(side=tk.LEFT, padx=5)
+        self.count_label = tk.Label(filter_frame, text="", font=("Arial", 9), bg="#f5f5f5", fg="#666")
+        self.count_label.pack(side=tk.RIGHT)
+        for var in (self.search_var, self.permit_filter, self.status_filter):
+            var.trace_add("write", lambda *args: self.display_lots())
+        
+        # Lots grid: scrollable, with widgets only for the rows in view
         self.lots_container = tk.Frame(self.dashboard_frame, bg="#f5f5f5")
         self.lots_container.pack(fill=tk.BOTH, expand=True)
+        self.lot_grid = VirtualLotGrid(self.lots_container)
     
     def create_footer(self):
         """Create footer with refresh button"""
@@ -379,156 +944,75 @@ class ParkingAppGUI:
         self.display_lots()
     
     def refresh_parking_data(self):
-        """Refresh parking data from system"""
-        # Fetch data (from server or simulate)
-        server_used = self.parking_system.refresh_data()
-        
+        """Fetch parking data in the background, then apply it and redraw here"""
+        self.dispatcher.post_result(self.parking_system.submit(self.parking_system.fetch_data),
+                                    self.apply_refresh)
+    
+    def apply_refresh(self, update):
+        """Apply fetched data to the model on the main thread, then redraw"""
+        self.show_refresh(self.parking_system.apply_update(update))
+    
+    def show_refresh(self, server_used):
+        """Redraw after a refresh (from server or simulated)"""
         # Update display
         self.display_lots()
         
         # Update timestamp
+        self.update_timestamp("server" if server_used else "simulated")
+    
+    def on_live_update(self):
+        """Redraw after the push stream delivered new occupancy"""
+        self.display_lots()
+        self.update_timestamp("live")
+    
+    def update_timestamp(self, source):
+        """Show when and where the data shown came from"""
         now = datetime.now().strftime("%I:%M:%S %p")
-        source = "server" if server_used else "simulated"
         self.update_label.configure(text=f"Last updated: {now} ({source})")
     
+    def permit_filter_choices(self):
+        """Permit filter values for the lot config in use"""
+        return (ALL,) + tuple(self.parking_system.get_permit_types())
+    
+    def update_permit_filter(self):
+        """Follow a lot config change; True if the selected permit type was dropped"""
+        choices = self.permit_filter_choices()
+        if choices == self.permit_choices:
+            return False
+        self.permit_choices = choices
+        self.permit_combo.configure(values=choices)
+        if self.permit_filter.get() in choices:
+            return False
+        self.permit_filter.set(ALL)  # redraws through the variable's trace
+        return True
+    
     def display_lots(self):
-        """Display parking lot cards"""
-        # Clear existing
-        for widget in self.lots_container.winfo_children():
-            widget.destroy()
-        
+        """Display the lots matching the search and filters, best first"""
+        if self.update_permit_filter():
+            return
         # Get recommended lots for current user
         recommended_lots = self.parking_system.get_recommended_lots(self.user_type)
-        
-        # Display each lot
-        row = 0
-        col = 0
-        for idx, lot in enumerate(recommended_lots):
-            card = self.create_lot_card(self.lots_container, lot, idx + 1)
-            card.grid(row=row, column=col, padx=10, pady=10, sticky="nsew")
-            
-            col += 1
-            if col > 1:  # 2 columns
-                col = 0
-                row += 1
-        
-        # Configure grid weights
-        self.lots_container.columnconfigure(0, weight=1)
-        self.lots_container.columnconfigure(1, weight=1)
-    
-    def create_lot_card(self, parent, lot, priority):
-        """Create a card for a parking lot"""
-        # Card frame
-        card = tk.Frame(parent, bg="white", relief=tk.RAISED, bd=2)
-        
-        # Header with priority
-        header_frame = tk.Frame(card, bg=lot.get_status_color(), height=40)
-        header_frame.pack(fill=tk.X)
-        header_frame.pack_propagate(False)
-        
-        priority_label = tk.Label(
-            header_frame,
-            text=f"#{priority} PRIORITY" if priority == 1 else f"Option #{priority}",
-            font=("Arial", 9, "bold"),
-            bg=lot.get_status_color(),
-            fg="white"
-        )
-        priority_label.pack(side=tk.LEFT, padx=10, pady=8)
-        
-        status_label = tk.Label(
-            header_frame,
-            text=f"● {lot.get_status().value.upper()}",
-            font=("Arial", 9, "bold"),
-            bg=lot.get_status_color(),
-            fg="white"
-        )
-        status_label.pack(side=tk.RIGHT, padx=10, pady=8)
-        
-        # Content
-        content = tk.Frame(card, bg="white")
-        content.pack(fill=tk.BOTH, expand=True, padx=15, pady=15)
-        
-        # Lot name
-        tk.Label(
-            content,
-            text=f"LOT {lot.lot_id}",
-            font=("Arial", 20, "bold"),
-            bg="white"
-        ).pack(anchor=tk.W)
-        
-        tk.Label(
-            content,
-            text=lot.permit_type.upper() + " PARKING",
-            font=("Arial", 9),
-            bg="white",
-            fg="#666"
-        ).pack(anchor=tk.W, pady=(0, 10))
-        
-        # Availability
-        avail_frame = tk.Frame(content, bg="white")
-        avail_frame.pack(fill=tk.X, pady=10)
-        
-        tk.Label(
-            avail_frame,
-            text=f"{lot.available_spaces} / {lot.total_spaces}",
-            font=("Arial", 24, "bold"),
-            bg="white",
-            fg=lot.get_status_color()
-        ).pack(side=tk.LEFT)
-        
-        tk.Label(
-            avail_frame,
-            text="spaces\navailable",
-            font=("Arial", 9),
-            bg="white",
-            fg="#666",
-            justify=tk.LEFT
-        ).pack(side=tk.LEFT, padx=10)
-        
-        # Progress bar
-        progress_frame = tk.Frame(content, bg="#e0e0e0", height=20)
-        progress_frame.pack(fill=tk.X, pady=10)
-        progress_frame.pack_propagate(False)
-        
-        fill_width = int((lot.available_spaces / lot.total_spaces) * 300)
-        fill = tk.Frame(progress_frame, bg=lot.get_status_color(), width=fill_width)
-        fill.pack(side=tk.LEFT, fill=tk.Y)
-        
-        # Dshows the drive time TO the parking lot
-        details_frame = tk.Frame(content, bg="white")
-        details_frame.pack(fill=tk.X, pady=10)
-        
-        tk.Label(
-            details_frame,
-            text=f"🚗 {lot.drive_time} min drive",
-            font=("Arial", 10),
-            bg="white",
-            fg="#666"
-        ).pack(side=tk.LEFT, padx=5)
-        
-        return card
+        shown = filter_lots(recommended_lots, self.search_var.get(),
+                            self.permit_filter.get(), self.status_filter.get())
+        self.lot_grid.set_lots(shown)
+        self.count_label.configure(text=f"{len(shown)} of {len(recommended_lots)} lots")
     
-    # updates parking data every 10 seconds
+    # follows the server's push stream, polling every 10 seconds whenever
+    # the stream is unavailable (see RefreshWorker)
     def start_auto_refresh(self):
         """Start auto-refresh thread"""
-        if self.refresh_thread and self.refresh_thread.is_alive():
+        if self.refresh_worker and self.refresh_worker.is_alive():
             return
-        
-        def refresh_loop():
-            while self.auto_refresh_enabled:
-                time.sleep(10)  # 10 seconds
-                if self.auto_refresh_enabled:
-                    try:
-                        self.refresh_parking_data()
-                    except:
-                        pass
-        
-        self.refresh_thread = threading.Thread(target=refresh_loop, daemon=True)
-        self.refresh_thread.start()
+        self.refresh_worker = RefreshWorker(self.parking_system, self.dispatcher,
+                                            self.on_live_update, self.show_refresh)
+        self.refresh_worker.start()
     
     def on_closing(self):
         """Handle window close"""
-        self.auto_refresh_enabled = False
+        if self.refresh_worker:
+            self.refresh_worker.stop()
+        self.dispatcher.stop()
+        self.parking_system.close()
         self.root.destroy()
 
 
@@ -6,167 +6,652 @@ Course: CS2450
 This server provides:
 1. REST API for parking lot data
 2. Web-based admin interface to simulate sensor data
+3. Request, persistence and occupancy metrics at /metrics
 """
 
-from flask import Flask, render_template, jsonify, request
+from flask import Flask, Response, g, redirect, render_template, jsonify, request
 from flask_cors import CORS
+from werkzeug.serving import WSGIRequestHandler, is_running_from_reloader
+from urllib.parse import urlsplit
 from datetime import datetime
+from change_log import ChangeLog
+from change_feed import ChangeFeed
+from space_bitmap import SpaceBitmap
+from lot_store import OPTIONAL_CONFIG_FIELDS, LotStore, lot_config, record_lot_ids
+from campus_lots import LOTS_FILE, config_version, load_lots
+from occupancy_history import OccupancyHistory
+from occupancy_series import HOUR, MINUTE, OccupancySeries
+from occupancy_forecast import AvailabilityForecaster
+from lot_recommender import LotRecommender, USER_TYPES
+from state_backends import open_backend
+from stream_hub import StreamHub
+from metrics import CONTENT_TYPE, LATENCY_BUCKETS, SIZE_BUCKETS, MetricsRegistry
+import atexit
+import copy
 import json
+import math
 import os
+import random
+import threading
+import time
 
 app = Flask(__name__)
 CORS(app)  # Allow cross-origin requests from desktop app
 
 # Data file to persist parking state
 DATA_FILE = "parking_data.json"
+CHANGE_LOG = None
 
-# Initialize parking lots data
-PARKING_LOTS = {
-    "17": {
-        "lot_id": "17",
-        "name": "Lot 17",
-        "total_spaces": 35,
-        "permit_type": "Student",
-        "drive_time": 2,
-        "walk_time": 4,
-        "spaces": [False] * 35  # False = empty, True = occupied
-    },
-    "18": {
-        "lot_id": "18",
-        "name": "Lot 18",
-        "total_spaces": 45,
-        "permit_type": "Staff",
-        "drive_time": 1,
-        "walk_time": 3,
-        "spaces": [False] * 45
-    },
-    "19": {
-        "lot_id": "19",
-        "name": "Lot 19",
-        "total_spaces": 60,
-        "permit_type": "Both",
-        "drive_time": 2,
-        "walk_time": 5,
-        "spaces": [False] * 60
-    },
-    "14": {
-        "lot_id": "14",
-        "name": "Lot 14",
-        "total_spaces": 50,
-        "permit_type": "Open",
-        "drive_time": 3,
-        "walk_time": 7,
-        "spaces": [False] * 50
-    }
-}
+# Each committed change gets the next state version; each lot remembers the
+# version of its last change
+SERVER_STARTED = datetime.now().isoformat()
+
+# Recent changes fanned out to /api/stream subscribers. Run directly, the
+# server hands streams to an event-loop hub on STREAM_PORT (see
+# stream_hub.py) instead of holding a request thread per subscriber
+FEED = ChangeFeed()
+STREAM_HEARTBEAT = 15  # seconds between keep-alive comments on idle streams
+STREAM_PORT = int(os.environ.get("ELC_STREAM_PORT", 5001))
+STREAM_HUB = None
+
+# Largest sensor batch accepted by /api/events
+MAX_BATCH_EVENTS = 5000
+
+# Where live state lives: "memory" (this process, persisted to DATA_FILE) or
+# a shared backend so several workers can serve the same lots, e.g.
+# sqlite:///parking_state.db or redis://localhost:6379/0 (see state_backends.py)
+STATE_BACKEND = os.environ.get("ELC_STATE_BACKEND", "memory")
+FOLLOW_INTERVAL = 0.05  # seconds between checks for other workers' changes
+
+# Optional SQLite history of every occupancy change with minute/hour
+# rollups (see occupancy_history.py); set ELC_HISTORY_DB="" to turn it off
+HISTORY_DB = os.environ.get("ELC_HISTORY_DB", "parking_history.db")
+HISTORY = None
+
+# Minute/hour occupancy rollups behind /api/lot/<id>/history, rebuilt from
+# HISTORY at startup (see occupancy_series.py)
+SERIES = None
+SERIES_BACKFILL = 35 * 86400  # seconds of recorded history to load at startup
+MAX_HISTORY_POINTS = 10000
+
+# Free spaces predicted at drive_time minutes from now, refreshed once a
+# minute from SERIES (see occupancy_forecast.py)
+FORECAST = None
+
+# Ranked lots per user type for /api/recommendations (see lot_recommender.py)
+RECOMMENDER = None
+
+# Request, persistence and occupancy metrics served at /metrics (see metrics.py)
+METRICS = MetricsRegistry()
+PERSIST_OPERATIONS = ("log_append", "snapshot")
+PERSIST_SECONDS = METRICS.histogram(
+    "elc_persist_duration_seconds", "Time spent writing the change log and snapshots",
+    LATENCY_BUCKETS, ("operation",), [(op,) for op in PERSIST_OPERATIONS])
+REQUEST_METRICS = {}  # (route, method) -> series, see register_request_metrics
+
+# Lot config from lots.json (see campus_lots.py), served at /api/config
+LOT_CONFIG = load_lots(LOTS_FILE)
+CONFIG = None  # {"version", "lots"} for the lots being served (see install_config)
+
+# Fields of /api/lots?view=occupancy, for clients that already hold the config
+OCCUPANCY_FIELDS = ("lot_id", "occupied_spaces", "available_spaces", "version",
+                    "predicted_available_at_arrival")
+
+
+def seed_lots(configs):
+    """Empty lots for lot configs, keyed by lot id"""
+    lots = {}
+    for config in configs:
+        lot = dict(config)
+        lot["version"] = 0
+        lot["last_update"] = SERVER_STARTED
+        lot["spaces"] = SpaceBitmap(config["total_spaces"])  # bit clear = empty, bit set = occupied
+        lots[config["lot_id"]] = lot
+    return lots
+
+
+# Initial parking lots data
+PARKING_LOTS = seed_lots(LOT_CONFIG)
+
+
+# Live state: a thread-safe store seeded from PARKING_LOTS (see install_lots)
+STORE = None
+
+
+def _change_log():
+    """Return the change log that persists DATA_FILE"""
+    global CHANGE_LOG
+    if CHANGE_LOG is None or CHANGE_LOG.snapshot_path != DATA_FILE:
+        if CHANGE_LOG is not None:
+            CHANGE_LOG.close()
+        CHANGE_LOG = ChangeLog(DATA_FILE)
+    return CHANGE_LOG
+
+
+def install_lots(lots):
+    """Serve lots from a new LotStore and restart the change feed"""
+    global STORE, RECOMMENDER
+    STORE = LotStore(lots, on_commit=on_commit)
+    RECOMMENDER = LotRecommender(STORE)
+    install_config(STORE)
+    FEED.reset(STORE.version)
+    start_series()
+
+
+def install_backend(store):
+    """Serve lots from a shared backend, following its changes into FEED"""
+    global STORE, RECOMMENDER
+    STORE = store
+    RECOMMENDER = LotRecommender(store)
+    install_config(store)
+    store.on_commit = record_history
+    FEED.reset(store.version)
+    start_series()
+    follower = threading.Thread(target=follow_changes, args=(store,), daemon=True)
+    follower.start()
+    return follower
+
+
+def install_config(store):
+    """Serve the config of store's lots at /api/config"""
+    global CONFIG
+    configs = [store.lot_config(lot_id) for lot_id in store.lot_ids()]
+    CONFIG = {"version": config_version(configs), "lots": configs}
+
+
+def apply_lot_config(lots):
+    """Restored lots brought in line with PARKING_LOTS
+
+    Lots added to the config start empty, lots removed from it are dropped,
+    and metadata (names, times, permits) comes from the config. A lot whose
+    size changed starts empty too, since its old spaces no longer map.
+    """
+    merged = {}
+    for lot_id, seed in PARKING_LOTS.items():
+        lot = lots.get(lot_id)
+        if lot is None or lot["total_spaces"] != seed["total_spaces"]:
+            print(f"Lot {lot_id} is new or resized in {LOTS_FILE}, starting it empty")
+            merged[lot_id] = copy.deepcopy(seed)
+            continue
+        for field in OPTIONAL_CONFIG_FIELDS:
+            lot.pop(field, None)
+        lot.update(lot_config(seed))
+        merged[lot_id] = lot
+    for lot_id in lots.keys() - PARKING_LOTS.keys():
+        print(f"Lot {lot_id} is no longer in {LOTS_FILE}, dropping it")
+    return merged
+
+
+def follow_changes(store):
+    """Publish every commit to the shared store (from any worker) to FEED"""
+    cursor = FEED.version
+    while STORE is store:
+        try:
+            records = store.changes_since(cursor)
+        except Exception as e:
+            print(f"Warning: could not read changes from {STATE_BACKEND} ({e})")
+            records = []
+        if records is None:
+            # Fell behind the shared history; subscribers resync from a snapshot
+            cursor = store.version
+            FEED.reset(cursor)
+        for record in records or []:
+            event = change_event(record)
+            record_series(record, event)
+            FEED.publish(record["ver"], event)
+            cursor = record["ver"]
+        if not records:
+            time.sleep(FOLLOW_INTERVAL)
 
 
 def load_data():
-    """Load parking data from file if exists"""
-    global PARKING_LOTS
-    if os.path.exists(DATA_FILE):
+    """Load the last snapshot and replay the change log written after it"""
+    try:
+        snapshot, records = _change_log().load()
+    except (OSError, ValueError) as e:
+        print(f"Warning: could not read {DATA_FILE} ({e}), using default lots")
+        return
+    if snapshot is not None:
+        install_lots(apply_lot_config(lots_from_json(snapshot)))
+    for record in records:
         try:
-            with open(DATA_FILE, 'r') as f:
-                PARKING_LOTS = json.load(f)
-        except:
-            pass
+            STORE.replay(record)
+        except (KeyError, IndexError, TypeError):
+            print(f"Warning: skipping change log record {record}")
+    if records:
+        STORE.rebuild_counters()
+        FEED.reset(STORE.version)
+        start_series()
+        save_data()
 
 
 def save_data():
-    """Save parking data to file"""
-    with open(DATA_FILE, 'w') as f:
-        json.dump(PARKING_LOTS, f, indent=2)
+    """Write a full snapshot of parking data and compact the change log"""
+    started = time.perf_counter()
+    # No commits can happen while every lot is locked, so the snapshot and
+    # the log truncation line up exactly
+    with STORE.lock_all() as lots:
+        _change_log().write_snapshot(lots_to_json(lots))
+    SNAPSHOT_DUE.clear()
+    PERSIST_SECONDS.labels("snapshot").observe(time.perf_counter() - started)
+
+
+def lots_to_json(lots):
+    """Lots with each lot's spaces packed as a base64 bitmap"""
+    data = {}
+    for lot_id, lot in lots.items():
+        lot_data = {key: value for key, value in lot.items() if key != "spaces"}
+        lot_data["spaces_packed"] = lot["spaces"].to_base64()
+        data[lot_id] = lot_data
+    return data
+
+
+def lots_from_json(data):
+    """Inverse of lots_to_json, also accepting the old list-of-bools format"""
+    lots = {}
+    for lot_id, lot_data in data.items():
+        lot = dict(lot_data)
+        if "spaces_packed" in lot:
+            lot["spaces"] = SpaceBitmap.from_base64(lot["total_spaces"], lot.pop("spaces_packed"))
+        else:
+            lot["spaces"] = SpaceBitmap.from_list(lot["spaces"])
+        lot.setdefault("version", 0)
+        lot.setdefault("last_update", SERVER_STARTED)
+        lots[lot_id] = lot
+    return lots
+
+
+def open_history():
+    """Start recording occupancy history if HISTORY_DB is set"""
+    global HISTORY
+    if HISTORY_DB and HISTORY is None:
+        HISTORY = OccupancyHistory(HISTORY_DB)
+
+
+def close_data():
+    """Flush the change log and occupancy history on shutdown"""
+    global HISTORY
+    if CHANGE_LOG is not None:
+        CHANGE_LOG.close()
+    if HISTORY is not None:
+        HISTORY.close()
+        HISTORY = None
+
+
+def on_commit(record):
+    """Persist and publish a committed change (runs under the store's commit lock)"""
+    started = time.perf_counter()
+    snapshot_due = _change_log().append(record)
+    PERSIST_SECONDS.labels("log_append").observe(time.perf_counter() - started)
+    if snapshot_due:
+        # Snapshotting needs every lot lock, so leave it to snapshot_if_due()
+        SNAPSHOT_DUE.set()
+    record_history(record)
+    event = change_event(record)
+    record_series(record, event)
+    FEED.publish(record["ver"], event)
+
+
+def record_history(record):
+    """Queue a committed change for the occupancy history (cheap: buffered)"""
+    if HISTORY is not None:
+        HISTORY.record(record, {lot_id: STORE.occupied_count(lot_id)
+                                for lot_id in record_lot_ids(record)})
+
+
+def start_series():
+    """Rebuild the occupancy rollups from recorded history and the live state"""
+    global SERIES
+    now = time.time()
+    counts = {lot_id: STORE.occupied_count(lot_id) for lot_id in STORE.lot_ids()}
+    series = backfill_series(counts, now) if HISTORY is not None else OccupancySeries(counts, now)
+    series.record(counts, now)
+    SERIES = series
+    start_forecast()
+
+
+def backfill_series(counts, now):
+    """An OccupancySeries holding the last SERIES_BACKFILL seconds of HISTORY
+
+    Closed minutes and hours are loaded from the history's rollup tables a
+    tier at a time; only raw events since the last rolled-up hour (or the
+    whole window, before the first rollup) are replayed change by change.
+    """
+    window = now - SERIES_BACKFILL
+    rolled = HISTORY.rolled_until("1h")
+    if rolled is None or rolled <= window:
+        rolled = None
+    rows = HISTORY.lot_levels(rolled or window, now)
+    start = rolled or (rows[0][0] if rows else now)
+    # Levels when the series starts: from the rollups, else the first raw event
+    levels = HISTORY.last_levels(counts, start, "1h")
+    for _, lot_id, occupied in rows:
+        levels.setdefault(lot_id, occupied)
+    series = OccupancySeries({lot_id: levels.get(lot_id, count)
+                              for lot_id, count in counts.items()}, start)
+    if rolled is not None:
+        for resolution, width in (("1m", MINUTE), ("1h", HOUR)):
+            first = max(start - series.retention[width], window)
+            series.load(width, HISTORY.rollup_columns(first, start, resolution),
+                        HISTORY.last_levels(counts, first, resolution))
+    for ts, lot_id, occupied in rows:
+        series.record({lot_id: occupied}, ts)
+    return series
+
+
+def start_forecast():
+    """Forecast from the current SERIES, ticking once a minute in the background"""
+    global FORECAST
+    forecaster = AvailabilityForecaster(STORE, SERIES)
+    forecaster.tick(time.time())
+    FORECAST = forecaster
+    threading.Thread(target=run_forecast, args=(forecaster,), daemon=True).start()
+
+
+def run_forecast(forecaster):
+    """Tick a forecaster at the start of every minute until it is replaced"""
+    while FORECAST is forecaster:
+        time.sleep(60 - time.time() % 60)
+        if FORECAST is forecaster:
+            forecaster.tick(time.time())
+
+
+def record_series(record, event):
+    """Fold a committed change into the occupancy rollups and forecast rates"""
+    lot_counts = {lot["lot_id"]: lot["occupied_spaces"] for lot in event["lots"]}
+    if SERIES is not None:
+        SERIES.record(lot_counts, datetime.fromisoformat(record["ts"]).timestamp())
+    if FORECAST is not None:
+        FORECAST.observe(lot_counts)
+
+
+def snapshot_if_due():
+    """Take the snapshot the change log asked for, once no locks are held"""
+    if SNAPSHOT_DUE.is_set() and SNAPSHOT_LOCK.acquire(blocking=False):
+        try:
+            if SNAPSHOT_DUE.is_set():
+                save_data()
+        finally:
+            SNAPSHOT_LOCK.release()
+
+
+SNAPSHOT_DUE = threading.Event()
+SNAPSHOT_LOCK = threading.Lock()
+
+
+def change_event(record):
+    """Describe a committed change for stream subscribers"""
+    event = {
+        "version": record["ver"],
+        "lots": [STORE.summary(lot_id) for lot_id in record_lot_ids(record)]
+    }
+    if record["op"] == "set":
+        event["spaces"] = [[record["lot"], record["i"], record["v"]]]
+    elif record["op"] == "batch":
+        event["spaces"] = record["sets"]
+    else:
+        # Whole-lot changes ship the new bitmap instead of every space
+        _, spaces = STORE.snapshot(record["lot"])
+        event["packed"] = {record["lot"]: spaces.to_base64()}
+    return event
 
 
 def get_occupied_count(lot_id):
     """Count occupied spaces in a lot"""
-    return sum(PARKING_LOTS[lot_id]["spaces"])
+    return STORE.occupied_count(lot_id)
+
+
+def get_campus_occupied_count():
+    """Count occupied spaces across the whole campus"""
+    return STORE.campus_occupied_count()
 
 
 def get_available_count(lot_id):
     """Count available spaces in a lot"""
-    total = PARKING_LOTS[lot_id]["total_spaces"]
-    occupied = get_occupied_count(lot_id)
-    return total - occupied
+    return STORE.available_count(lot_id)
+
+
+def validate_event(event):
+    """Return an error message for a malformed sensor event, or None if valid"""
+    if not isinstance(event, dict):
+        return "Event must be an object"
+    lot_id = event.get("lot_id")
+    # Check the type first: a list or dict lot_id cannot be looked up
+    if not isinstance(lot_id, str) or lot_id not in STORE:
+        return "Lot not found"
+    space_index = event.get("space_index")
+    if not isinstance(space_index, int) or isinstance(space_index, bool):
+        return "Invalid space index"
+    if space_index < 0 or space_index >= STORE.lot_config(lot_id)["total_spaces"]:
+        return "Invalid space index"
+    if not isinstance(event.get("occupied"), bool):
+        return "Occupied must be true or false"
+    return None
+
+
+if STATE_BACKEND == "memory":
+    install_lots(copy.deepcopy(PARKING_LOTS))
+else:
+    # Opened at import so every gunicorn worker connects on its own
+    open_history()
+    atexit.register(close_data)
+    install_backend(open_backend(STATE_BACKEND, copy.deepcopy(PARKING_LOTS)))
 
 
 # ============================================================================
 # API ENDPOINTS
 # ============================================================================
 
+def not_modified(etag):
+    """Return a 304 response if the client already holds this version"""
+    if request.if_none_match.contains(etag):
+        return with_etag(app.response_class(status=304), etag)
+    return None
+
+
+def with_etag(response, etag):
+    """Attach an ETag and ask clients to revalidate instead of caching blindly"""
+    response.set_etag(etag)
+    response.headers["Cache-Control"] = "no-cache"
+    return response
+
+
 @app.route('/api/lots', methods=['GET'])
 def get_all_lots():
-    """Get all parking lots with current occupancy"""
-    lots_data = []
-    for lot_id, lot in PARKING_LOTS.items():
-        lots_data.append({
-            "lot_id": lot["lot_id"],
-            "name": lot["name"],
-            "total_spaces": lot["total_spaces"],
-            "occupied_spaces": get_occupied_count(lot_id),
-            "available_spaces": get_available_count(lot_id),
-            "permit_type": lot["permit_type"],
-            "drive_time": lot["drive_time"],
-            "walk_time": lot["walk_time"],
-            "last_update": datetime.now().isoformat()
-        })
-    return jsonify(lots_data)
+    """Get all parking lots with current occupancy and predicted availability"""
+    # ?view=occupancy leaves out the config fields clients get from
+    # /api/config; X-Lot-Config tells them when to fetch that again
+    occupancy_only = request.args.get("view") == "occupancy"
+    # Predictions refresh every minute even when nothing was committed
+    etag = f"lots-{STORE.version}-{FORECAST.generation}{'-occupancy' if occupancy_only else ''}"
+    response = not_modified(etag)
+    if response is None:
+        lots_data = STORE.summaries()
+        for lot in lots_data:
+            lot["predicted_available_at_arrival"] = FORECAST.prediction(lot["lot_id"])
+        if occupancy_only:
+            lots_data = [{field: lot[field] for field in OCCUPANCY_FIELDS} for lot in lots_data]
+        response = with_etag(jsonify(lots_data), etag)
+    response.headers["X-Lot-Config"] = CONFIG["version"]
+    return response
+
+
+@app.route('/api/config', methods=['GET'])
+def get_config():
+    """Get the static config of every lot and its version (see campus_lots.py)"""
+    etag = f"config-{CONFIG['version']}"
+    cached = not_modified(etag)
+    if cached:
+        return cached
+    return with_etag(jsonify(CONFIG), etag)
 
 
 @app.route('/api/lot/<lot_id>', methods=['GET'])
 def get_lot(lot_id):
-    """Get specific lot data"""
-    if lot_id not in PARKING_LOTS:
+    """Get specific lot data, with spaces as a base64 bitmap (bit i = space i)"""
+    if lot_id not in STORE:
         return jsonify({"error": "Lot not found"}), 404
     
-    lot = PARKING_LOTS[lot_id]
+    list_format = request.args.get("format") == "list"
+    etag = f"lot-{lot_id}-{STORE.lot_version(lot_id)}{'-list' if list_format else ''}"
+    cached = not_modified(etag)
+    if cached:
+        return cached
+
+    lot_data, spaces = STORE.snapshot(lot_id)
+    etag = f"lot-{lot_id}-{lot_data['version']}{'-list' if list_format else ''}"
+    # Packed bitmap by default; ?format=list keeps the old array of bools
+    if list_format:
+        lot_data["spaces"] = spaces.to_list()
+    else:
+        lot_data["spaces_packed"] = spaces.to_base64()
+    return with_etag(jsonify(lot_data), etag)
+
+
+@app.route('/api/recommendations', methods=['GET'])
+def get_recommendations():
+    """Get lots ranked best-first for a user type (Student, Staff or Visitor)
+
+    With ?user_type= returns the scored lots (see lot_recommender.py),
+    optionally cut to ?limit=. Without it returns just the ranked lot ids
+    for every user type, which is what the desktop client caches.
+    """
+    user_type = request.args.get("user_type")
+    if user_type is not None and user_type not in USER_TYPES:
+        return jsonify({"error": f"user_type must be one of {', '.join(USER_TYPES)}"}), 400
+    try:
+        limit = int(request.args.get("limit", 0))
+    except ValueError:
+        return jsonify({"error": "limit must be a number"}), 400
+    if limit < 0:
+        return jsonify({"error": "limit must not be negative"}), 400
+    limit = limit or None
+
+    version = STORE.version
+    etag = (f"recs-{version}-{FORECAST.generation}-{RECOMMENDER.segment()}"
+            f"-{user_type or 'all'}-{limit or 0}")
+    cached = not_modified(etag)
+    if cached:
+        return cached
+
+    if user_type is None:
+        rankings = {name: [lot_id for _, lot_id, _ in RECOMMENDER.rank_ids(name, FORECAST)]
+                    for name in USER_TYPES}
+        return with_etag(jsonify({"version": version, "rankings": rankings}), etag)
+    lots = RECOMMENDER.rank(user_type, FORECAST, limit)
+    return with_etag(jsonify({"version": version, "user_type": user_type, "lots": lots}), etag)
+
+
+@app.route('/api/lot/<lot_id>/history', methods=['GET'])
+def get_lot_history(lot_id):
+    """Get occupancy over time from the pre-aggregated rollups
+
+    ?from= and ?to= take epoch seconds or ISO timestamps (default: the last
+    24 hours). ?bucket= takes a width such as 5m, 1h or 1d, or seconds; by
+    default the smallest width giving at most 500 points is used. Minute
+    widths reach back two days, whole hours five weeks.
+    """
+    if lot_id not in STORE:
+        return jsonify({"error": "Lot not found"}), 404
+
+    now = time.time()
+    try:
+        end = parse_time(request.args.get("to"), now)
+        start = parse_time(request.args.get("from"), end - 86400)
+        bucket = parse_bucket(request.args.get("bucket"), end - start)
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+    if start >= end:
+        return jsonify({"error": "from must be before to"}), 400
+    if (end - start) / bucket > MAX_HISTORY_POINTS:
+        return jsonify({"error": f"At most {MAX_HISTORY_POINTS} points per request"}), 400
+
+    series = SERIES.query(lot_id, start, end, bucket, now)
     return jsonify({
-        "lot_id": lot["lot_id"],
-        "name": lot["name"],
-        "total_spaces": lot["total_spaces"],
-        "occupied_spaces": get_occupied_count(lot_id),
-        "available_spaces": get_available_count(lot_id),
-        "permit_type": lot["permit_type"],
-        "drive_time": lot["drive_time"],
-        "walk_time": lot["walk_time"],
-        "spaces": lot["spaces"],
-        "last_update": datetime.now().isoformat()
+        "lot_id": lot_id,
+        "total_spaces": STORE.lot_config(lot_id)["total_spaces"],
+        "from": start,
+        "to": end,
+        "bucket": bucket,
+        "series": series or {"t": [], "mean": [], "min": [], "max": [], "last": []}
     })
 
 
+HISTORY_BUCKETS = {"m": 60, "h": 3600, "d": 86400}
+DEFAULT_BUCKETS = [60, 300, 900, 3600, 6 * 3600, 86400]
+
+
+def parse_time(value, default):
+    """Epoch seconds from an epoch number or ISO timestamp query parameter"""
+    if value is None:
+        return default
+    try:
+        seconds = float(value)
+    except ValueError:
+        pass
+    else:
+        if not math.isfinite(seconds):  # nan and inf parse but name no time
+            raise ValueError(f"Invalid time: {value}")
+        return seconds
+    try:
+        return datetime.fromisoformat(value).timestamp()
+    except ValueError:
+        raise ValueError(f"Invalid time: {value}")
+
+
+def parse_bucket(value, span):
+    """Bucket width in seconds (a whole number of minutes)"""
+    if value is None:
+        # Spans longer than the minute rollups reach need whole-hour buckets
+        minute_reach = SERIES.retention[60]
+        for width in DEFAULT_BUCKETS:
+            if span / width <= 500 and (span <= minute_reach or width % 3600 == 0):
+                return width
+        return DEFAULT_BUCKETS[-1]
+    try:
+        if value[-1:] in HISTORY_BUCKETS:
+            width = int(value[:-1]) * HISTORY_BUCKETS[value[-1]]
+        else:
+            width = int(value)
+    except ValueError:
+        raise ValueError(f"Invalid bucket: {value}")
+    if width <= 0 or width % 60:
+        raise ValueError("bucket must be a whole number of minutes")
+    return width
+
+
 @app.route('/api/lot/<lot_id>/toggle/<int:space_index>', methods=['POST'])
 def toggle_space(lot_id, space_index):
     """Toggle a parking space occupied/empty"""
-    if lot_id not in PARKING_LOTS:
+    if lot_id not in STORE:
         return jsonify({"error": "Lot not found"}), 404
     
-    lot = PARKING_LOTS[lot_id]
-    if space_index < 0 or space_index >= lot["total_spaces"]:
+    if space_index < 0 or space_index >= STORE.lot_config(lot_id)["total_spaces"]:
         return jsonify({"error": "Invalid space index"}), 400
     
-    # Toggle the space
-    lot["spaces"][space_index] = not lot["spaces"][space_index]
-    save_data()
+    # Toggle the space (read-modify-write happens under the lot's lock)
+    occupied = STORE.toggle_space(lot_id, space_index)
+    snapshot_if_due()
+    summary = STORE.summary(lot_id)
     
     return jsonify({
         "success": True,
         "lot_id": lot_id,
         "space_index": space_index,
-        "occupied": lot["spaces"][space_index],
-        "occupied_count": get_occupied_count(lot_id),
-        "available_count": get_available_count(lot_id)
+        "occupied": occupied,
+        "occupied_count": summary["occupied_spaces"],
+        "available_count": summary["available_spaces"]
     })
 
 
 @app.route('/api/lot/<lot_id>/reset', methods=['POST'])
 def reset_lot(lot_id):
     """Reset all spaces in a lot to empty"""
-    if lot_id not in PARKING_LOTS:
+    if lot_id not in STORE:
         return jsonify({"error": "Lot not found"}), 404
     
-    lot = PARKING_LOTS[lot_id]
-    lot["spaces"] = [False] * lot["total_spaces"]
-    save_data()
+    STORE.fill_lot(lot_id, False)
+    snapshot_if_due()
     
     return jsonify({
         "success": True,
@@ -178,12 +663,11 @@ def reset_lot(lot_id):
 @app.route('/api/lot/<lot_id>/fill', methods=['POST'])
 def fill_lot(lot_id):
     """Fill all spaces in a lot"""
-    if lot_id not in PARKING_LOTS:
+    if lot_id not in STORE:
         return jsonify({"error": "Lot not found"}), 404
     
-    lot = PARKING_LOTS[lot_id]
-    lot["spaces"] = [True] * lot["total_spaces"]
-    save_data()
+    STORE.fill_lot(lot_id, True)
+    snapshot_if_due()
     
     return jsonify({
         "success": True,
@@ -195,39 +679,305 @@ def fill_lot(lot_id):
 @app.route('/api/lot/<lot_id>/random', methods=['POST'])
 def randomize_lot(lot_id):
     """Randomize occupancy in a lot"""
-    import random
-    
-    if lot_id not in PARKING_LOTS:
+    if lot_id not in STORE:
         return jsonify({"error": "Lot not found"}), 404
     
-    lot = PARKING_LOTS[lot_id]
+    config = STORE.lot_config(lot_id)
+    total_spaces = config["total_spaces"]
     
-    # Set realistic occupancy patterns
-    if lot_id == "17":  # Student lot - 80-100% full
-        occupied_count = random.randint(28, 35)
-    elif lot_id == "18":  # Staff lot - 90-100% full
-        occupied_count = random.randint(40, 45)
-    elif lot_id == "19":  # Mixed lot - 75-100% full
-        occupied_count = random.randint(45, 60)
-    else:  # Lot 14 - 30-80% full
-        occupied_count = random.randint(15, 40)
+    # Realistic occupancy for this lot from lots.json (see campus_lots.py)
+    low, high = config.get("simulated_occupancy", (0, total_spaces))
+    occupied_count = random.randint(low, high)
     
     # Reset and randomly fill
-    lot["spaces"] = [False] * lot["total_spaces"]
-    occupied_indices = random.sample(range(lot["total_spaces"]), occupied_count)
-    for idx in occupied_indices:
-        lot["spaces"][idx] = True
-    
-    save_data()
+    STORE.randomize_lot(lot_id, occupied_count)
+    snapshot_if_due()
     
     return jsonify({
         "success": True,
         "lot_id": lot_id,
         "occupied_count": occupied_count,
-        "available_count": lot["total_spaces"] - occupied_count
+        "available_count": total_spaces - occupied_count
+    })
+
+
+@app.route('/api/events', methods=['POST'])
+def ingest_events():
+    """Apply a batch of sensor events across lots atomically
+
+    Body: {"events": [{"lot_id": "17", "space_index": 3, "occupied": true}, ...]}
+    Either every event is applied and saved once, or none are.
+    """
+    payload = request.get_json(silent=True)
+    events = payload.get("events") if isinstance(payload, dict) else None
+    if not isinstance(events, list):
+        return jsonify({"error": "Expected a JSON object with an events list"}), 400
+    if len(events) > MAX_BATCH_EVENTS:
+        return jsonify({"error": f"At most {MAX_BATCH_EVENTS} events per batch"}), 413
+
+    # Validate the whole batch before touching any lot
+    errors = [(idx, validate_event(event)) for idx, event in enumerate(events)]
+    errors = [(idx, error) for idx, error in errors if error]
+    if errors:
+        return jsonify({
+            "success": False,
+            "applied": 0,
+            "results": [{"index": idx, "error": error} for idx, error in errors]
+        }), 400
+
+    # Applied under every touched lot's lock and committed as one record
+    changed = STORE.apply_events([(event["lot_id"], event["space_index"], event["occupied"])
+                                  for event in events])
+    snapshot_if_due()
+
+    results = []
+    touched_lots = []
+    for idx, event in enumerate(events):
+        results.append({
+            "index": idx,
+            "lot_id": event["lot_id"],
+            "space_index": event["space_index"],
+            "occupied": event["occupied"],
+            "changed": changed[idx]
+        })
+        if event["lot_id"] not in touched_lots:
+            touched_lots.append(event["lot_id"])
+
+    lots = {}
+    for lot_id in touched_lots:
+        summary = STORE.summary(lot_id)
+        lots[lot_id] = {
+            "occupied_count": summary["occupied_spaces"],
+            "available_count": summary["available_spaces"]
+        }
+    return jsonify({
+        "success": True,
+        "applied": len(results),
+        "results": results,
+        "lots": lots
+    })
+
+
+@app.route('/api/admin/dashboard', methods=['GET'])
+def get_dashboard():
+    """Everything the admin page shows, in one response
+
+    Per-lot summaries with packed space bitmaps, plus campus and per-permit
+    totals, so the page costs one round trip however many lots there are.
+    """
+    version = STORE.version
+    etag = f"dashboard-{version}"
+    cached = not_modified(etag)
+    if cached:
+        return cached
+
+    lots_data = []
+    permits = {}
+    total_spaces = 0
+    occupied = 0
+    for lot_id in STORE.lot_ids():
+        lot_data, spaces = STORE.snapshot(lot_id)
+        lot_data["spaces_packed"] = spaces.to_base64()
+        lots_data.append(lot_data)
+        total_spaces += lot_data["total_spaces"]
+        occupied += lot_data["occupied_spaces"]
+        permit = permits.setdefault(lot_data["permit_type"],
+                                    {"total_spaces": 0, "occupied_spaces": 0})
+        permit["total_spaces"] += lot_data["total_spaces"]
+        permit["occupied_spaces"] += lot_data["occupied_spaces"]
+    for permit in permits.values():
+        permit["available_spaces"] = permit["total_spaces"] - permit["occupied_spaces"]
+
+    return with_etag(jsonify({
+        "version": version,
+        "lots": lots_data,
+        "totals": {
+            "total_spaces": total_spaces,
+            "occupied_spaces": occupied,
+            "available_spaces": total_spaces - occupied,
+            "permits": permits
+        }
+    }), etag)
+
+
+@app.route('/api/admin/consistency', methods=['GET'])
+def check_consistency():
+    """Verify the running occupancy counters against a full recount"""
+    mismatches = STORE.check_counters()
+    return jsonify({
+        "consistent": not mismatches,
+        "mismatches": mismatches,
+        "campus_occupied": get_campus_occupied_count()
+    })
+
+
+@app.route('/api/changes', methods=['GET'])
+def get_changes():
+    """Get what changed since a state version (delta sync for polling clients)
+
+    Returns the changed lot summaries plus per-space changes ("spaces") and
+    new bitmaps for whole-lot changes ("packed"). Without ?since, or when
+    that version has already left the change buffer, returns a full
+    snapshot with "full": true instead.
+    """
+    since = request.args.get("since")
+    if since is None:
+        return jsonify(full_changes())
+    try:
+        since = int(since)
+    except ValueError:
+        return jsonify({"error": "since must be a state version number"}), 400
+
+    if since > FEED.version:  # version from before a restart
+        return jsonify(full_changes())
+    events, complete = FEED.read_since(since)
+    if not complete:
+        return jsonify(full_changes())
+    if not events:
+        return jsonify({"version": FEED.version, "full": False,
+                        "lots": [], "spaces": [], "packed": {}})
+    changes = merge_events(events, include_spaces=True)
+    changes["full"] = False
+    return jsonify(changes)
+
+
+def full_changes():
+    """Changes response that replaces everything the client holds"""
+    changes = snapshot_event(include_spaces=True)
+    changes["full"] = True
+    return changes
+
+
+@app.route('/api/stream', methods=['GET'])
+def stream_changes():
+    """Push occupancy changes as Server-Sent Events
+
+    Sends a "snapshot" event with every lot first (or when the client has
+    fallen too far behind), then "lots" events with the lots that changed.
+    ?spaces=1 adds the per-space changes. Reconnecting clients resume from
+    the Last-Event-ID header.
+
+    When the stream hub is running (the server was started directly) this
+    redirects to it, and the hub serves every stream from one event loop.
+    Otherwise (gunicorn, tests) the stream is served here and holds a
+    server thread for as long as the client stays connected.
+    """
+    if STREAM_HUB is not None:
+        host = urlsplit("//" + request.host).hostname
+        if ":" in host:  # IPv6 literal
+            host = f"[{host}]"
+        query = request.query_string.decode()
+        location = f"{request.scheme}://{host}:{STREAM_HUB.port}{request.path}"
+        return redirect(f"{location}?{query}" if query else location, code=307)
+
+    cursor, next_message = stream_subscription(request.args, request.headers)
+
+    def generate():
+        nonlocal cursor
+        yield "retry: 3000\n\n"
+        while True:
+            cursor, message = next_message(cursor)
+            if message is not None:
+                yield message
+            elif FEED.wait(cursor, timeout=STREAM_HEARTBEAT) == cursor:
+                yield ": keep-alive\n\n"
+
+    return Response(generate(), mimetype="text/event-stream", headers={
+        "Cache-Control": "no-cache",
+        "X-Accel-Buffering": "no"  # keep reverse proxies from buffering the stream
     })
 
 
+def stream_subscription(args, headers):
+    """Starting cursor and message function for a new /api/stream client
+
+    Shared by the route above and the stream hub. The message function
+    never blocks: it maps a cursor to (new cursor, next SSE message), with
+    message None once the client is up to date.
+    """
+    include_spaces = args.get("spaces") == "1"
+    resume_from = headers.get("Last-Event-ID") or args.get("since")
+    try:
+        cursor = int(resume_from) if resume_from is not None else None
+    except ValueError:
+        cursor = None
+
+    def next_message(cursor):
+        # New clients, clients from before a restart and clients further
+        # behind than the feed holds all start over from a snapshot
+        if cursor is not None and cursor <= FEED.version:
+            events, complete = FEED.read_since(cursor)
+            if complete and not events:
+                return cursor, None
+            if complete:
+                cursor = events[-1][0]
+                return cursor, sse_message("lots", cursor, merge_events(events, include_spaces))
+        cursor = FEED.version
+        return cursor, sse_message("snapshot", cursor, snapshot_event(include_spaces))
+
+    return cursor, next_message
+
+
+def start_stream_hub(host="0.0.0.0", port=None):
+    """Serve /api/stream from the event-loop hub (see stream_hub.py)"""
+    global STREAM_HUB
+    STREAM_HUB = StreamHub(FEED, stream_subscription, host,
+                           STREAM_PORT if port is None else port,
+                           heartbeat=STREAM_HEARTBEAT).start()
+    return STREAM_HUB
+
+
+def stop_stream_hub():
+    """Stop the hub; /api/stream goes back to serving streams itself"""
+    global STREAM_HUB
+    if STREAM_HUB is not None:
+        STREAM_HUB.stop()
+        STREAM_HUB = None
+
+
+def sse_message(event, version, data):
+    """Format one Server-Sent Event"""
+    payload = json.dumps(data, separators=(',', ':'))
+    return f"event: {event}\nid: {version}\ndata: {payload}\n\n"
+
+
+def snapshot_event(include_spaces):
+    """Every lot's current state, for new or resyncing subscribers"""
+    # Read the version first: lots may be newer, never older, so a client
+    # that resumes from it can only see changes twice, never miss one
+    event = {"version": STORE.version}
+    if not include_spaces:
+        event["lots"] = STORE.summaries()
+        return event
+    event["lots"] = []
+    event["packed"] = {}
+    for lot_id in STORE.lot_ids():
+        summary, spaces = STORE.snapshot(lot_id)
+        event["lots"].append(summary)
+        event["packed"][lot_id] = spaces.to_base64()
+    return event
+
+
+def merge_events(events, include_spaces):
+    """Coalesce several feed events into one delta (latest lot state wins)"""
+    lots = {}
+    spaces = []
+    packed = {}
+    for _, event in events:
+        for summary in event["lots"]:
+            lots[summary["lot_id"]] = summary
+        if include_spaces:
+            for lot_id, bitmap in event.get("packed", {}).items():
+                packed[lot_id] = bitmap
+                spaces = [change for change in spaces if change[0] != lot_id]
+            spaces.extend(event.get("spaces", []))
+    merged = {"version": events[-1][0], "lots": list(lots.values())}
+    if include_spaces:
+        merged["spaces"] = spaces
+        merged["packed"] = packed
+    return merged
+
+
 # ============================================================================
 # WEB INTERFACE
 # ============================================================================
@@ -244,17 +994,100 @@ def admin():
     return render_template('admin.html')
 
 
+# ============================================================================
+# METRICS
+# ============================================================================
+
+STATUS_CLASSES = ("1xx", "2xx", "3xx", "4xx", "5xx")
+UNMATCHED = ("unmatched", "other")  # requests that matched no route
+
+
+@app.route('/metrics', methods=['GET'])
+def get_metrics():
+    """Request, persistence and occupancy metrics in the Prometheus text format"""
+    return Response(METRICS.render(), content_type=CONTENT_TYPE)
+
+
+@app.before_request
+def start_request_timer():
+    g.metrics_started = time.perf_counter()
+
+
+@app.after_request
+def record_request(response):
+    """Count and time every response (for /api/stream, until streaming starts)"""
+    started = g.pop("metrics_started", None)
+    rule = request.url_rule
+    series = REQUEST_METRICS.get((rule.rule, request.method) if rule else UNMATCHED)
+    if series is None:
+        series = REQUEST_METRICS[UNMATCHED]
+    requests_total, duration, size = series
+    requests_total[min(response.status_code // 100, 5) - 1].inc()
+    if started is not None:
+        duration.observe(time.perf_counter() - started)
+    # The header, not calculate_content_length(): that would buffer a stream
+    if response.content_length is not None:
+        size.observe(response.content_length)
+    return response
+
+
+def register_request_metrics():
+    """Register series for every route and method the app serves"""
+    keys = [(rule.rule, method) for rule in app.url_map.iter_rules()
+            for method in sorted(rule.methods)] + [UNMATCHED]
+    requests_total = METRICS.counter(
+        "elc_http_requests_total", "Responses by route, method and status class",
+        ("route", "method", "status"),
+        [key + (status,) for key in keys for status in STATUS_CLASSES])
+    duration = METRICS.histogram(
+        "elc_http_request_duration_seconds", "Time to build each response",
+        LATENCY_BUCKETS, ("route", "method"), keys)
+    size = METRICS.histogram(
+        "elc_http_response_size_bytes", "Response body sizes (streamed responses excluded)",
+        SIZE_BUCKETS, ("route", "method"), keys)
+    for key in keys:
+        REQUEST_METRICS[key] = (
+            [requests_total.labels(*key, status) for status in STATUS_CLASSES],
+            duration.labels(*key), size.labels(*key))
+
+
+def lot_gauge(read):
+    """Gauge reader yielding read(lot_id) for every lot being served"""
+    return lambda: (((lot_id,), read(lot_id)) for lot_id in STORE.lot_ids())
+
+
+register_request_metrics()
+METRICS.gauge("elc_lot_occupied_spaces", "Occupied spaces per lot", ("lot_id",),
+              lot_gauge(get_occupied_count))
+METRICS.gauge("elc_lot_total_spaces", "Spaces per lot", ("lot_id",),
+              lot_gauge(lambda lot_id: STORE.lot_config(lot_id)["total_spaces"]))
+METRICS.gauge("elc_state_version", "Version of the last committed change", (),
+              lambda: [((), STORE.version)])
+
+
 # ============================================================================
 # MAIN
 # ============================================================================
 
 if __name__ == '__main__':
-    load_data()
+    if STATE_BACKEND == "memory":
+        open_history()
+        load_data()
+        atexit.register(close_data)
     print("\n" + "="*60)
     print("🚗 ELC Parking App Server Started")
     print("="*60)
     print("\n📊 Admin Interface: http://localhost:5000")
     print("📡 API Endpoint: http://localhost:5000/api/lots")
+    print("📈 Metrics: http://localhost:5000/metrics")
+    print(f"🔔 Change stream: http://localhost:{STREAM_PORT}/api/stream")
     print("\n🎯 Use the admin interface to simulate parking occupancy")
     print("🖥️  Run parking_app_client.py to test the client app\n")
+    # HTTP/1.1 keeps client connections open between polls (the dev server
+    # defaults to 1.0 and closes after every response)
+    WSGIRequestHandler.protocol_version = "HTTP/1.1"
+    # The debug reloader runs this block in a watching parent process too;
+    # only the child that serves requests should bind the stream port
+    if is_running_from_reloader():
+        start_stream_hub()
     app.run(debug=True, host='0.0.0.0', port=5000)
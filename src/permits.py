@@ -0,0 +1,150 @@
+"""
+ELC Parking App - Permit Rules
+Author: Jie Liang
+Course: CS2450
+
+Declarative parking permit model shared by the server and the desktop app.
+
+1. Every permit class (Student, Staff, Visitor) is one bit, so the permits
+   a user holds are a bitmask and a user may hold several
+2. A lot admits users through rules: a mask of permit classes plus an
+   optional time window, e.g. visitors in a staff lot after 5pm:
+       {"permits": ["Visitor"], "from": "17:00", "days": ["Mon", "Fri"]}
+   Lots without explicit "permit_rules" get the rules for their
+   permit_type (Student, Staff, Both, Open)
+3. PermitIndex precomputes, for every stretch of the week in which no
+   window opens or closes, which lots each permit mask may use. A lookup
+   is a bisect plus a cached tuple, so it costs O(eligible lots) however
+   many lots and rules there are. Rebuild it only when lot config changes
+"""
+
+from bisect import bisect_right
+from datetime import datetime
+
+
+STUDENT = 1
+STAFF = 2
+VISITOR = 4
+
+PERMIT_BITS = {"Student": STUDENT, "Staff": STAFF, "Visitor": VISITOR}
+ALL_PERMITS = STUDENT | STAFF | VISITOR
+
+# Rules for each permit_type used in lot config
+PERMIT_TYPE_RULES = {
+    "Student": [{"permits": ["Student"]}],
+    "Staff": [{"permits": ["Staff"]}],
+    "Both": [{"permits": ["Student", "Staff"]}],
+    "Open": [{"permits": ["Student", "Staff", "Visitor"]}]
+}
+
+DAYS = ("Mon", "Tue", "Wed", "Thu", "Fri", "Sat", "Sun")
+DAY_MINUTES = 24 * 60
+WEEK_MINUTES = 7 * DAY_MINUTES
+
+# Compiled rules of each permit_type, see compile_rules
+_TYPE_RULES = {}
+
+
+def permit_mask(permits):
+    """Bitmask for permit class names, e.g. ["Student", "Staff"] -> 3"""
+    mask = 0
+    for name in permits:
+        if name not in PERMIT_BITS:
+            raise ValueError(f"Unknown permit: {name}")
+        mask |= PERMIT_BITS[name]
+    return mask
+
+
+def compile_rules(permit_type=None, permit_rules=None):
+    """Turn a lot's rules into a tuple of (mask, windows) pairs
+
+    windows is None for rules that always apply, otherwise a list of
+    (start, end) minute ranges within the week. Lots without rules of their
+    own share one tuple per permit_type.
+    """
+    if permit_rules is None:
+        compiled = _TYPE_RULES.get(permit_type)
+        if compiled is None:
+            compiled = _TYPE_RULES[permit_type] = _compile(
+                PERMIT_TYPE_RULES.get(permit_type, []))
+        return compiled
+    return _compile(permit_rules)
+
+
+def _compile(permit_rules):
+    compiled = []
+    for rule in permit_rules:
+        mask = permit_mask(rule["permits"])
+        if "from" not in rule and "until" not in rule and "days" not in rule:
+            compiled.append((mask, None))
+            continue
+        start = _minute_of_day(rule.get("from", "00:00"))
+        end = _minute_of_day(rule.get("until", "24:00"))
+        windows = []
+        for day in rule.get("days", DAYS):
+            offset = DAYS.index(day) * DAY_MINUTES
+            if start < end:
+                windows.append((offset + start, offset + end))
+            else:
+                # e.g. 17:00-07:00: the evening and the early morning of that day
+                windows.append((offset + start, offset + DAY_MINUTES))
+                windows.append((offset, offset + end))
+        compiled.append((mask, windows))
+    return tuple(compiled)
+
+
+def rules_mask(rules, minute):
+    """Permit mask a lot admits at a minute of the week"""
+    mask = 0
+    for rule_mask, windows in rules:
+        if windows is None or any(start <= minute < end for start, end in windows):
+            mask |= rule_mask
+    return mask
+
+
+def rules_allow(rules, user_mask, when=None):
+    """True if a holder of user_mask may park under rules at when"""
+    return bool(rules_mask(rules, week_minute(when)) & user_mask)
+
+
+def week_minute(when=None):
+    """Minute of the local week (0 = Monday 00:00) for a datetime, default now"""
+    when = when or datetime.now()
+    return when.weekday() * DAY_MINUTES + when.hour * 60 + when.minute
+
+
+class PermitIndex:
+    """Which lots each permit mask may use, precomputed for the whole week"""
+
+    def __init__(self, lots):
+        """lots: (item, rules) pairs in display order; lookups return the items"""
+        lots = list(lots)
+        boundaries = {0}
+        for _, rules in lots:
+            for _, windows in rules:
+                for start, end in windows or ():
+                    boundaries.update((start, end % WEEK_MINUTES))
+        self._boundaries = sorted(boundaries)
+        # Per stretch of the week: (item, admitted mask) for every lot
+        self._segments = [[(item, rules_mask(rules, start)) for item, rules in lots]
+                          for start in self._boundaries]
+        self._eligible = [{} for _ in self._boundaries]  # per stretch: mask -> items
+
+    def segment(self, when=None):
+        """Id of the stretch of the week containing when (changes when rules do)"""
+        return bisect_right(self._boundaries, week_minute(when)) - 1
+
+    def eligible(self, user_mask, when=None):
+        """Items a holder of user_mask may use at when, in index order"""
+        segment = self.segment(when)
+        cache = self._eligible[segment]
+        items = cache.get(user_mask)
+        if items is None:
+            items = cache[user_mask] = tuple(
+                item for item, mask in self._segments[segment] if mask & user_mask)
+        return items
+
+
+def _minute_of_day(text):
+    hours, minutes = text.split(":")
+    return int(hours) * 60 + int(minutes)
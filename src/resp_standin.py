@@ -0,0 +1,200 @@
+"""
+ELC Parking App - Redis Protocol Stand-in
+Author: Jie Liang
+Course: CS2450
+
+Tiny in-memory server speaking the subset of the Redis protocol that
+RedisLotStore uses (strings, lists, WATCH/MULTI/EXEC). Handy for running
+several server workers on a laptop without installing Redis:
+
+    python resp_standin.py --port 6379
+    ELC_STATE_BACKEND=redis://localhost:6379/0 gunicorn -w 4 parking_server:app
+
+It keeps nothing on disk; point ELC_STATE_BACKEND at a real Redis (or any
+compatible server) for production.
+"""
+
+import argparse
+import socketserver
+import threading
+
+
+class StandinData:
+    """Keyspace shared by every connection, with per-key change counters for WATCH"""
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.values = {}     # key -> bytes or list of bytes
+        self.revisions = {}  # key -> number of writes so far
+
+    def touch(self, key):
+        self.revisions[key] = self.revisions.get(key, 0) + 1
+
+
+class StandinHandler(socketserver.StreamRequestHandler):
+    """One client connection"""
+
+    def handle(self):
+        self.watched = {}
+        self.queued = None  # list of commands while inside MULTI
+        while True:
+            try:
+                args = self.read_command()
+            except (ConnectionError, ValueError):
+                return
+            if args is None:
+                return
+            self.wfile.write(self.dispatch(args))
+
+    def read_command(self):
+        line = self.rfile.readline()
+        if not line:
+            return None
+        if not line.startswith(b"*"):
+            return line.split()  # inline command, e.g. from telnet
+        args = []
+        for _ in range(int(line[1:])):
+            length = int(self.rfile.readline()[1:])
+            args.append(self.rfile.read(length + 2)[:-2])
+        return args
+
+    def dispatch(self, args):
+        name = args[0].upper().decode()
+        data = self.server.data
+        if name == "MULTI":
+            self.queued = []
+            return b"+OK\r\n"
+        if name == "DISCARD":
+            self.queued = None
+            self.watched = {}
+            return b"+OK\r\n"
+        if name == "EXEC":
+            return self.execute_queued()
+        if self.queued is not None:
+            self.queued.append((name, args[1:]))
+            return b"+QUEUED\r\n"
+        if name == "WATCH":
+            with data.lock:
+                for key in args[1:]:
+                    self.watched[key] = data.revisions.get(key, 0)
+            return b"+OK\r\n"
+        if name == "UNWATCH":
+            self.watched = {}
+            return b"+OK\r\n"
+        with data.lock:
+            return encode(self.run(name, args[1:]))
+
+    def execute_queued(self):
+        queued, self.queued = self.queued, None
+        watched, self.watched = self.watched, {}
+        if queued is None:
+            return encode(Exception("EXEC without MULTI"))
+        data = self.server.data
+        with data.lock:
+            if any(data.revisions.get(key, 0) != revision for key, revision in watched.items()):
+                return b"*-1\r\n"
+            return encode([self.run(name, args) for name, args in queued])
+
+    def run(self, name, args):
+        """Run one command (caller holds the data lock)"""
+        data = self.server.data
+        values = data.values
+        if name == "PING":
+            return Status("PONG")
+        if name in ("SELECT", "FLUSHDB"):
+            if name == "FLUSHDB":
+                for key in values:
+                    data.touch(key)
+                values.clear()
+            return Status("OK")
+        if name == "GET":
+            return values.get(args[0])
+        if name == "MGET":
+            return [values.get(key) for key in args]
+        if name == "SET":
+            values[args[0]] = args[1]
+            data.touch(args[0])
+            return Status("OK")
+        if name == "SETNX":
+            if args[0] in values:
+                return 0
+            values[args[0]] = args[1]
+            data.touch(args[0])
+            return 1
+        if name == "DEL":
+            removed = 0
+            for key in args:
+                if values.pop(key, None) is not None:
+                    data.touch(key)
+                    removed += 1
+            return removed
+        if name == "RPUSH":
+            items = values.setdefault(args[0], [])
+            items.extend(args[1:])
+            data.touch(args[0])
+            return len(items)
+        if name in ("LRANGE", "LTRIM"):
+            items = values.get(args[0], [])
+            selected = items[list_slice(len(items), int(args[1]), int(args[2]))]
+            if name == "LRANGE":
+                return selected
+            values[args[0]] = selected
+            data.touch(args[0])
+            return Status("OK")
+        return Exception(f"ERR unknown command '{name.lower()}'")
+
+
+def list_slice(length, start, stop):
+    """Python slice for Redis's inclusive, negative-friendly list indexes"""
+    if start < 0:
+        start = max(length + start, 0)
+    if stop < 0:
+        stop = length + stop
+    return slice(start, max(stop + 1, start))
+
+
+class Status(str):
+    """Simple-string reply"""
+
+
+def encode(value):
+    if isinstance(value, Status):
+        return b"+%s\r\n" % value.encode()
+    if isinstance(value, Exception):
+        return b"-%s\r\n" % str(value).encode()
+    if isinstance(value, int):
+        return b":%d\r\n" % value
+    if value is None:
+        return b"$-1\r\n"
+    if isinstance(value, list):
+        return b"*%d\r\n" % len(value) + b"".join(encode(item) for item in value)
+    return b"$%d\r\n%s\r\n" % (len(value), value)
+
+
+class StandinServer(socketserver.ThreadingTCPServer):
+    """Threaded stand-in server; port 0 picks a free port"""
+
+    daemon_threads = True
+    allow_reuse_address = True
+
+    def __init__(self, host="127.0.0.1", port=6379):
+        super().__init__((host, port), StandinHandler)
+        self.data = StandinData()
+
+    @property
+    def port(self):
+        return self.server_address[1]
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Local Redis-protocol stand-in")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=6379)
+    args = parser.parse_args()
+    server = StandinServer(args.host, args.port)
+    print(f"Redis stand-in listening on {args.host}:{server.port}")
+    server.serve_forever()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,153 @@
+"""
+ELC Parking App - Packed Space Bitmap
+Author: Jie Liang
+Course: CS2450
+
+Stores the occupied/empty state of every space in a lot as one bit
+(bit set = occupied) instead of one Python bool per space.
+
+Bit i lives in byte i // 8 at position i % 8 (least significant bit first).
+The admin page decodes the same layout from the base64 form.
+"""
+
+import base64
+import random
+
+
+class SpaceBitmap:
+    """Fixed-size bitset of parking space states"""
+
+    __slots__ = ("_size", "_bits")
+
+    def __init__(self, size, occupied=False):
+        self._size = size
+        self._bits = bytearray(_byte_length(size))
+        if occupied:
+            self.fill(True)
+
+    # --- construction / serialization ---------------------------------------
+
+    @classmethod
+    def from_bytes(cls, size, data):
+        """Build a bitmap from its raw packed bytes"""
+        if len(data) != _byte_length(size):
+            raise ValueError(f"Expected {_byte_length(size)} bytes for {size} spaces")
+        bitmap = cls(size)
+        bitmap._bits[:] = data
+        bitmap._mask_tail()
+        return bitmap
+
+    @classmethod
+    def from_base64(cls, size, text):
+        """Build a bitmap from the base64 form used in JSON"""
+        return cls.from_bytes(size, base64.b64decode(text))
+
+    @classmethod
+    def from_list(cls, spaces):
+        """Build a bitmap from a legacy list of bools"""
+        bitmap = cls(len(spaces))
+        bitmap.set_indices(i for i, occupied in enumerate(spaces) if occupied)
+        return bitmap
+
+    def to_bytes(self):
+        """Raw packed bytes (ceil(size / 8) of them)"""
+        return bytes(self._bits)
+
+    def to_base64(self):
+        """Packed bytes as a base64 string for JSON payloads"""
+        return base64.b64encode(self._bits).decode("ascii")
+
+    def to_list(self):
+        """Expand to a list of bools (legacy API format)"""
+        return list(self)
+
+    def copy(self):
+        bitmap = SpaceBitmap(self._size)
+        bitmap._bits[:] = self._bits
+        return bitmap
+
+    def __deepcopy__(self, memo):
+        return self.copy()
+
+    # --- single space access -------------------------------------------------
+
+    def __len__(self):
+        return self._size
+
+    def __getitem__(self, index):
+        index = self._check_index(index)
+        return bool(self._bits[index >> 3] & (1 << (index & 7)))
+
+    def __setitem__(self, index, occupied):
+        index = self._check_index(index)
+        if occupied:
+            self._bits[index >> 3] |= 1 << (index & 7)
+        else:
+            self._bits[index >> 3] &= ~(1 << (index & 7)) & 0xFF
+
+    def __iter__(self):
+        bits = self._bits
+        for index in range(self._size):
+            yield bool(bits[index >> 3] & (1 << (index & 7)))
+
+    def __eq__(self, other):
+        if not isinstance(other, SpaceBitmap):
+            return NotImplemented
+        return self._size == other._size and self._bits == other._bits
+
+    def __repr__(self):
+        return f"SpaceBitmap({self._size}, occupied={self.count()})"
+
+    # --- bulk operations -----------------------------------------------------
+
+    def count(self):
+        """Number of occupied spaces (popcount over the whole bitmap)"""
+        return int.from_bytes(self._bits, "little").bit_count()
+
+    def fill(self, occupied):
+        """Set every space occupied (True) or empty (False)"""
+        self._bits[:] = (b"\xff" if occupied else b"\x00") * len(self._bits)
+        self._mask_tail()
+
+    def set_indices(self, indices):
+        """Mark the given spaces occupied"""
+        bits = self._bits
+        for index in indices:
+            index = self._check_index(index)
+            bits[index >> 3] |= 1 << (index & 7)
+
+    def occupied_indices(self):
+        """Indices of every occupied space"""
+        return [i for i, occupied in enumerate(self) if occupied]
+
+    def assign_random(self, occupied_count, rng=random):
+        """Replace the contents with occupied_count randomly placed cars"""
+        occupied_count = max(0, min(occupied_count, self._size))
+        # Sample whichever side is smaller, then invert if needed
+        if occupied_count <= self._size // 2:
+            self.fill(False)
+            self.set_indices(rng.sample(range(self._size), occupied_count))
+        else:
+            self.fill(True)
+            bits = self._bits
+            for index in rng.sample(range(self._size), self._size - occupied_count):
+                bits[index >> 3] &= ~(1 << (index & 7)) & 0xFF
+
+    # --- helpers ---------------------------------------------------------------
+
+    def _check_index(self, index):
+        if index < 0:
+            index += self._size
+        if not 0 <= index < self._size:
+            raise IndexError("space index out of range")
+        return index
+
+    def _mask_tail(self):
+        # Bits past the last space must stay clear so count() is exact
+        extra = len(self._bits) * 8 - self._size
+        if extra:
+            self._bits[-1] &= 0xFF >> extra
+
+
+def _byte_length(size):
+    return (size + 7) // 8
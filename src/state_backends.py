@@ -0,0 +1,624 @@
+"""
+ELC Parking App - Shared State Backends
+Author: Jie Liang
+Course: CS2450
+
+Backends that let several server processes (gunicorn workers or hosts)
+serve the same lots. Choose one with the ELC_STATE_BACKEND environment
+variable:
+
+    memory                      LotStore in this process (the default)
+    sqlite:///parking_state.db  SQLite database in WAL mode
+    redis://localhost:6379/0    anything that speaks the Redis protocol
+
+Both shared backends offer the same methods as LotStore, so the routes do
+not care which one is active. Every commit is numbered from one shared
+version counter and appended to a shared, bounded change list; each
+worker follows that list (changes_since) to feed its own /api/stream and
+/api/changes subscribers, so notifications reach clients of every worker.
+
+No client library is needed for Redis: RespClient speaks just enough of
+the protocol, and resp_standin.py provides a local stand-in server.
+"""
+
+from contextlib import contextmanager
+from datetime import datetime
+from urllib.parse import urlparse
+import json
+import random
+import socket
+import sqlite3
+import threading
+
+from lot_store import OPTIONAL_CONFIG_FIELDS, lot_config
+from space_bitmap import SpaceBitmap
+
+
+# Changes kept in the shared change list for followers that fall behind
+CHANGE_HISTORY = 10000
+
+
+def open_backend(url, seed_lots):
+    """Open the shared backend named by url, brought in line with seed_lots"""
+    parsed = urlparse(url)
+    if parsed.scheme == "sqlite":
+        return SQLiteLotStore(parsed.netloc + parsed.path, seed_lots)
+    if parsed.scheme == "redis":
+        db = int(parsed.path.lstrip("/") or 0)
+        return RedisLotStore(parsed.hostname or "localhost", parsed.port or 6379, seed_lots, db=db)
+    raise ValueError(f"Unknown state backend: {url}")
+
+
+class SharedLotStore:
+    """LotStore-compatible store whose state lives outside the process
+
+    Subclasses provide storage primitives: _read_states, _read_version,
+    _transaction (returns the committed record, or None if nothing
+    changed), _write_counts and _changes_after.
+
+    Opening a store brings the lots it already holds in line with the seed
+    lots by the same rules as parking_server.apply_lot_config: new and
+    resized lots start empty, removed lots are dropped and metadata comes
+    from the seed. If that changes anything, the store gets a new version
+    and its change list is cleared, so followers resync from a snapshot.
+    """
+
+    shared = True
+
+    def __init__(self, configs):
+        # Lot metadata never changes at runtime, so it is cached per process
+        self._configs = configs
+        # Called with each record this process commits; commits from every
+        # worker are read back with changes_since instead
+        self.on_commit = None
+
+    # ------------------------------------------------------------------------
+    # Reads
+    # ------------------------------------------------------------------------
+
+    def __contains__(self, lot_id):
+        return lot_id in self._configs
+
+    def lot_ids(self):
+        return list(self._configs)
+
+    def lot_config(self, lot_id):
+        return dict(self._configs[lot_id])
+
+    @property
+    def version(self):
+        return self._read_version()
+
+    def lot_version(self, lot_id):
+        return self._read_states([lot_id], spaces=False)[lot_id]["version"]
+
+    def occupied_count(self, lot_id):
+        return self._read_states([lot_id], spaces=False)[lot_id]["occupied"]
+
+    def available_count(self, lot_id):
+        return self._configs[lot_id]["total_spaces"] - self.occupied_count(lot_id)
+
+    def permit_occupied_count(self, permit_type):
+        lot_ids = [lot_id for lot_id, config in self._configs.items()
+                   if config["permit_type"] == permit_type]
+        return sum(state["occupied"] for state in self._read_states(lot_ids, spaces=False).values())
+
+    def campus_occupied_count(self):
+        states = self._read_states(self.lot_ids(), spaces=False)
+        return sum(state["occupied"] for state in states.values())
+
+    def summary(self, lot_id):
+        return self._summary(lot_id, self._read_states([lot_id], spaces=False)[lot_id])
+
+    def summaries(self):
+        states = self._read_states(self.lot_ids(), spaces=False)
+        return [self._summary(lot_id, states[lot_id]) for lot_id in self._configs]
+
+    def snapshot(self, lot_id):
+        state = self._read_states([lot_id])[lot_id]
+        return self._summary(lot_id, state), state["spaces"]
+
+    def is_occupied(self, lot_id, space_index):
+        return self._read_states([lot_id])[lot_id]["spaces"][space_index]
+
+    def changes_since(self, version):
+        """Committed change records after version, or None if some were dropped"""
+        return self._changes_after(version)
+
+    # ------------------------------------------------------------------------
+    # Writes
+    # ------------------------------------------------------------------------
+
+    def toggle_space(self, lot_id, space_index):
+        result = {}
+
+        def mutate(states):
+            spaces = states[lot_id]["spaces"]
+            result["occupied"] = occupied = not spaces[space_index]
+            spaces[space_index] = occupied
+            return {"op": "set", "lot": lot_id, "i": space_index, "v": int(occupied)}
+
+        self._commit([lot_id], mutate)
+        return result["occupied"]
+
+    def fill_lot(self, lot_id, occupied):
+        def mutate(states):
+            states[lot_id]["spaces"].fill(occupied)
+            return {"op": "fill", "lot": lot_id, "v": int(occupied)}
+
+        self._commit([lot_id], mutate)
+
+    def randomize_lot(self, lot_id, occupied_count, rng=random):
+        def mutate(states):
+            spaces = states[lot_id]["spaces"]
+            spaces.assign_random(occupied_count, rng)
+            return {"op": "assign", "lot": lot_id, "on": spaces.occupied_indices()}
+
+        self._commit([lot_id], mutate)
+
+    def apply_events(self, events):
+        lot_ids = sorted({lot_id for lot_id, _, _ in events})
+        changed = []
+
+        def mutate(states):
+            changed.clear()
+            sets = []
+            for lot_id, space_index, occupied in events:
+                spaces = states[lot_id]["spaces"]
+                is_change = spaces[space_index] != occupied
+                changed.append(is_change)
+                if is_change:
+                    spaces[space_index] = occupied
+                    sets.append([lot_id, space_index, int(occupied)])
+            return {"op": "batch", "sets": sets} if sets else None
+
+        self._commit(lot_ids, mutate)
+        return list(changed)
+
+    # ------------------------------------------------------------------------
+    # Counters
+    # ------------------------------------------------------------------------
+
+    def rebuild_counters(self):
+        states = self._read_states(self.lot_ids())
+        self._write_counts({lot_id: state["spaces"].count() for lot_id, state in states.items()})
+
+    def check_counters(self):
+        states = self._read_states(self.lot_ids())
+        mismatches = []
+        for lot_id, state in states.items():
+            actual = state["spaces"].count()
+            if state["occupied"] != actual:
+                mismatches.append({"scope": "lot", "key": lot_id,
+                                   "counter": state["occupied"], "actual": actual})
+        return mismatches
+
+    def close(self):
+        pass
+
+    # ------------------------------------------------------------------------
+    # Helpers for subclasses
+    # ------------------------------------------------------------------------
+
+    def _commit(self, lot_ids, mutate):
+        record = self._transaction(lot_ids, mutate)
+        if record is not None and self.on_commit is not None:
+            self.on_commit(record)
+
+    def _summary(self, lot_id, state):
+        summary = {field: value for field, value in self._configs[lot_id].items()
+                   if field not in OPTIONAL_CONFIG_FIELDS}
+        summary["occupied_spaces"] = state["occupied"]
+        summary["available_spaces"] = summary["total_spaces"] - state["occupied"]
+        summary["version"] = state["version"]
+        summary["last_update"] = state["last_update"]
+        return summary
+
+    @staticmethod
+    def _sync_plan(stored, seed_lots):
+        """Lots to start empty, lots with new metadata and lots to drop
+
+        stored maps lot ids to the configs already in the store, in order.
+        """
+        reset, updated = [], []
+        for lot_id, lot in seed_lots.items():
+            # Compare as the store keeps it, after a JSON round trip
+            config = json.loads(json.dumps(lot_config(lot)))
+            old = stored.get(lot_id)
+            if old is None or old["total_spaces"] != config["total_spaces"]:
+                reset.append(lot_id)
+            elif old != config:
+                updated.append(lot_id)
+        dropped = [lot_id for lot_id in stored if lot_id not in seed_lots]
+        if not (reset or updated or dropped) and list(stored) == list(seed_lots):
+            return None
+        return reset, updated, dropped
+
+    @staticmethod
+    def _stamp(record, states, version):
+        """Number a record and bring the touched lots' metadata up to date"""
+        record["ver"] = version
+        record["ts"] = datetime.now().isoformat()
+        for state in states.values():
+            state["occupied"] = state["spaces"].count()
+            state["version"] = version
+            state["last_update"] = record["ts"]
+
+
+# ============================================================================
+# SQLITE
+# ============================================================================
+
+class SQLiteLotStore(SharedLotStore):
+    """Lots in one SQLite database shared by every worker on a host
+
+    WAL mode lets readers in every process run alongside the single writer;
+    BEGIN IMMEDIATE serializes commits so versions stay gap-free.
+    """
+
+    SCHEMA = """
+        CREATE TABLE IF NOT EXISTS lots (
+            lot_id TEXT PRIMARY KEY,
+            position INTEGER NOT NULL,
+            config TEXT NOT NULL,
+            spaces BLOB NOT NULL,
+            occupied INTEGER NOT NULL,
+            version INTEGER NOT NULL,
+            last_update TEXT NOT NULL
+        );
+        CREATE TABLE IF NOT EXISTS state (
+            key TEXT PRIMARY KEY,
+            value INTEGER NOT NULL
+        );
+        CREATE TABLE IF NOT EXISTS changes (
+            version INTEGER PRIMARY KEY,
+            record TEXT NOT NULL
+        );
+        INSERT OR IGNORE INTO state (key, value) VALUES ('version', 0);
+    """
+
+    def __init__(self, path, seed_lots):
+        self.path = path
+        self._local = threading.local()
+        conn = self._conn()
+        conn.executescript(self.SCHEMA)
+        with self._write(conn):
+            self._sync_lots(conn, seed_lots)
+        rows = conn.execute("SELECT lot_id, config FROM lots ORDER BY position").fetchall()
+        super().__init__({lot_id: json.loads(config) for lot_id, config in rows})
+
+    def _sync_lots(self, conn, seed_lots):
+        """Bring the lots table in line with seed_lots (inside a write)"""
+        rows = conn.execute("SELECT lot_id, config FROM lots ORDER BY position").fetchall()
+        stored = {lot_id: json.loads(config) for lot_id, config in rows}
+        plan = self._sync_plan(stored, seed_lots)
+        if plan is None:
+            return
+        reset, updated, dropped = plan
+        stamp = None
+        if stored:
+            stamp = (self._read_version() + 1, datetime.now().isoformat())
+            conn.execute("UPDATE state SET value = ? WHERE key = 'version'", (stamp[0],))
+            conn.execute("DELETE FROM changes")
+        conn.executemany("DELETE FROM lots WHERE lot_id = ?", [(lot_id,) for lot_id in dropped])
+        for position, (lot_id, lot) in enumerate(seed_lots.items()):
+            config = json.dumps(lot_config(lot))
+            if lot_id in reset:
+                version, last_update = stamp or (lot["version"], lot["last_update"])
+                conn.execute(
+                    "INSERT OR REPLACE INTO lots VALUES (?, ?, ?, ?, ?, ?, ?)",
+                    (lot_id, position, config, lot["spaces"].to_bytes(),
+                     lot["spaces"].count(), version, last_update))
+            elif lot_id in updated:
+                conn.execute("UPDATE lots SET position = ?, config = ?, version = ?, "
+                             "last_update = ? WHERE lot_id = ?",
+                             (position, config, stamp[0], stamp[1], lot_id))
+            else:
+                conn.execute("UPDATE lots SET position = ? WHERE lot_id = ?", (position, lot_id))
+
+    def _conn(self):
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=30, isolation_level=None,
+                                   check_same_thread=False)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")  # durable at checkpoints, fast commits
+            self._local.conn = conn
+        return conn
+
+    @contextmanager
+    def _write(self, conn):
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            yield
+        except BaseException:
+            conn.execute("ROLLBACK")
+            raise
+        conn.execute("COMMIT")
+
+    def _read_version(self):
+        return self._conn().execute("SELECT value FROM state WHERE key = 'version'").fetchone()[0]
+
+    def _read_states(self, lot_ids, spaces=True, conn=None):
+        conn = conn or self._conn()
+        columns = "lot_id, occupied, version, last_update" + (", spaces" if spaces else "")
+        placeholders = ",".join("?" * len(lot_ids))
+        rows = conn.execute(f"SELECT {columns} FROM lots WHERE lot_id IN ({placeholders})",
+                            list(lot_ids)).fetchall()
+        states = {}
+        for row in rows:
+            state = {"occupied": row[1], "version": row[2], "last_update": row[3]}
+            if spaces:
+                state["spaces"] = SpaceBitmap.from_bytes(
+                    self._configs[row[0]]["total_spaces"], row[4])
+            states[row[0]] = state
+        return states
+
+    def _transaction(self, lot_ids, mutate):
+        conn = self._conn()
+        with self._write(conn):
+            states = self._read_states(lot_ids, conn=conn)
+            record = mutate(states)
+            if record is None:
+                return None
+            version = self._read_version() + 1
+            self._stamp(record, states, version)
+            conn.executemany(
+                "UPDATE lots SET spaces = ?, occupied = ?, version = ?, last_update = ? "
+                "WHERE lot_id = ?",
+                [(state["spaces"].to_bytes(), state["occupied"], state["version"],
+                  state["last_update"], lot_id) for lot_id, state in states.items()])
+            conn.execute("UPDATE state SET value = ? WHERE key = 'version'", (version,))
+            conn.execute("INSERT INTO changes (version, record) VALUES (?, ?)",
+                         (version, json.dumps(record, separators=(',', ':'))))
+            conn.execute("DELETE FROM changes WHERE version <= ?", (version - CHANGE_HISTORY,))
+            return record
+
+    def _write_counts(self, counts):
+        conn = self._conn()
+        with self._write(conn):
+            conn.executemany("UPDATE lots SET occupied = ? WHERE lot_id = ?",
+                             [(count, lot_id) for lot_id, count in counts.items()])
+
+    def _changes_after(self, version):
+        conn = self._conn()
+        # One read transaction, so a commit cannot land between the two reads
+        conn.execute("BEGIN")
+        try:
+            rows = conn.execute("SELECT version, record FROM changes WHERE version > ? "
+                                "ORDER BY version", (version,)).fetchall()
+            current = self._read_version()
+        finally:
+            conn.execute("COMMIT")
+        if rows and rows[0][0] != version + 1:
+            return None
+        if not rows and current > version:
+            return None
+        return [json.loads(record) for _, record in rows]
+
+    def close(self):
+        conn = getattr(self._local, "conn", None)
+        if conn is not None:
+            conn.close()
+            self._local.conn = None
+
+
+# ============================================================================
+# REDIS PROTOCOL
+# ============================================================================
+
+class RespError(Exception):
+    """Error reply from a Redis-protocol server"""
+
+
+class RespClient:
+    """Minimal blocking client for the Redis serialization protocol (RESP2)"""
+
+    def __init__(self, host, port, db=0, timeout=5):
+        self._sock = socket.create_connection((host, port), timeout=timeout)
+        self._sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+        self._reader = self._sock.makefile("rb")
+        if db:
+            self.execute("SELECT", db)
+
+    def execute(self, *args):
+        """Send one command and return its reply"""
+        self._sock.sendall(_encode_command(args))
+        return self._read_reply()
+
+    def pipeline(self, commands):
+        """Send several commands in one write and return every reply"""
+        self._sock.sendall(b"".join(_encode_command(args) for args in commands))
+        return [self._read_reply() for _ in commands]
+
+    def transaction(self, commands):
+        """Run commands in MULTI/EXEC, return their replies or None if a WATCH fired"""
+        replies = self.pipeline([("MULTI",)] + list(commands) + [("EXEC",)])
+        return replies[-1]
+
+    def close(self):
+        self._reader.close()
+        self._sock.close()
+
+    def _read_reply(self):
+        line = self._reader.readline()
+        if not line:
+            raise ConnectionError("Connection closed by server")
+        kind, rest = line[:1], line[1:-2]
+        if kind == b"+":
+            return rest.decode()
+        if kind == b"-":
+            raise RespError(rest.decode())
+        if kind == b":":
+            return int(rest)
+        if kind == b"$":
+            length = int(rest)
+            if length < 0:
+                return None
+            data = self._reader.read(length + 2)
+            return data[:-2]
+        if kind == b"*":
+            count = int(rest)
+            if count < 0:
+                return None
+            return [self._read_reply() for _ in range(count)]
+        raise RespError(f"Unexpected reply: {line!r}")
+
+
+def _encode_command(args):
+    parts = [b"*%d\r\n" % len(args)]
+    for arg in args:
+        if not isinstance(arg, bytes):
+            arg = str(arg).encode()
+        parts.append(b"$%d\r\n%s\r\n" % (len(arg), arg))
+    return b"".join(parts)
+
+
+class RedisLotStore(SharedLotStore):
+    """Lots kept in a Redis-protocol server shared by every worker and host
+
+    Commits are optimistic: WATCH the version key, read, then MULTI/EXEC the
+    new state together with the next version and the change record. If any
+    other commit landed in between, EXEC is refused and the commit retries,
+    so versions stay gap-free and in order across every worker.
+    """
+
+    MAX_RETRIES = 50
+
+    def __init__(self, host, port, seed_lots, db=0, prefix="elc"):
+        self._address = (host, port, db)
+        self._prefix = prefix
+        self._local = threading.local()
+        conn = self._conn()
+        self._sync_lots(conn, seed_lots)
+        lot_ids = json.loads(conn.execute("GET", self._key("lot_ids")))
+        configs = conn.execute("MGET", *[self._key("config", lot_id) for lot_id in lot_ids])
+        super().__init__({lot_id: json.loads(config) for lot_id, config in zip(lot_ids, configs)})
+
+    def _sync_lots(self, conn, seed_lots):
+        """Bring the stored lots in line with seed_lots in one MULTI/EXEC"""
+        for _ in range(self.MAX_RETRIES):
+            conn.execute("WATCH", self._key("version"), self._key("lot_ids"))
+            lot_ids = json.loads(conn.execute("GET", self._key("lot_ids")) or "[]")
+            configs = conn.execute("MGET", *[self._key("config", lot_id)
+                                             for lot_id in lot_ids]) if lot_ids else []
+            stored = {lot_id: json.loads(config) for lot_id, config in zip(lot_ids, configs)}
+            plan = self._sync_plan(stored, seed_lots)
+            if plan is None:
+                conn.execute("UNWATCH")
+                return
+            reset, updated, dropped = plan
+            version = int(conn.execute("GET", self._key("version")) or 0)
+            stamp = (version + 1, datetime.now().isoformat()) if stored else None
+            metas = self._read_states(updated, spaces=False, conn=conn) if updated else {}
+            commands = [("SET", self._key("version"), stamp[0] if stamp else version),
+                        ("SET", self._key("lot_ids"), json.dumps(list(seed_lots)))]
+            if stamp:
+                commands.append(("DEL", self._key("changes")))
+            for lot_id in dropped:
+                commands.append(("DEL", self._key("config", lot_id), self._key("spaces", lot_id),
+                                 self._key("meta", lot_id)))
+            for lot_id in reset:
+                lot = seed_lots[lot_id]
+                lot_version, last_update = stamp or (lot["version"], lot["last_update"])
+                commands.append(("SET", self._key("config", lot_id), json.dumps(lot_config(lot))))
+                commands.append(("SET", self._key("spaces", lot_id), lot["spaces"].to_bytes()))
+                commands.append(("SET", self._key("meta", lot_id), json.dumps({
+                    "occupied": lot["spaces"].count(), "version": lot_version,
+                    "last_update": last_update})))
+            for lot_id in updated:
+                metas[lot_id]["version"], metas[lot_id]["last_update"] = stamp
+                commands.append(("SET", self._key("config", lot_id),
+                                 json.dumps(lot_config(seed_lots[lot_id]))))
+                commands.append(("SET", self._key("meta", lot_id), json.dumps(metas[lot_id])))
+            if conn.transaction(commands) is not None:
+                return
+        raise RuntimeError("Gave up syncing lots after repeated write conflicts")
+
+    def _key(self, *parts):
+        return ":".join((self._prefix,) + parts)
+
+    def _conn(self):
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            host, port, db = self._address
+            conn = self._local.conn = RespClient(host, port, db)
+        return conn
+
+    def _read_version(self):
+        return int(self._conn().execute("GET", self._key("version")) or 0)
+
+    def _read_states(self, lot_ids, spaces=True, conn=None):
+        conn = conn or self._conn()
+        lot_ids = list(lot_ids)
+        metas = conn.execute("MGET", *[self._key("meta", lot_id) for lot_id in lot_ids])
+        states = {lot_id: json.loads(meta) for lot_id, meta in zip(lot_ids, metas)}
+        if spaces:
+            bitmaps = conn.execute("MGET", *[self._key("spaces", lot_id) for lot_id in lot_ids])
+            for lot_id, data in zip(lot_ids, bitmaps):
+                states[lot_id]["spaces"] = SpaceBitmap.from_bytes(
+                    self._configs[lot_id]["total_spaces"], data)
+        return states
+
+    def _transaction(self, lot_ids, mutate):
+        conn = self._conn()
+        for _ in range(self.MAX_RETRIES):
+            conn.execute("WATCH", self._key("version"))
+            version = int(conn.execute("GET", self._key("version")) or 0)
+            states = self._read_states(lot_ids, conn=conn)
+            record = mutate(states)
+            if record is None:
+                conn.execute("UNWATCH")
+                return None
+            self._stamp(record, states, version + 1)
+            commands = [("SET", self._key("version"), version + 1)]
+            for lot_id, state in states.items():
+                commands.append(("SET", self._key("spaces", lot_id), state["spaces"].to_bytes()))
+                commands.append(("SET", self._key("meta", lot_id), json.dumps({
+                    "occupied": state["occupied"], "version": state["version"],
+                    "last_update": state["last_update"]})))
+            commands.append(("RPUSH", self._key("changes"), json.dumps(record, separators=(',', ':'))))
+            commands.append(("LTRIM", self._key("changes"), -CHANGE_HISTORY, -1))
+            if conn.transaction(commands) is not None:
+                return record
+        raise RuntimeError("Gave up committing after repeated write conflicts")
+
+    def _write_counts(self, counts):
+        conn = self._conn()
+        states = self._read_states(list(counts), spaces=False, conn=conn)
+        commands = []
+        for lot_id, count in counts.items():
+            states[lot_id]["occupied"] = count
+            commands.append(("SET", self._key("meta", lot_id), json.dumps(states[lot_id])))
+        conn.pipeline(commands)
+
+    def _changes_after(self, version):
+        conn = self._conn()
+        for _ in range(self.MAX_RETRIES):
+            # The version and the list must come from the same moment: EXEC is
+            # refused if a commit landed in between, and we read again
+            conn.execute("WATCH", self._key("version"))
+            records = self._read_changes(conn, version)
+            if conn.transaction([("GET", self._key("version"))]) is not None:
+                return records
+        raise RuntimeError("Gave up reading changes after repeated write conflicts")
+
+    def _read_changes(self, conn, version):
+        current = int(conn.execute("GET", self._key("version")) or 0)
+        missing = current - version
+        if missing <= 0:
+            return []
+        if missing > CHANGE_HISTORY:
+            return None
+        records = [json.loads(raw) for raw in conn.execute("LRANGE", self._key("changes"), -missing, -1)]
+        # The list is written in version order, so the tail is exactly what we missed
+        records = [record for record in records if record["ver"] > version]
+        if not records or records[0]["ver"] != version + 1:
+            return None
+        return records
+
+    def close(self):
+        conn = getattr(self._local, "conn", None)
+        if conn is not None:
+            conn.close()
+            self._local.conn = None
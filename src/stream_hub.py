@@ -0,0 +1,210 @@
+"""
+ELC Parking App - Stream Hub
+Author: Jie Liang
+Course: CS2450
+
+Serves /api/stream from a single asyncio event loop, so an open stream
+costs a socket and a coroutine instead of a server thread:
+
+1. One watcher thread blocks on the ChangeFeed and, for each new version,
+   wakes the event loop once
+2. The loop resumes every subscriber coroutine; each one reads what is
+   newer than its own cursor (ChangeFeed.read_since never blocks) and
+   writes it out
+3. A slow client only stalls its own coroutine while its socket drains
+
+The hub runs two threads however many clients are connected. It does not
+know the event format: the server passes a subscribe(args, headers)
+callback that returns the new subscriber's cursor and a function that
+turns a cursor into (new cursor, message), or message None when the
+subscriber is up to date. parking_server starts the hub on its own port
+when run directly and redirects /api/stream to it.
+"""
+
+from urllib.parse import parse_qsl, urlsplit
+import asyncio
+import http.client
+import io
+import threading
+
+REQUEST_TIMEOUT = 10   # seconds a client gets to send its request headers
+MAX_REQUEST_BYTES = 16384
+
+STREAM_HEADERS = (
+    b"HTTP/1.1 200 OK\r\n"
+    b"Content-Type: text/event-stream; charset=utf-8\r\n"
+    b"Cache-Control: no-cache\r\n"
+    b"X-Accel-Buffering: no\r\n"
+    b"Access-Control-Allow-Origin: *\r\n"
+    b"Transfer-Encoding: chunked\r\n"
+    b"Connection: close\r\n"
+    b"\r\n"
+)
+
+PREFLIGHT_HEADERS = (
+    b"HTTP/1.1 204 No Content\r\n"
+    b"Access-Control-Allow-Origin: *\r\n"
+    b"Access-Control-Allow-Methods: GET\r\n"
+    b"Access-Control-Allow-Headers: Last-Event-ID, Cache-Control\r\n"
+    b"Connection: close\r\n"
+    b"\r\n"
+)
+
+
+def chunk(data):
+    """Frame data as one HTTP chunk, so clients hand it over as soon as it arrives"""
+    return b"%x\r\n%s\r\n" % (len(data), data)
+
+
+def error_response(status):
+    """Plain-text error response that closes the connection"""
+    return (f"HTTP/1.1 {status}\r\nContent-Type: text/plain\r\n"
+            f"Content-Length: {len(status)}\r\nConnection: close\r\n\r\n{status}").encode()
+
+
+class StreamHub:
+    """Event-loop server fanning one ChangeFeed out to many SSE clients"""
+
+    def __init__(self, feed, subscribe, host="127.0.0.1", port=5001,
+                 path="/api/stream", heartbeat=15):
+        self.feed = feed
+        self.subscribe = subscribe
+        self.host = host
+        self.port = port  # replaced by the bound port once started
+        self.path = path
+        self.heartbeat = heartbeat
+        self.subscribers = 0
+        self._loop = asyncio.new_event_loop()
+        self._server = None
+        self._announcements = 0  # feed changes the watcher has passed on
+        self._changed = None
+        self._stopped = threading.Event()
+        self._threads = []
+
+    def start(self):
+        """Bind the port and start the loop and watcher threads"""
+        ready = threading.Event()
+        failure = []
+
+        def run_loop():
+            asyncio.set_event_loop(self._loop)
+            try:
+                self._changed = asyncio.Event()
+                self._server = self._loop.run_until_complete(
+                    asyncio.start_server(self._serve, self.host, self.port))
+            except OSError as e:
+                failure.append(e)
+                self._loop.close()
+                ready.set()
+                return
+            self.port = self._server.sockets[0].getsockname()[1]
+            ready.set()
+            self._loop.run_forever()
+            self._server.close()
+            tasks = asyncio.all_tasks(self._loop)
+            for task in tasks:
+                task.cancel()
+            self._loop.run_until_complete(asyncio.gather(*tasks, return_exceptions=True))
+            self._loop.close()
+
+        loop_thread = threading.Thread(target=run_loop, name="stream-hub", daemon=True)
+        loop_thread.start()
+        ready.wait()
+        if failure:
+            loop_thread.join()
+            raise failure[0]
+        watcher = threading.Thread(target=self._watch, name="stream-hub-watcher", daemon=True)
+        watcher.start()
+        self._threads = [loop_thread, watcher]
+        return self
+
+    def stop(self):
+        """Stop accepting clients and shut both threads down"""
+        self._stopped.set()
+        self._loop.call_soon_threadsafe(self._loop.stop)
+        for thread in self._threads:
+            thread.join()
+
+    def _watch(self):
+        # The only thread that ever waits on the feed
+        seen = self.feed.version
+        while not self._stopped.is_set():
+            latest = self.feed.wait(seen, timeout=1)
+            if latest != seen:
+                seen = latest
+                self._loop.call_soon_threadsafe(self._announce)
+
+    def _announce(self):
+        self._announcements += 1
+        # Setting wakes everyone already waiting; clearing makes later
+        # waiters block until the next announcement
+        self._changed.set()
+        self._changed.clear()
+
+    async def _announced_after(self, seen):
+        while self._announcements == seen:
+            await self._changed.wait()
+
+    async def _serve(self, reader, writer):
+        try:
+            request = await self._read_request(reader, writer)
+            if request is not None:
+                await self._stream(writer, *request)
+        except (ConnectionError, asyncio.TimeoutError):
+            pass
+        except asyncio.CancelledError:
+            # stop() cancels open streams; end normally, since start_server
+            # reports a handler task that ends cancelled as an error
+            pass
+        finally:
+            writer.close()
+
+    async def _read_request(self, reader, writer):
+        """Parse the request head; answer anything but a stream request here"""
+        try:
+            head = await asyncio.wait_for(reader.readuntil(b"\r\n\r\n"), REQUEST_TIMEOUT)
+        except (asyncio.IncompleteReadError, asyncio.LimitOverrunError):
+            return None
+        if len(head) > MAX_REQUEST_BYTES:
+            writer.write(error_response("431 Request Header Fields Too Large"))
+            return None
+        request_line, _, header_block = head.partition(b"\r\n")
+        try:
+            method, target, _ = request_line.decode("latin-1").split(" ", 2)
+            headers = http.client.parse_headers(io.BytesIO(header_block))
+        except (ValueError, http.client.HTTPException):
+            writer.write(error_response("400 Bad Request"))
+            return None
+        url = urlsplit(target)
+        if url.path != self.path:
+            writer.write(error_response("404 Not Found"))
+            return None
+        if method == "OPTIONS":  # CORS preflight for Last-Event-ID
+            writer.write(PREFLIGHT_HEADERS)
+            return None
+        if method != "GET":
+            writer.write(error_response("405 Method Not Allowed"))
+            return None
+        return dict(parse_qsl(url.query)), headers
+
+    async def _stream(self, writer, args, headers):
+        cursor, next_message = self.subscribe(args, headers)
+        writer.write(STREAM_HEADERS + chunk(b"retry: 3000\n\n"))
+        self.subscribers += 1
+        try:
+            while True:
+                # Anything published after this read is announced later, so
+                # waiting for the next announcement cannot miss it
+                seen = self._announcements
+                cursor, message = next_message(cursor)
+                if message is not None:
+                    writer.write(chunk(message.encode()))
+                    await writer.drain()
+                    continue
+                try:
+                    await asyncio.wait_for(self._announced_after(seen), self.heartbeat)
+                except asyncio.TimeoutError:
+                    writer.write(chunk(b": keep-alive\n\n"))
+                    await writer.drain()
+        finally:
+            self.subscribers -= 1
@@ -0,0 +1,95 @@
+"""
+Unit Tests for the API Client
+Author: Jie Liang
+Course: CS2450
+
+Tests connection reuse, retries and background calls in api_client.py
+against a local HTTP/1.1 server
+"""
+
+import unittest
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+import threading
+import sys
+import os
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "src"))
+
+from api_client import ApiClient
+
+
+class CountingHandler(BaseHTTPRequestHandler):
+    """Answers GET with 200, or 503 while the server has failures queued"""
+
+    protocol_version = "HTTP/1.1"  # keep connections open between requests
+
+    def setup(self):
+        super().setup()
+        self.server.connections += 1
+
+    def do_GET(self):
+        self.server.requests.append((self.path, self.headers.get("If-None-Match")))
+        if self.server.failures:
+            self.server.failures -= 1
+            status, body = 503, b"busy"
+        else:
+            status, body = 200, b'{"ok": true}'
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
+
+
+class TestApiClient(unittest.TestCase):
+    """Test cases for ApiClient"""
+
+    def setUp(self):
+        self.server = ThreadingHTTPServer(("127.0.0.1", 0), CountingHandler)
+        self.server.daemon_threads = True
+        self.server.connections = 0
+        self.server.requests = []
+        self.server.failures = 0
+        threading.Thread(target=self.server.serve_forever, daemon=True).start()
+        self.addCleanup(self.server.server_close)
+        self.addCleanup(self.server.shutdown)
+        self.client = ApiClient(f"http://127.0.0.1:{self.server.server_address[1]}/api",
+                                backoff=0.01)
+        self.addCleanup(self.client.close)
+
+    def test_connection_reused(self):
+        """Test that repeated polls share one keep-alive connection"""
+        for _ in range(5):
+            self.assertEqual(self.client.get("/lots").status_code, 200)
+        self.assertEqual(self.server.connections, 1)
+
+    def test_etag_sent(self):
+        """Test that an ETag becomes an If-None-Match header"""
+        self.client.get("/lots", "lots-3")
+        self.client.get("/lots")
+        self.assertEqual(self.server.requests, [("/api/lots", "lots-3"), ("/api/lots", None)])
+
+    def test_retries_unavailable(self):
+        """Test that a 503 is retried and the final response returned"""
+        self.server.failures = 2
+        self.assertEqual(self.client.get("/lots").status_code, 200)
+        self.assertEqual(len(self.server.requests), 3)
+
+        # Out of retries: the last error response comes back
+        self.server.failures = 5
+        self.assertEqual(self.client.get("/lots").status_code, 503)
+
+    def test_submit_runs_in_background(self):
+        """Test that submit returns a Future for a call on another thread"""
+        future = self.client.submit(lambda: (threading.current_thread().name,
+                                             self.client.get("/lots").json()))
+        name, body = future.result(timeout=5)
+        self.assertTrue(name.startswith("api"))
+        self.assertEqual(body, {"ok": True})
+
+
+if __name__ == '__main__':
+    unittest.main()
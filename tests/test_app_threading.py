@@ -0,0 +1,273 @@
+"""
+Unit Tests for Client Threading
+Author: Jie Liang
+Course: CS2450
+
+Tests, without a display, that background refreshes reach the GUI only
+through MainThreadDispatcher, so every Tk call and every change to the
+ParkingSystem model happens on the main thread
+"""
+
+import unittest
+from unittest import mock
+from concurrent.futures import Future
+import threading
+import tempfile
+import shutil
+import time
+import sys
+import os
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "src"))
+
+# ParkingSystem reads and writes the client's config cache; keep it off the
+# developer's real ~/.elc_parking so a cached campus cannot change results
+CACHE_DIR = tempfile.mkdtemp()
+os.environ["ELC_CONFIG_CACHE"] = os.path.join(CACHE_DIR, "lots_config.json")
+
+from parking_app_UPDATED import MainThreadDispatcher, ParkingLot, ParkingSystem, RefreshWorker
+
+
+def tearDownModule():
+    shutil.rmtree(CACHE_DIR, ignore_errors=True)
+
+
+class FakeRoot:
+    """Stand-in for tk.Tk that records which threads call it"""
+
+    def __init__(self):
+        self.callers = set()
+        self.timers = []
+
+    def after(self, ms, callback, *args):
+        self.callers.add(threading.get_ident())
+        self.timers.append((callback, args))
+
+    def run_timers(self):
+        """One pass of the main loop: fire the timers scheduled so far"""
+        timers, self.timers = self.timers, []
+        for callback, args in timers:
+            callback(*args)
+
+
+class FakeSystem:
+    """Stand-in ParkingSystem that records the threads updates are applied on"""
+
+    def __init__(self, stream_updates):
+        self.stream_updates = list(stream_updates)
+        self.applied = []
+
+    def is_server_connected(self):
+        return True
+
+    def listen_for_changes(self, on_update, should_stop):
+        # Deliver the stream's events, then drop the connection
+        for update in self.stream_updates:
+            on_update(update)
+        self.stream_updates = []
+        return False
+
+    def fetch_data(self):
+        return {"server": True, "lots": []}
+
+    def apply_update(self, update):
+        self.applied.append((threading.get_ident(), update))
+        return update["server"]
+
+
+def fake_response(status, body=None, headers=None):
+    """A requests-style response for ApiClient.get"""
+    return mock.Mock(status_code=status, headers=headers or {}, json=lambda: body)
+
+
+class TestMainThreadDispatcher(unittest.TestCase):
+    """Test cases for MainThreadDispatcher"""
+
+    def setUp(self):
+        self.root = FakeRoot()
+        self.dispatcher = MainThreadDispatcher(self.root)
+        self.dispatcher.start()
+        self.calls = []
+
+    def record(self, *args):
+        self.calls.append((threading.get_ident(), args))
+
+    def test_posts_run_on_main_thread(self):
+        """Test that callbacks posted by a worker run on the main loop"""
+        worker = threading.Thread(target=self.dispatcher.post, args=(self.record, "lots"))
+        worker.start()
+        worker.join()
+        self.assertEqual(self.calls, [])
+
+        self.root.run_timers()
+        self.assertEqual(self.calls, [(threading.get_ident(), ("lots",))])
+        self.assertEqual(self.root.callers, {threading.get_ident()})
+
+    def test_post_result(self):
+        """Test that a Future's result is delivered, and a failure is not"""
+        future, failed = Future(), Future()
+        self.dispatcher.post_result(future, self.record)
+        self.dispatcher.post_result(failed, self.record)
+        self.root.run_timers()
+        self.assertEqual(self.calls, [])  # still in flight: nothing waits on it
+
+        threading.Thread(target=future.set_result, args=(True,)).start()
+        threading.Thread(target=failed.set_exception, args=(OSError(),)).start()
+        deadline = time.time() + 5
+        while not self.calls and time.time() < deadline:
+            self.root.run_timers()
+        self.assertEqual(self.calls, [(threading.get_ident(), (True,))])
+
+    def test_bursts_coalesced(self):
+        """Test that back-to-back identical updates are applied once"""
+        for _ in range(3):
+            self.dispatcher.post(self.record)
+        self.dispatcher.post(self.record, False)
+        self.root.run_timers()
+        self.assertEqual([args for _, args in self.calls], [(), (False,)])
+
+    def test_keeps_running_after_error(self):
+        """Test that a failing callback does not stop later updates"""
+        def fail():
+            raise RuntimeError("draw failed")
+        self.dispatcher.post(fail)
+        with self.assertRaises(RuntimeError):
+            self.root.run_timers()
+        self.dispatcher.post(self.record)
+        self.root.run_timers()
+        self.assertEqual(len(self.calls), 1)
+
+    def test_stop(self):
+        """Test that a stopped dispatcher schedules nothing more"""
+        self.dispatcher.stop()
+        self.dispatcher.post(self.record)
+        self.root.run_timers()
+        self.assertEqual(self.calls, [])
+        self.assertEqual(self.root.timers, [])
+
+
+class TestRefreshWorker(unittest.TestCase):
+    """Test that the auto-refresh thread never calls Tk itself"""
+
+    def test_refresh_posted_to_main_thread(self):
+        """Test a poll from the worker thread is drawn on the main thread"""
+        root = FakeRoot()
+        dispatcher = MainThreadDispatcher(root)
+        dispatcher.start()
+        refreshes = []
+        worker = RefreshWorker(ParkingSystem(), dispatcher, lambda: None,
+                               lambda server_used: refreshes.append(threading.get_ident()),
+                               interval=0.01)
+        worker.start()
+        try:
+            deadline = time.time() + 10
+            while not refreshes and time.time() < deadline:
+                root.run_timers()
+                time.sleep(0.01)
+        finally:
+            worker.stop()
+            worker.join(10)
+        self.assertFalse(worker.is_alive())
+        self.assertEqual(refreshes[:1], [threading.get_ident()])
+        self.assertEqual(root.callers, {threading.get_ident()})
+
+    def test_updates_applied_on_main_thread(self):
+        """Test that stream and poll updates change the model only on the main thread"""
+        root = FakeRoot()
+        dispatcher = MainThreadDispatcher(root)
+        dispatcher.start()
+        system = FakeSystem([{"server": True, "lots": [{"lot_id": "17", "occupied_spaces": 3}]}])
+        draws = []
+        worker = RefreshWorker(system, dispatcher, lambda: draws.append("live"),
+                               lambda server_used: draws.append(("poll", server_used)),
+                               interval=0.01)
+        worker.start()
+        try:
+            deadline = time.time() + 10
+            while ("poll", True) not in draws and time.time() < deadline:
+                root.run_timers()
+                time.sleep(0.01)
+        finally:
+            worker.stop()
+            worker.join(10)
+
+        self.assertEqual(draws[:2], ["live", ("poll", True)])
+        self.assertEqual({thread for thread, _ in system.applied}, {threading.get_ident()})
+        # The stream update, the dropped stream, then the poll
+        self.assertEqual([update["server"] for _, update in system.applied[:3]],
+                         [True, False, True])
+
+
+class TestFetchAndApply(unittest.TestCase):
+    """Test that fetching leaves the model alone until the update is applied"""
+
+    def setUp(self):
+        self.system = ParkingSystem()
+        lot = self.system.get_lot_by_id("17")
+        saved = (self.system.get_all_lots(), self.system._rankings, self.system._rankings_etag,
+                 self.system._lots_etag, self.system._server_connected,
+                 lot.total_spaces - lot.available_spaces)
+
+        def restore():
+            lots, rankings, rankings_etag, lots_etag, connected, occupied = saved
+            self.system._set_lots(lots)
+            self.system._rankings, self.system._rankings_etag = rankings, rankings_etag
+            self.system._lots_etag, self.system._server_connected = lots_etag, connected
+            lot.update_occupancy(occupied)
+        self.addCleanup(restore)
+
+    def test_fetch_then_apply(self):
+        """Test that fetch_data only reads, and apply_update makes the change"""
+        system = self.system
+        # Earlier tests may have simulated any occupancy, including 30
+        system.get_lot_by_id("17").update_occupancy(0)
+        responses = {
+            "/lots": fake_response(200, [{"lot_id": "17", "occupied_spaces": 30}],
+                                   {"ETag": '"lots-5"', "X-Lot-Config": system._config_version}),
+            "/recommendations": fake_response(200, {"rankings": {"Student": ["19", "17", "14"]}},
+                                              {"ETag": '"rank-5"'})
+        }
+        with mock.patch.object(system._api, "get",
+                               side_effect=lambda path, *args, **kwargs: responses[path]):
+            update = system.fetch_data()
+        lot = system.get_lot_by_id("17")
+        self.assertNotEqual(lot.available_spaces, lot.total_spaces - 30)
+        self.assertNotEqual(system._lots_etag, '"lots-5"')
+
+        self.assertTrue(system.apply_update(update))
+        self.assertEqual(lot.available_spaces, lot.total_spaces - 30)
+        self.assertEqual(system._lots_etag, '"lots-5"')
+        self.assertEqual(system._rankings["Student"], ["19", "17", "14"])
+        self.assertTrue(system.is_server_connected())
+
+    def test_stream_throttles_ranking_fetches(self):
+        """Test that a burst of stream events fetches rankings once per interval"""
+        system = self.system
+        event = ['event: lots', 'data: {"lots": [{"lot_id": "17", "occupied_spaces": 3}]}', '']
+        stream = mock.MagicMock(status_code=200)
+        stream.__enter__.return_value = stream
+        stream.iter_lines.return_value = event * 4
+        ranking = fake_response(200, {"rankings": {"Student": ["17"]}}, {"ETag": '"rank-1"'})
+        updates = []
+        with mock.patch.object(system._api, "stream", return_value=stream), \
+                mock.patch.object(system._api, "get", return_value=ranking) as get, \
+                mock.patch("parking_app_UPDATED.time.monotonic", side_effect=[100, 101, 105, 111]):
+            self.assertFalse(system.listen_for_changes(updates.append, lambda: False))
+
+        # Events at 100 and 111 s fetch; the two in between reuse the ranking
+        self.assertEqual(get.call_count, 2)
+        self.assertEqual(["rankings" in update for update in updates], [True, False, False, True])
+
+    def test_offline_fetch_simulates_on_apply(self):
+        """Test that an unreachable server is simulated only when applied"""
+        system = self.system
+        with mock.patch.object(system._api, "get", side_effect=OSError("unreachable")):
+            update = system.fetch_data()
+        self.assertEqual(update, {"server": False, "simulate": True})
+        with mock.patch.object(ParkingLot, "simulate_occupancy") as simulate:
+            self.assertFalse(system.apply_update(update))
+        self.assertEqual(simulate.call_count, len(system.get_all_lots()))
+
+
+if __name__ == '__main__':
+    unittest.main()
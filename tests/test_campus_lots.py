@@ -0,0 +1,66 @@
+"""
+Unit Tests for the Lot Configuration
+Author: Jie Liang
+Course: CS2450
+
+Tests loading, validating and versioning lot configs in campus_lots.py
+"""
+
+import unittest
+import copy
+import sys
+import os
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "src"))
+
+from campus_lots import LOTS_FILE, config_version, load_lots, validate_lots
+
+
+LOT = {"lot_id": "17", "name": "Lot 17", "total_spaces": 35, "permit_type": "Student",
+       "drive_time": 2, "walk_time": 4}
+
+
+class TestCampusLots(unittest.TestCase):
+    """Test cases for campus_lots.py"""
+
+    def test_shipped_config(self):
+        """Test that the lots.json shipped with the app is valid"""
+        lots = load_lots(LOTS_FILE)
+        self.assertEqual([lot["lot_id"] for lot in lots], ["17", "18", "19", "14"])
+        self.assertEqual(lots[3]["simulated_occupancy"], [15, 40])
+
+    def test_invalid_configs(self):
+        """Test that broken configs are rejected with a reason"""
+        broken = [
+            {},
+            {"lots": []},
+            {"lots": [dict(LOT, total_spaces="35")]},
+            {"lots": [dict(LOT, total_spaces=0)]},
+            {"lots": [dict(LOT, walk_time=True)]},
+            {"lots": [LOT, LOT]},
+            {"lots": [dict(LOT, permit_type="Faculty")]},
+            {"lots": [dict(LOT, permit_rules=[{"permits": ["Faculty"]}])]},
+            {"lots": [dict(LOT, simulated_occupancy=[30, 40])]},
+        ]
+        for data in broken:
+            with self.assertRaises(ValueError, msg=data):
+                validate_lots(data)
+
+    def test_permit_rules_allow_custom_type(self):
+        """Test that explicit permit rules make any permit_type label valid"""
+        lot = dict(LOT, permit_type="Evening", permit_rules=[{"permits": ["Visitor"],
+                                                              "from": "17:00"}])
+        self.assertEqual(validate_lots({"lots": [lot]}), [lot])
+
+    def test_version(self):
+        """Test that the version follows content, not key order"""
+        lots = [LOT]
+        reordered = [dict(reversed(list(LOT.items())))]
+        self.assertEqual(config_version(lots), config_version(reordered))
+        changed = copy.deepcopy(lots)
+        changed[0]["walk_time"] = 5
+        self.assertNotEqual(config_version(lots), config_version(changed))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,71 @@
+"""
+Unit Tests for Lot Recommendations
+Author: Jie Liang
+Course: CS2450
+
+Tests the permit index and scoring in lot_recommender.py
+"""
+
+import unittest
+import copy
+import sys
+import os
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "src"))
+
+import parking_server
+from lot_store import LotStore
+from lot_recommender import LotRecommender
+
+
+class FixedForecast:
+    """Forecast stand-in returning fixed predictions"""
+
+    def __init__(self, predictions=None):
+        self.predictions = predictions or {}
+        self.generation = 0
+
+    def prediction(self, lot_id):
+        return self.predictions.get(lot_id)
+
+
+class TestLotRecommender(unittest.TestCase):
+    """Test cases for LotRecommender"""
+
+    def setUp(self):
+        self.store = LotStore(copy.deepcopy(parking_server.PARKING_LOTS))
+        self.recommender = LotRecommender(self.store)
+
+    def test_permit_index(self):
+        """Test which lots each user type may use"""
+        self.assertEqual(sorted(self.recommender.eligible("Student")), ["14", "17", "19"])
+        self.assertEqual(sorted(self.recommender.eligible("Staff")), ["14", "18", "19"])
+        self.assertEqual(self.recommender.eligible("Visitor"), ("14",))
+
+    def test_empty_lots_rank_by_travel_time(self):
+        """Test that with room everywhere the quickest trip wins"""
+        ranking = self.recommender.rank("Student", FixedForecast())
+        # Lot 17: 2 + 4 min, Lot 19: 2 + 5, Lot 14: 3 + 7
+        self.assertEqual([lot["lot_id"] for lot in ranking], ["17", "19", "14"])
+        self.assertEqual([lot["rank"] for lot in ranking], [1, 2, 3])
+
+    def test_predicted_full_lot_drops(self):
+        """Test that a lot forecast to be full on arrival is ranked lower"""
+        forecast = FixedForecast({"17": 0, "19": 2})
+        ranking = self.recommender.rank("Student", forecast)
+        self.assertEqual([lot["lot_id"] for lot in ranking], ["14", "19", "17"])
+        self.assertEqual(ranking[2]["predicted_available_at_arrival"], 0)
+
+    def test_rankings_cached_per_version(self):
+        """Test that rankings are reused until the state changes"""
+        forecast = FixedForecast()
+        first = self.recommender.rank_ids("Staff", forecast)
+        self.assertIs(self.recommender.rank_ids("Staff", forecast), first)
+        self.store.fill_lot("18", True)
+        ranking = self.recommender.rank_ids("Staff", forecast)
+        self.assertIsNot(ranking, first)
+        self.assertEqual(ranking[-1][1], "18")
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,162 @@
+"""
+Unit Tests for the Lot Store
+Author: Jie Liang
+Course: CS2450
+
+Tests LotStore, including a stress test that hammers it from many threads
+and checks that counters, versions and snapshots stay consistent
+"""
+
+import unittest
+import threading
+import random
+import sys
+import os
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "src"))
+
+from lot_store import LotStore
+from space_bitmap import SpaceBitmap
+
+
+def make_lots(sizes):
+    """Build lot dicts in the server's format, one per entry in sizes"""
+    permits = ["Student", "Staff", "Both", "Open"]
+    return {
+        str(i): {
+            "lot_id": str(i),
+            "name": f"Lot {i}",
+            "total_spaces": size,
+            "permit_type": permits[i % len(permits)],
+            "drive_time": 1,
+            "walk_time": 1,
+            "version": 0,
+            "last_update": "",
+            "spaces": SpaceBitmap(size)
+        }
+        for i, size in enumerate(sizes)
+    }
+
+
+class TestLotStore(unittest.TestCase):
+    """Test cases for single-threaded LotStore behaviour"""
+
+    def setUp(self):
+        self.records = []
+        self.store = LotStore(make_lots([10, 20]), on_commit=self.records.append)
+
+    def test_commits_are_versioned(self):
+        """Test that each write commits one record with the next version"""
+        self.assertTrue(self.store.toggle_space("0", 3))
+        self.store.fill_lot("1", True)
+        changed = self.store.apply_events([("0", 3, True), ("0", 4, True), ("1", 0, False)])
+
+        self.assertEqual(changed, [False, True, True])
+        self.assertEqual([r["ver"] for r in self.records], [1, 2, 3])
+        self.assertEqual(self.store.version, 3)
+        self.assertEqual(self.store.lot_version("0"), 3)
+        self.assertEqual(self.store.summary("1")["occupied_spaces"], 19)
+        self.assertEqual(self.store.campus_occupied_count(), 21)
+
+    def test_replay_rebuilds_state(self):
+        """Test that replaying committed records reproduces the store"""
+        self.store.randomize_lot("1", 12)
+        self.store.toggle_space("0", 9)
+        replica = LotStore(make_lots([10, 20]))
+        for record in self.records:
+            replica.replay(record)
+        self.assertEqual(replica.summaries(), self.store.summaries())
+        self.assertEqual(replica.snapshot("1")[1], self.store.snapshot("1")[1])
+
+
+class TestLotStoreStress(unittest.TestCase):
+    """Stress test: many writer and reader threads at once"""
+
+    WRITERS = 8
+    READERS = 4
+    OPS_PER_WRITER = 400
+
+    def test_concurrent_writers_and_readers(self):
+        """Test that concurrent writes keep every invariant"""
+        sizes = [35, 45, 60, 50, 200, 8]
+        records = []
+        store = LotStore(make_lots(sizes), on_commit=records.append)
+        lot_ids = store.lot_ids()
+        failures = []
+        stop = threading.Event()
+
+        def writer(seed):
+            rng = random.Random(seed)
+            for _ in range(self.OPS_PER_WRITER):
+                lot_id = rng.choice(lot_ids)
+                size = sizes[int(lot_id)]
+                op = rng.random()
+                if op < 0.6:
+                    store.toggle_space(lot_id, rng.randrange(size))
+                elif op < 0.8:
+                    events = []
+                    for _ in range(rng.randint(1, 20)):
+                        other = rng.choice(lot_ids)
+                        events.append((other, rng.randrange(sizes[int(other)]), rng.random() < 0.5))
+                    store.apply_events(events)
+                elif op < 0.9:
+                    store.randomize_lot(lot_id, rng.randint(0, size), rng)
+                else:
+                    store.fill_lot(lot_id, rng.random() < 0.5)
+
+        def reader():
+            last_seen = dict.fromkeys(lot_ids, 0)
+            while not stop.is_set():
+                for lot_id in lot_ids:
+                    summary, spaces = store.snapshot(lot_id)
+                    if summary["occupied_spaces"] != spaces.count():
+                        failures.append(f"lot {lot_id} summary disagrees with its spaces")
+                    if summary["version"] < last_seen[lot_id]:
+                        failures.append(f"lot {lot_id} version went backwards")
+                    last_seen[lot_id] = summary["version"]
+
+        readers = [threading.Thread(target=reader) for _ in range(self.READERS)]
+        writers = [threading.Thread(target=writer, args=(seed,)) for seed in range(self.WRITERS)]
+        for thread in readers + writers:
+            thread.start()
+        for thread in writers:
+            thread.join()
+        stop.set()
+        for thread in readers:
+            thread.join()
+
+        self.assertEqual(failures, [])
+        self.assertEqual(store.check_counters(), [])
+        # Commits were handed out gap-free and delivered in version order
+        self.assertEqual([r["ver"] for r in records], list(range(1, len(records) + 1)))
+        self.assertEqual(store.version, len(records))
+
+        # The committed records alone reproduce the final state
+        replica = LotStore(make_lots(sizes))
+        for record in records:
+            replica.replay(record)
+        for lot_id in lot_ids:
+            self.assertEqual(replica.snapshot(lot_id)[1], store.snapshot(lot_id)[1])
+
+    def test_concurrent_toggles_are_not_lost(self):
+        """Test that toggling one space from many threads loses no update"""
+        store = LotStore(make_lots([5]))
+
+        def toggler():
+            for _ in range(1001):
+                store.toggle_space("0", 2)
+
+        threads = [threading.Thread(target=toggler) for _ in range(self.WRITERS)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        # 8 threads x 1001 toggles is an even number of flips
+        self.assertFalse(store.is_occupied("0", 2))
+        self.assertEqual(store.version, self.WRITERS * 1001)
+        self.assertEqual(store.check_counters(), [])
+
+
+if __name__ == '__main__':
+    unittest.main()
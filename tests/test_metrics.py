@@ -0,0 +1,93 @@
+"""
+Unit Tests for the Server Metrics
+Author: Jie Liang
+Course: CS2450
+
+Tests the sharded counters, histograms and gauges in metrics.py
+"""
+
+import unittest
+import threading
+import gc
+import sys
+import os
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "src"))
+
+from metrics import MetricsRegistry
+
+
+def samples(registry):
+    """Rendered metrics as {series: value}"""
+    result = {}
+    for line in registry.render().splitlines():
+        if not line.startswith("#"):
+            name, value = line.rsplit(" ", 1)
+            result[name] = float(value)
+    return result
+
+
+class TestMetricsRegistry(unittest.TestCase):
+    """Test cases for MetricsRegistry"""
+
+    def setUp(self):
+        self.registry = MetricsRegistry()
+
+    def test_counts_from_many_threads(self):
+        """Test that counts from running and exited threads all add up"""
+        counter = self.registry.counter("hits_total", "Hits", ("kind",), [("a",), ("b",)])
+
+        def work():
+            for _ in range(1000):
+                counter.labels("a").inc()
+
+        threads = [threading.Thread(target=work) for _ in range(8)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        gc.collect()
+        counter.labels("b").inc(2.5)  # this thread's shard is still live
+        result = samples(self.registry)
+        self.assertEqual(result['hits_total{kind="a"}'], 8000)
+        self.assertEqual(result['hits_total{kind="b"}'], 2.5)
+
+    def test_histogram_buckets(self):
+        """Test cumulative buckets, sum and count"""
+        histogram = self.registry.histogram("latency_seconds", "Latency", (0.1, 1))
+        for value in (0.05, 0.1, 0.5, 3):
+            histogram.labels().observe(value)
+        result = samples(self.registry)
+        self.assertEqual(result['latency_seconds_bucket{le="0.1"}'], 2)
+        self.assertEqual(result['latency_seconds_bucket{le="1"}'], 3)
+        self.assertEqual(result['latency_seconds_bucket{le="+Inf"}'], 4)
+        self.assertEqual(result["latency_seconds_count"], 4)
+        self.assertAlmostEqual(result["latency_seconds_sum"], 3.65)
+
+    def test_late_registration(self):
+        """Test that metrics registered after recording started still work"""
+        first = self.registry.counter("first_total", "First")
+        first.labels().inc()
+        second = self.registry.counter("second_total", "Second")
+        second.labels().inc(3)
+        result = samples(self.registry)
+        self.assertEqual((result["first_total"], result["second_total"]), (1, 3))
+
+    def test_labels_must_be_registered(self):
+        """Test that unregistered label values are refused"""
+        counter = self.registry.counter("hits_total", "Hits", ("kind",), [("a",)])
+        with self.assertRaises(KeyError):
+            counter.labels("b")
+
+    def test_gauge_and_escaping(self):
+        """Test gauges read at scrape time with label values escaped"""
+        levels = {'lot "A"\\': 3}
+        self.registry.gauge("level", "Level", ("lot",), lambda: [((k,), v) for k, v in levels.items()])
+        self.assertIn('level{lot="lot \\"A\\"\\\\"} 3', self.registry.render())
+        levels['lot "A"\\'] = 5
+        self.assertIn("# TYPE level gauge", self.registry.render())
+        self.assertIn(" 5\n", self.registry.render())
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,108 @@
+"""
+Unit Tests for the Availability Forecast
+Author: Jie Liang
+Course: CS2450
+
+Tests the trend and weekly-profile predictions in occupancy_forecast.py
+and their use in /api/lots
+"""
+
+import unittest
+from unittest import mock
+import calendar
+import copy
+import time
+import sys
+import os
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "src"))
+
+import parking_server
+from lot_store import LotStore
+from occupancy_series import OccupancySeries
+from occupancy_forecast import AvailabilityForecaster, week_hour
+from test_lot_store import make_lots
+
+
+def monday_midnight():
+    """A local Monday 00:00 as the forecaster sees it, well in the past"""
+    t = 1700000000 // 3600 * 3600
+    return int(t - week_hour(t) * 3600)
+
+
+class TestAvailabilityForecaster(unittest.TestCase):
+    """Test cases for AvailabilityForecaster"""
+
+    def setUp(self):
+        lots = make_lots([100])
+        lots["0"]["drive_time"] = 30
+        self.store = LotStore(lots)
+        self.store.randomize_lot("0", 10)
+
+    def test_trend_follows_arrivals(self):
+        """Test that a burst of arrivals lowers the predicted availability"""
+        now = monday_midnight() + 12 * 3600
+        series = OccupancySeries({"0": 10}, now)
+        forecaster = AvailabilityForecaster(self.store, series)
+        self.assertIsNone(forecaster.prediction("0"))
+
+        self.assertTrue(forecaster.tick(now))
+        self.assertEqual(forecaster.prediction("0"), 90)
+        self.assertFalse(forecaster.tick(now + 30))  # once per minute
+
+        forecaster.observe({"0": 20})
+        forecaster.tick(now + 60)
+        # 10 arrivals in a minute, averaged and damped over a 30 minute drive
+        self.assertEqual(forecaster.prediction("0"), 71)
+        self.assertEqual(forecaster.generation, 2)
+
+    def test_weekly_profile(self):
+        """Test that a regular 8am rush is expected before it starts"""
+        start = monday_midnight()
+        series = OccupancySeries({"0": 10}, start)
+        for hour in range(21 * 24):
+            series.record({"0": 90 if hour % 24 == 8 else 10}, start + hour * 3600)
+
+        # Three weeks later, Monday 7:45 with a 30 minute drive
+        now = start + 21 * 86400 + 7 * 3600 + 45 * 60
+        series.record({"0": 10}, now)
+        forecaster = AvailabilityForecaster(self.store, series)
+        forecaster.tick(now)
+        # The profile predicts 50 occupied (weight 3/4), the flat trend 10
+        self.assertEqual(forecaster.prediction("0"), 60)
+
+    @unittest.skipUnless(hasattr(time, "tzset"), "needs time.tzset to switch time zones")
+    def test_week_hours_follow_daylight_saving(self):
+        """Test that hours on both sides of a DST change keep their local hour"""
+        # Noon on Sunday 15 Jan 2023 (UTC-7) and on Saturday 15 Jul 2023 (UTC-6)
+        winter = calendar.timegm((2023, 1, 15, 19, 0, 0))
+        summer = calendar.timegm((2023, 7, 15, 18, 0, 0))
+        self.addCleanup(time.tzset)  # runs after patch.dict has restored TZ
+        with mock.patch.dict(os.environ, {"TZ": "America/Denver"}):
+            time.tzset()
+            hours = week_hour([winter, summer, winter + 3600])
+        self.assertEqual(list(hours), [6 * 24 + 12, 5 * 24 + 12, 6 * 24 + 13])
+
+
+class TestLotsPrediction(unittest.TestCase):
+    """Test that /api/lots carries predictions"""
+
+    def setUp(self):
+        parking_server.install_lots(copy.deepcopy(parking_server.PARKING_LOTS))
+        self.client = parking_server.app.test_client()
+
+    def test_lots_include_prediction(self):
+        """Test the predicted_available_at_arrival field and its ETag"""
+        response = self.client.get("/api/lots")
+        for lot in response.get_json():
+            self.assertEqual(lot["predicted_available_at_arrival"], lot["available_spaces"])
+
+        # A new minute of forecasts invalidates cached copies
+        etag = response.headers["ETag"]
+        parking_server.FORECAST.tick(parking_server.FORECAST._minute * 60 + 60)
+        again = self.client.get("/api/lots", headers={"If-None-Match": etag})
+        self.assertEqual(again.status_code, 200)
+
+
+if __name__ == '__main__':
+    unittest.main()
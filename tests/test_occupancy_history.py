@@ -0,0 +1,174 @@
+"""
+Unit Tests for the Occupancy History
+Author: Jie Liang
+Course: CS2450
+
+Tests partitioned event storage, minute/hour rollups and retention in
+occupancy_history.py
+"""
+
+import unittest
+from unittest import mock
+import tempfile
+import shutil
+import copy
+import time
+import sys
+import os
+from datetime import datetime, timezone
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "src"))
+
+import parking_server
+from occupancy_history import OccupancyHistory, WHOLE_LOT
+
+
+def utc(*args):
+    """Epoch seconds for a UTC date and time"""
+    return datetime(*args, tzinfo=timezone.utc).timestamp()
+
+
+def set_record(ver, ts, lot_id, space_index, occupied):
+    """A "set" change record committed at epoch time ts"""
+    return {"op": "set", "lot": lot_id, "i": space_index, "v": occupied, "ver": ver,
+            "ts": datetime.fromtimestamp(ts).isoformat()}
+
+
+class TestOccupancyHistory(unittest.TestCase):
+    """Test cases for OccupancyHistory"""
+
+    def setUp(self):
+        self.tmpdir = tempfile.mkdtemp()
+        self.history = OccupancyHistory(os.path.join(self.tmpdir, "history.db"),
+                                        raw_retention_days=30, minute_retention_days=60)
+
+    def tearDown(self):
+        self.history.close()
+        shutil.rmtree(self.tmpdir, ignore_errors=True)
+
+    def table_names(self):
+        return {name for (name,) in self.history._conn.execute(
+            "SELECT name FROM sqlite_master WHERE type = 'table'")}
+
+    def test_events_are_partitioned_by_month(self):
+        """Test that events land in one table per UTC month"""
+        self.history.record(set_record(1, utc(2026, 1, 31, 23, 59, 30), "17", 0, 1), {"17": 1})
+        self.history.record(set_record(2, utc(2026, 2, 1, 0, 0, 10), "17", 1, 1), {"17": 2})
+        self.history.record({"op": "batch", "sets": [["18", 0, 1], ["17", 0, 0]], "ver": 3,
+                             "ts": datetime.fromtimestamp(utc(2026, 2, 1, 0, 1)).isoformat()},
+                            {"17": 1, "18": 1})
+        self.history.flush()
+
+        self.assertTrue({"events_202601", "events_202602"} <= self.table_names())
+        events = self.history.events("17", utc(2026, 1, 1), utc(2026, 3, 1))
+        self.assertEqual([(space, occupied, count) for _, space, occupied, count in events],
+                         [(0, 1, 1), (1, 1, 2), (0, 0, 1)])
+
+    def test_rollups(self):
+        """Test that closed minutes and hours are summarised"""
+        start = utc(2026, 3, 2, 8, 0)
+        counts = [1, 2, 3, 2, 5]
+        offsets = [5, 20, 50, 70, 3700]  # three events in 8:00, one in 8:01, one in 9:01
+        for ver, (offset, count) in enumerate(zip(offsets, counts), 1):
+            self.history.record(set_record(ver, start + offset, "19", ver, 1), {"19": count})
+        self.history.record({"op": "fill", "lot": "19", "v": 0, "ver": 6,
+                             "ts": datetime.fromtimestamp(start + 3710).isoformat()}, {"19": 0})
+
+        self.history.rollup(now=start + 2 * 3600 + 60)
+
+        minutes = self.history.rollups("19", start, start + 7200)
+        self.assertEqual([row[0] - start for row in minutes], [0, 60, 3660])
+        self.assertEqual(minutes[0][1:], (3, 2.0, 1, 3, 3))
+        self.assertEqual(minutes[2][1:], (2, 2.5, 0, 5, 0))
+        hours = self.history.rollups("19", start, start + 7200, resolution="1h")
+        self.assertEqual(hours, [(start, 4, 2.0, 1, 3, 2), (start + 3600, 2, 2.5, 0, 5, 0)])
+        events = self.history.events("19", start + 3600, start + 7200)
+        self.assertEqual(events[-1][1], WHOLE_LOT)
+
+    def test_rollup_columns(self):
+        """Test reading every lot's rollups as arrays, and levels before a time"""
+        start = utc(2026, 3, 2, 8, 0)
+        self.history.record(set_record(1, start + 5, "19", 0, 1), {"19": 1})
+        self.history.record(set_record(2, start + 65, "20", 0, 1), {"20": 3})
+        self.history.record(set_record(3, start + 70, "19", 1, 1), {"19": 2})
+        self.assertIsNone(self.history.rolled_until("1h"))
+
+        self.history.rollup(now=start + 3660)
+
+        self.assertEqual(self.history.rolled_until("1m"), start + 3600)
+        self.assertEqual(self.history.rolled_until("1h"), start + 3600)
+        columns = self.history.rollup_columns(start, start + 3600)
+        rows = sorted(zip(columns["lot_id"], (columns["bucket"] - start).tolist(),
+                          columns["samples"].tolist(), columns["sum"].tolist(),
+                          columns["last"].tolist()))
+        self.assertEqual(rows, [("19", 0, 1, 1, 1), ("19", 60, 1, 2, 2), ("20", 60, 1, 3, 3)])
+        self.assertEqual(self.history.rollup_columns(start + 3600, start + 7200, "1h")["bucket"].size, 0)
+        self.assertEqual(self.history.last_levels(["19", "20", "21"], start + 60), {"19": 1})
+        self.assertEqual(self.history.last_levels(["19", "20"], start + 3600, "1h"),
+                         {"19": 2, "20": 3})
+
+    def test_retention_drops_rolled_up_data(self):
+        """Test that old raw partitions and minute rollups expire, hours stay"""
+        old = utc(2026, 1, 10, 12, 0)
+        self.history.record(set_record(1, old, "14", 0, 1), {"14": 1})
+        self.history.rollup(now=utc(2026, 4, 1))
+
+        self.assertNotIn("events_202601", self.table_names())
+        self.assertEqual(self.history.rollups("14", old - 3600, old + 3600), [])
+        self.assertEqual(self.history.rollups("14", old - 3600, old + 3600, "1h"),
+                         [(old, 1, 1.0, 1, 1, 1)])
+
+
+class TestServerHistory(unittest.TestCase):
+    """Test that the server records committed changes"""
+
+    def setUp(self):
+        self.tmpdir = tempfile.mkdtemp()
+        self.original_data_file = parking_server.DATA_FILE
+        parking_server.DATA_FILE = os.path.join(self.tmpdir, "parking_data.json")
+        parking_server.HISTORY = OccupancyHistory(os.path.join(self.tmpdir, "history.db"))
+        parking_server.install_lots(copy.deepcopy(parking_server.PARKING_LOTS))
+
+    def tearDown(self):
+        parking_server.close_data()
+        parking_server.CHANGE_LOG = None
+        parking_server.DATA_FILE = self.original_data_file
+        shutil.rmtree(self.tmpdir, ignore_errors=True)
+
+    def test_changes_are_recorded(self):
+        """Test that toggles and batches reach the history with lot occupancy"""
+        client = parking_server.app.test_client()
+        client.post("/api/lot/17/toggle/4")
+        client.post("/api/events", json={"events": [
+            {"lot_id": "17", "space_index": 5, "occupied": True},
+            {"lot_id": "17", "space_index": 4, "occupied": False}
+        ]})
+        events = parking_server.HISTORY.events("17", 0, utc(2100, 1, 1))
+        self.assertEqual([(space, occupied, count) for _, space, occupied, count in events],
+                         [(4, 1, 1), (5, 1, 1), (4, 0, 1)])
+
+    def test_series_backfill_from_rollups(self):
+        """Test that startup loads rolled-up hours and replays only the raw tail"""
+        history = parking_server.HISTORY
+        hour = int(time.time()) // 3600 * 3600
+        history.record(set_record(1, hour - 7200 + 600, "17", 0, 1), {"17": 30})
+        history.rollup(now=hour)  # rolls up to hour - 60 and hour - 3600
+        history.record(set_record(2, hour - 1800, "17", 1, 1), {"17": 10})
+
+        with mock.patch.object(history, "lot_levels", wraps=history.lot_levels) as lot_levels:
+            parking_server.start_series()
+        self.assertEqual(lot_levels.call_args[0][0], hour - 3600)
+
+        series = parking_server.SERIES
+        hours = series.query("17", hour - 7200, hour, 3600, now=time.time())
+        self.assertEqual(hours["t"], [hour - 7200, hour - 3600])
+        self.assertEqual(hours["mean"], [30.0, 20.0])
+        self.assertEqual(hours["min"], [30, 10])
+        self.assertEqual(hours["last"], [30, 10])
+        minutes = series.query("17", hour - 7200, hour - 3600, 60, now=time.time())
+        self.assertEqual(minutes["t"][0], hour - 7200 + 600)
+        self.assertEqual(set(minutes["last"]), {30})
+
+
+if __name__ == '__main__':
+    unittest.main()
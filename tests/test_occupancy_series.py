@@ -0,0 +1,103 @@
+"""
+Unit Tests for the Occupancy Time Series
+Author: Jie Liang
+Course: CS2450
+
+Tests the NumPy rollups in occupancy_series.py
+"""
+
+import unittest
+import sys
+import os
+
+import numpy as np
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "src"))
+
+from occupancy_history import ROLLUP_DTYPE
+from occupancy_series import OccupancySeries
+
+
+DAY = 86400
+
+
+class TestOccupancySeries(unittest.TestCase):
+    """Test cases for OccupancySeries"""
+
+    def setUp(self):
+        self.start = 1000 * DAY  # midnight UTC, so every bucket width lines up
+        self.series = OccupancySeries({"17": 0, "18": 5}, self.start)
+
+    def test_load_rollups(self):
+        """Test filling closed hours from history rollups before recording"""
+        now = self.start + 3 * 3600
+        series = OccupancySeries({"17": 4, "18": 5}, now)
+        # (lot_id, bucket, samples, sum, min, max, last)
+        series.load(3600, np.array([
+            ("17", self.start, 2, 6, 2, 4, 2),
+            ("17", self.start + 3600, 1, 4, 4, 4, 4),
+            ("99", self.start, 1, 1, 1, 1, 1)
+        ], ROLLUP_DTYPE), {"17": 1})
+
+        result = series.query("17", self.start, now, 3600, now=now)
+        self.assertEqual(result["t"], [self.start, self.start + 3600, self.start + 7200])
+        # Mean of the starting level and the level after each change
+        self.assertEqual(result["mean"], [2.33, 3.0, 4.0])
+        self.assertEqual(result["min"], [1, 2, 4])
+        self.assertEqual(result["max"], [4, 4, 4])
+        self.assertEqual(result["last"], [2, 4, 4])
+        # A lot without rollups holds its level; unknown lots are skipped
+        self.assertEqual(series.query("18", self.start, now, 3600, now=now)["mean"], [5.0] * 3)
+        self.assertIsNone(series.query("99", self.start, now, 3600, now=now))
+
+    def test_means_are_time_weighted(self):
+        """Test that a bucket's mean weights each level by how long it lasted"""
+        self.series.record({"17": 10}, self.start + 30)
+        result = self.series.query("17", self.start, self.start + 120, 60, now=self.start + 90)
+
+        self.assertEqual(result["t"], [self.start, self.start + 60])
+        self.assertEqual(result["mean"], [5.0, 10.0])  # the open bucket counts until now
+        self.assertEqual(result["min"], [0, 10])
+        self.assertEqual(result["max"], [10, 10])
+        self.assertEqual(result["last"], [10, 10])
+
+    def test_wider_buckets_aggregate_minutes(self):
+        """Test that 5-minute buckets combine the minute rollups"""
+        for minute in range(10):
+            self.series.record({"18": minute}, self.start + minute * 60)
+        result = self.series.query("18", self.start, self.start + 600, 300,
+                                   now=self.start + 600)
+
+        self.assertEqual(result["t"], [self.start, self.start + 300])
+        self.assertEqual(result["mean"], [2.0, 7.0])
+        self.assertEqual(result["min"], [0, 4])
+        self.assertEqual(result["max"], [5, 9])
+        self.assertEqual(result["last"], [4, 9])
+        # The other lot is untouched
+        other = self.series.query("17", self.start, self.start + 600, 300, now=self.start + 600)
+        self.assertEqual(other["mean"], [0.0, 0.0])
+
+    def test_quiet_periods_and_hour_tier(self):
+        """Test a week of mostly idle time served from hourly buckets"""
+        self.series.record({"17": 20}, self.start + 3 * 3600)
+        now = self.start + 7 * DAY
+        result = self.series.query("17", self.start, now, 86400, now=now)
+
+        self.assertEqual(len(result["t"]), 7)
+        self.assertEqual(result["mean"][0], 17.5)  # 0 for 3 hours, then 20 for 21
+        self.assertEqual(result["mean"][1:], [20.0] * 6)
+        # Minute buckets only reach back two days
+        minutes = self.series.query("17", self.start, now, 60, now=now)
+        self.assertEqual(minutes["t"][0], now - 2 * DAY + 60)
+
+    def test_new_lots_get_rows(self):
+        """Test that a lot first seen in a change is added"""
+        self.series.record({"99": 3}, self.start + 10)
+        result = self.series.query("99", self.start, self.start + 60, 60, now=self.start + 60)
+        self.assertEqual(result["last"], [3])
+        self.assertIsNone(self.series.query("nope", self.start, self.start + 60, 60,
+                                            now=self.start + 60))
+
+
+if __name__ == '__main__':
+    unittest.main()
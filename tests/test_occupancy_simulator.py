@@ -0,0 +1,122 @@
+"""
+Unit Tests for the Campus Occupancy Simulator
+Author: Jie Liang
+Course: CS2450
+
+Tests the seeded event streams in occupancy_simulator.py and replaying
+them into the server's /api/events ingest path
+"""
+
+import unittest
+from datetime import datetime
+import sys
+import os
+
+import numpy as np
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "src"))
+
+import parking_server
+from campus_lots import load_lots, validate_lots
+from occupancy_simulator import CampusSimulator, replay, synthetic_lots
+from test_parking_server import ServerTestCase
+
+
+MONDAY_6AM = datetime(2024, 1, 8, 6, 0).timestamp()
+SATURDAY_6AM = datetime(2024, 1, 13, 6, 0).timestamp()
+
+
+class TestCampusSimulator(unittest.TestCase):
+    """Test cases for CampusSimulator"""
+
+    def setUp(self):
+        self.lots = synthetic_lots(200, seed=7)
+
+    def run_until(self, simulator, hour):
+        while datetime.fromtimestamp(simulator.time).hour < hour:
+            simulator.step()
+
+    def test_seeded_runs_repeat(self):
+        """Test that the same seed gives the same events, another seed does not"""
+        first = CampusSimulator(self.lots, seed=3, start=MONDAY_6AM)
+        second = CampusSimulator(self.lots, seed=3, start=MONDAY_6AM)
+        other = CampusSimulator(self.lots, seed=4, start=MONDAY_6AM)
+        for _ in range(30):
+            a, b, c = first.step(), second.step(), other.step()
+            self.assertTrue(np.array_equal(a.spaces, b.spaces))
+            self.assertTrue(np.array_equal(a.lots, b.lots))
+        self.assertFalse(np.array_equal(first.occupied, other.occupied))
+
+    def test_events_match_state(self):
+        """Test that every event flips a space and counts follow the events"""
+        simulator = CampusSimulator(self.lots, seed=1, start=MONDAY_6AM)
+        counts = simulator.counts()
+        for _ in range(60):
+            events = simulator.step()
+            changes = np.where(events.occupied, 1, -1)
+            counts = counts + np.bincount(events.lots, changes, minlength=len(self.lots))
+        self.assertTrue(np.array_equal(counts, simulator.counts()))
+        self.assertTrue((counts <= [lot["total_spaces"] for lot in self.lots]).all())
+
+    def test_morning_rush(self):
+        """Test that lots fill through a weekday morning and stay quiet on weekends"""
+        weekday = CampusSimulator(self.lots, seed=1, start=MONDAY_6AM)
+        self.run_until(weekday, 11)
+        weekend = CampusSimulator(self.lots, seed=1, start=SATURDAY_6AM)
+        self.run_until(weekend, 11)
+
+        # Close to the demand profile, and far busier than a Saturday
+        occupied = weekday.counts().sum()
+        self.assertAlmostEqual(occupied / weekday.demand().sum(), 1, delta=0.2)
+        self.assertGreater(occupied, 3 * weekend.counts().sum())
+
+    def test_warm_start(self):
+        """Test starting at the expected level without generating events"""
+        simulator = CampusSimulator(self.lots, seed=1,
+                                    start=datetime(2024, 1, 8, 11, 0).timestamp())
+        simulator.warm_start()
+        self.assertAlmostEqual(simulator.counts().sum() / simulator.demand().sum(), 1, delta=0.05)
+
+    def test_synthetic_lots(self):
+        """Test that generated campuses are valid lot configs"""
+        self.assertEqual(validate_lots({"lots": self.lots}), self.lots)
+        self.assertEqual(synthetic_lots(200, seed=7), self.lots)
+
+
+class TestReplay(ServerTestCase):
+    """Test cases for replaying simulated events"""
+
+    def test_replay_into_ingest(self):
+        """Test that a replay through /api/events reproduces the simulation"""
+        simulator = CampusSimulator(load_lots(), seed=2, start=MONDAY_6AM)
+
+        def post(events):
+            response = self.client.post("/api/events", json={"events": events})
+            self.assertEqual(response.status_code, 200)
+            self.assertTrue(all(result["changed"] for result in response.get_json()["results"]))
+
+        stats = replay(simulator, post, minutes=180, speed=0, batch_size=20)
+        self.assertEqual(stats["steps"], 180)
+        self.assertGreater(stats["batches"], stats["steps"] / 2)
+        for lot_id, count in zip(simulator.lot_ids, simulator.counts()):
+            self.assertEqual(parking_server.get_occupied_count(lot_id), count)
+
+    def test_speed(self):
+        """Test that replay keeps to the schedule at a speed multiple"""
+        now = [0.0]
+        sleeps = []
+
+        def sleep(seconds):
+            sleeps.append(seconds)
+            now[0] += seconds
+
+        simulator = CampusSimulator(load_lots(), seed=2, start=MONDAY_6AM)
+        stats = replay(simulator, lambda events: None, minutes=10, speed=60,
+                       clock=lambda: now[0], sleep=sleep)
+        # Ten simulated minutes at 60x take ten seconds, one per step
+        self.assertEqual(len(sleeps), 10)
+        self.assertAlmostEqual(stats["elapsed"], 10)
+
+
+if __name__ == '__main__':
+    unittest.main()
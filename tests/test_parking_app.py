@@ -7,9 +7,17 @@ Tests the core functionality of ParkingLot, User, and ParkingSystem classes
 """
 
 import unittest
+from unittest import mock
+import tempfile
+import shutil
 import sys
 import os
 
+# ParkingSystem reads and writes the client's config cache; keep it off the
+# developer's real ~/.elc_parking so a cached campus cannot change results
+CACHE_DIR = tempfile.mkdtemp()
+os.environ["ELC_CONFIG_CACHE"] = os.path.join(CACHE_DIR, "lots_config.json")
+
 # Add the parent directory to the path to import the parking app
 sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
 
@@ -20,8 +28,16 @@ try:
         ParkingLot, 
         User, 
         ParkingSystem, 
+        ParkingAppGUI,
         UserType, 
-        ParkingStatus
+        ParkingStatus,
+        ALL,
+        lot_card_view,
+        changed_options,
+        filter_lots,
+        visible_range,
+        load_config_cache,
+        save_config_cache
     )
 except ImportError:
     print("Error: Could not import from parking_app_UPDATED.py")
@@ -29,6 +45,10 @@ except ImportError:
     sys.exit(1)
 
 
+def tearDownModule():
+    shutil.rmtree(CACHE_DIR, ignore_errors=True)
+
+
 class TestParkingLot(unittest.TestCase):
     """Test cases for ParkingLot class"""
     
@@ -89,6 +109,12 @@ class TestParkingLot(unittest.TestCase):
         # Test lower bound
         self.lot.update_occupancy(-10)  # Try negative
         self.assertEqual(self.lot.available_spaces, 35)
+    
+    def test_compact(self):
+        """Test that lots have no per-instance dict and share default rules"""
+        self.assertFalse(hasattr(self.lot, "__dict__"))
+        other = ParkingLot("20", "Lot 20", 80, "Student", 4)
+        self.assertIs(other.permit_rules, self.lot.permit_rules)
 
 
 class TestUser(unittest.TestCase):
@@ -156,6 +182,188 @@ class TestParkingSystem(unittest.TestCase):
         lot = system.get_lot_by_id("999")
         
         self.assertIsNone(lot)
+    
+    def test_get_lots_by_permit_type(self):
+        """Test the lots listed under each permit type"""
+        system = ParkingSystem()
+        self.assertEqual([lot.lot_id for lot in system.get_lots_by_permit_type("Staff")], ["18"])
+        self.assertEqual(system.get_lots_by_permit_type("Visitor"), [])
+    
+    def test_recommended_lots_follow_server_ranking(self):
+        """Test that recommendations use the server's ranking when connected"""
+        system = ParkingSystem()
+        saved = (system._rankings, system._server_connected)
+        try:
+            system._rankings = {"Student": ["14", "19", "17"]}
+            system._server_connected = True
+            ranked = system.get_recommended_lots(UserType.STUDENT)
+            self.assertEqual([lot.lot_id for lot in ranked], ["14", "19", "17"])
+            
+            # Offline: permitted lots in list order
+            system._server_connected = False
+            ranked = system.get_recommended_lots(UserType.STUDENT)
+            self.assertEqual([lot.lot_id for lot in ranked], ["17", "19", "14"])
+        finally:
+            system._rankings, system._server_connected = saved
+
+
+class TestLotCardView(unittest.TestCase):
+    """Test cases for the retained lot card's change detection"""
+    
+    def setUp(self):
+        self.lot = ParkingLot("17", "Lot 17", 35, "Student", 2)
+        self.lot.update_occupancy(10)
+        self.shown = lot_card_view(self.lot, 1)
+    
+    def test_unchanged_lot_needs_no_update(self):
+        """Test that redrawing an unchanged lot changes nothing"""
+        self.assertEqual(changed_options(self.shown, lot_card_view(self.lot, 1)), {})
+    
+    def test_occupancy_change(self):
+        """Test that a new occupancy only touches the count and progress bar"""
+        self.lot.update_occupancy(12)
+        changes = changed_options(self.shown, lot_card_view(self.lot, 1))
+        self.assertEqual(set(changes), {("available", "text"), ("fill", "width")})
+        self.assertEqual(changes[("available", "text")], "23 / 35")
+    
+    def test_status_change_recolors(self):
+        """Test that crossing a status threshold recolors the card"""
+        self.lot.update_occupancy(35)
+        changes = changed_options(self.shown, lot_card_view(self.lot, 1))
+        self.assertIn(("header", "bg"), changes)
+        self.assertEqual(changes[("status", "text")], "● FULL")
+    
+    def test_new_rank(self):
+        """Test that moving down the ranking only relabels the priority"""
+        changes = changed_options(self.shown, lot_card_view(self.lot, 2))
+        self.assertEqual(changes, {("priority", "text"): "Option #2"})
+
+
+class TestLotList(unittest.TestCase):
+    """Test cases for lot search, filters and the virtual grid's view"""
+    
+    def setUp(self):
+        self.lots = [ParkingLot("17", "Lot 17", 35, "Student", 2),
+                     ParkingLot("18", "Lot 18", 45, "Staff", 1),
+                     ParkingLot("19", "North Garage", 60, "Both", 2)]
+        self.lots[1].update_occupancy(45)
+    
+    def test_search(self):
+        """Test searching by lot id or name, ignoring case"""
+        self.assertEqual([lot.lot_id for lot in filter_lots(self.lots, "north")], ["19"])
+        self.assertEqual([lot.lot_id for lot in filter_lots(self.lots, "LOT 1")], ["17", "18"])
+        self.assertEqual(filter_lots(self.lots, ""), self.lots)
+    
+    def test_filters(self):
+        """Test filtering by permit type and status"""
+        self.assertEqual([lot.lot_id for lot in filter_lots(self.lots, permit_type="Staff")], ["18"])
+        self.assertEqual([lot.lot_id for lot in filter_lots(self.lots, status="Full")], ["18"])
+        self.assertEqual(filter_lots(self.lots, permit_type="All", status="All"), self.lots)
+        self.assertEqual(filter_lots(self.lots, "17", status="Full"), [])
+    
+    def test_visible_range(self):
+        """Test which items are in view as the list scrolls"""
+        # 2 columns of 100 px rows, a 250 px view: rows 0-2 are (partly) visible
+        self.assertEqual(visible_range(1000, 2, 100, 0, 250), range(0, 6))
+        self.assertEqual(visible_range(1000, 2, 100, 4950, 250), range(98, 104))
+        # Near the end only the lots that exist
+        self.assertEqual(visible_range(5, 2, 100, 100, 250), range(2, 5))
+        self.assertEqual(visible_range(0, 2, 100, 0, 250), range(0, 0))
+    
+    def test_view_size_independent_of_lot_count(self):
+        """Test that the number of cards needed only depends on the view"""
+        for count in (100, 1000, 100000):
+            self.assertEqual(len(visible_range(count, 2, 100, 500, 250)), 6)
+
+
+class TestLotConfig(unittest.TestCase):
+    """Test cases for lots built from the shared lot config"""
+    
+    def setUp(self):
+        self.tmpdir = tempfile.mkdtemp()
+        self.system = ParkingSystem()
+        self.saved = (self.system.get_all_lots(), self.system._config_version)
+    
+    def tearDown(self):
+        self.system._set_lots(self.saved[0])
+        self.system._config_version = self.saved[1]
+        shutil.rmtree(self.tmpdir, ignore_errors=True)
+    
+    def config(self, *extra):
+        lots = [{"lot_id": lot.lot_id, "name": lot.name, "total_spaces": lot.total_spaces,
+                 "permit_type": lot.permit_type, "drive_time": lot.drive_time,
+                 "walk_time": lot.walk_time} for lot in self.saved[0]]
+        return {"version": "v2", "lots": lots + list(extra)}
+    
+    def test_walk_time_from_config(self):
+        """Test that lots carry the walk time from lots.json"""
+        lot = self.system.get_lot_by_id("17")
+        self.assertEqual((lot.drive_time, lot.walk_time), (2, 4))
+    
+    def test_new_lot_appears(self):
+        """Test that a lot added to the config is shown, keeping known occupancy"""
+        self.system.get_lot_by_id("18").update_occupancy(45)
+        self.system.apply_config(self.config({
+            "lot_id": "20", "name": "Lot 20", "total_spaces": 80, "permit_type": "Open",
+            "drive_time": 4, "walk_time": 2}))
+        self.assertEqual(self.system.get_lot_by_id("20").total_spaces, 80)
+        self.assertEqual(self.system.get_lot_by_id("18").available_spaces, 0)
+        visitor_lots = self.system.get_recommended_lots(UserType.VISITOR)
+        self.assertIn("20", [lot.lot_id for lot in visitor_lots])
+        open_lots = self.system.get_lots_by_permit_type("Open")
+        self.assertEqual([lot.lot_id for lot in open_lots], ["14", "20"])
+    
+    def test_removed_lot_not_found(self):
+        """Test that lookups follow the new config when a lot is dropped"""
+        config = self.config()
+        config["lots"] = [lot for lot in config["lots"] if lot["lot_id"] != "19"]
+        self.system.apply_config(config)
+        self.assertIsNone(self.system.get_lot_by_id("19"))
+        self.assertEqual(self.system.get_lots_by_permit_type("Both"), [])
+    
+    def test_permit_types_follow_config(self):
+        """Test that the permit filter offers exactly the config's permit types"""
+        gui = ParkingAppGUI.__new__(ParkingAppGUI)  # no display: only the filter state
+        gui.parking_system = self.system
+        gui.permit_filter = mock.Mock(get=mock.Mock(return_value="Both"))
+        gui.permit_combo = mock.Mock()
+        gui.permit_choices = gui.permit_filter_choices()
+        self.assertEqual(gui.permit_choices, (ALL, "Student", "Staff", "Both", "Open"))
+        self.assertFalse(gui.update_permit_filter())
+        
+        config = self.config({
+            "lot_id": "30", "name": "Lot 30", "total_spaces": 40, "permit_type": "Evening",
+            "permit_rules": [{"permits": ["Visitor"], "from": "17:00"}],
+            "drive_time": 3, "walk_time": 3})
+        config["lots"] = [lot for lot in config["lots"] if lot["permit_type"] != "Both"]
+        self.system.apply_config(config)
+        self.assertEqual(self.system.get_permit_types(), ["Student", "Staff", "Open", "Evening"])
+        
+        # The selected type is gone, so the filter falls back to All
+        self.assertTrue(gui.update_permit_filter())
+        choices = (ALL, "Student", "Staff", "Open", "Evening")
+        gui.permit_combo.configure.assert_called_once_with(values=choices)
+        gui.permit_filter.set.assert_called_once_with(ALL)
+    
+    def test_simulated_range(self):
+        """Test that offline simulation stays in the configured range"""
+        lot = ParkingLot("17", "Lot 17", 35, "Student", 2, 4, simulated_occupancy=[28, 35])
+        for _ in range(20):
+            lot.simulate_occupancy()
+            self.assertLessEqual(lot.available_spaces, 7)
+    
+    def test_config_cache(self):
+        """Test the on-disk config cache round trip"""
+        path = os.path.join(self.tmpdir, "cache", "lots_config.json")
+        self.assertIsNone(load_config_cache(path))
+        cached = {"etag": '"config-v2"', "config": self.config()}
+        save_config_cache(cached, path)
+        self.assertEqual(load_config_cache(path), cached)
+        
+        # A corrupt cache is ignored rather than trusted
+        with open(path, "w") as f:
+            f.write('{"etag": "x", "config": {"lots": [')
+        self.assertIsNone(load_config_cache(path))
 
 
 class TestIntegration(unittest.TestCase):
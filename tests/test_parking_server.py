@@ -0,0 +1,587 @@
+"""
+Unit Tests for ELC Parking App Server
+Author: Jie Liang
+Course: CS2450
+
+Tests the REST API in parking_server.py using Flask's test client
+"""
+
+import unittest
+import tempfile
+import shutil
+import copy
+import json
+import sys
+import os
+
+import requests
+
+# Make the server importable from the src directory
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "src"))
+
+import parking_server
+from change_feed import ChangeFeed
+
+
+INITIAL_LOTS = copy.deepcopy(parking_server.PARKING_LOTS)
+
+
+class ServerTestCase(unittest.TestCase):
+    """Base class that gives every test a fresh server state and data directory"""
+
+    def setUp(self):
+        self.tmpdir = tempfile.mkdtemp()
+        self.original_data_file = parking_server.DATA_FILE
+        parking_server.DATA_FILE = os.path.join(self.tmpdir, "parking_data.json")
+        parking_server.install_lots(copy.deepcopy(INITIAL_LOTS))
+        self.client = parking_server.app.test_client()
+
+    def tearDown(self):
+        parking_server.close_data()
+        parking_server.CHANGE_LOG = None
+        parking_server.DATA_FILE = self.original_data_file
+        shutil.rmtree(self.tmpdir, ignore_errors=True)
+
+    def read_log(self):
+        """Return the lines of the change log"""
+        with open(os.path.join(self.tmpdir, "parking_data.log")) as f:
+            return f.readlines()
+
+    def restart(self):
+        """Simulate a server restart from whatever is on disk"""
+        parking_server.close_data()
+        parking_server.CHANGE_LOG = None
+        parking_server.install_lots(copy.deepcopy(INITIAL_LOTS))
+        parking_server.load_data()
+
+
+class TestBatchEvents(ServerTestCase):
+    """Test cases for the bulk sensor ingest endpoint"""
+
+    def test_batch_applies_across_lots(self):
+        """Test that a batch updates several lots and reports new counts"""
+        response = self.client.post("/api/events", json={"events": [
+            {"lot_id": "17", "space_index": 0, "occupied": True},
+            {"lot_id": "17", "space_index": 1, "occupied": True},
+            {"lot_id": "14", "space_index": 5, "occupied": True},
+            {"lot_id": "14", "space_index": 5, "occupied": True}
+        ]})
+        self.assertEqual(response.status_code, 200)
+        data = response.get_json()
+        self.assertTrue(data["success"])
+        self.assertEqual(data["applied"], 4)
+        self.assertEqual([r["changed"] for r in data["results"]], [True, True, True, False])
+        self.assertEqual(data["lots"]["17"], {"occupied_count": 2, "available_count": 33})
+        self.assertEqual(data["lots"]["14"], {"occupied_count": 1, "available_count": 49})
+        self.assertEqual(len(self.read_log()), 1)  # persisted once
+
+    def test_invalid_event_rejects_whole_batch(self):
+        """Test that one bad event leaves every lot untouched"""
+        response = self.client.post("/api/events", json={"events": [
+            {"lot_id": "17", "space_index": 0, "occupied": True},
+            {"lot_id": "17", "space_index": 99, "occupied": True},
+            {"lot_id": "999", "space_index": 0, "occupied": True}
+        ]})
+        self.assertEqual(response.status_code, 400)
+        data = response.get_json()
+        self.assertFalse(data["success"])
+        self.assertEqual([r["index"] for r in data["results"]], [1, 2])
+        self.assertEqual(parking_server.get_occupied_count("17"), 0)
+
+    def test_malformed_body(self):
+        """Test that a body without an events list is rejected"""
+        response = self.client.post("/api/events", json=[1, 2, 3])
+        self.assertEqual(response.status_code, 400)
+
+    def test_unhashable_lot_id(self):
+        """Test that a list or object lot_id is a per-event error, not a crash"""
+        response = self.client.post("/api/events", json={"events": [
+            {"lot_id": ["17"], "space_index": 0, "occupied": True},
+            {"lot_id": {"id": "17"}, "space_index": 0, "occupied": True}
+        ]})
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual([r["error"] for r in response.get_json()["results"]],
+                         ["Lot not found", "Lot not found"])
+
+
+class TestPersistence(ServerTestCase):
+    """Test cases for the change log and snapshots"""
+
+    def test_changes_survive_restart(self):
+        """Test that logged changes are replayed on startup"""
+        self.client.post("/api/lot/17/toggle/3")
+        self.client.post("/api/lot/18/fill")
+        self.client.post("/api/lot/19/random")
+        occupied_19 = parking_server.get_occupied_count("19")
+        self.assertEqual(len(self.read_log()), 3)
+
+        self.restart()
+        self.assertTrue(parking_server.STORE.is_occupied("17", 3))
+        self.assertEqual(parking_server.get_occupied_count("18"), 45)
+        self.assertEqual(parking_server.get_occupied_count("19"), occupied_19)
+        # Startup compacts the replayed log into a snapshot
+        self.assertEqual(self.read_log(), [])
+        self.assertTrue(os.path.exists(parking_server.DATA_FILE))
+
+    def test_torn_record_is_ignored(self):
+        """Test that a half-written last record does not lose earlier ones"""
+        self.client.post("/api/lot/17/toggle/0")
+        with open(os.path.join(self.tmpdir, "parking_data.log"), "a") as f:
+            f.write('{"op":"set","lot":"17"')
+
+        self.restart()
+        self.assertEqual(parking_server.get_occupied_count("17"), 1)
+
+    def test_torn_only_record_is_cut_off(self):
+        """Test that changes after a log holding only a torn record survive"""
+        with open(os.path.join(self.tmpdir, "parking_data.log"), "w") as f:
+            f.write('{"op":"set","lot":"17"')
+        self.restart()
+        self.client.post("/api/lot/17/toggle/0")
+        self.client.post("/api/lot/17/toggle/1")
+
+        self.restart()
+        self.assertEqual(parking_server.get_occupied_count("17"), 2)
+
+    def test_periodic_snapshot_compacts_log(self):
+        """Test that the log is truncated once a snapshot is taken"""
+        parking_server._change_log().snapshot_every = 2
+        self.client.post("/api/lot/17/toggle/0")
+        self.client.post("/api/lot/17/toggle/1")
+        self.assertEqual(self.read_log(), [])
+        self.client.post("/api/lot/17/toggle/2")
+        self.assertEqual(len(self.read_log()), 1)
+
+        self.restart()
+        self.assertEqual(parking_server.get_occupied_count("17"), 3)
+
+
+class TestLotPayload(ServerTestCase):
+    """Test cases for the single-lot endpoint and snapshot format"""
+
+    def test_spaces_are_packed(self):
+        """Test that spaces are sent as a base64 bitmap unless a list is requested"""
+        self.client.post("/api/lot/17/toggle/0")
+        self.client.post("/api/lot/17/toggle/9")
+        data = self.client.get("/api/lot/17").get_json()
+        self.assertNotIn("spaces", data)
+        self.assertEqual(data["spaces_packed"], "AQIAAAA=")
+
+        data = self.client.get("/api/lot/17?format=list").get_json()
+        self.assertEqual(len(data["spaces"]), 35)
+        self.assertEqual([i for i, s in enumerate(data["spaces"]) if s], [0, 9])
+
+    def test_legacy_snapshot_is_loaded(self):
+        """Test that a data file with lists of bools is still understood"""
+        legacy = parking_server.lots_to_json(copy.deepcopy(INITIAL_LOTS))
+        for lot in legacy.values():
+            del lot["spaces_packed"]
+            lot["spaces"] = [True] * lot["total_spaces"]
+        with open(parking_server.DATA_FILE, "w") as f:
+            json.dump(legacy, f, indent=2)
+
+        self.restart()
+        self.assertEqual(parking_server.get_occupied_count("19"), 60)
+
+
+class TestConditionalGet(ServerTestCase):
+    """Test cases for ETag / If-None-Match support"""
+
+    def test_lots_not_modified_until_a_change(self):
+        """Test that /api/lots answers 304 until some lot changes"""
+        first = self.client.get("/api/lots")
+        etag = first.headers["ETag"]
+        again = self.client.get("/api/lots", headers={"If-None-Match": etag})
+        self.assertEqual(again.status_code, 304)
+        self.assertEqual(again.data, b"")
+
+        self.client.post("/api/lot/17/toggle/0")
+        changed = self.client.get("/api/lots", headers={"If-None-Match": etag})
+        self.assertEqual(changed.status_code, 200)
+        self.assertNotEqual(changed.headers["ETag"], etag)
+
+    def test_lot_version_is_per_lot(self):
+        """Test that changing one lot does not invalidate another lot's ETag"""
+        etag_17 = self.client.get("/api/lot/17").headers["ETag"]
+        etag_18 = self.client.get("/api/lot/18").headers["ETag"]
+        self.client.post("/api/lot/18/fill")
+
+        self.assertEqual(self.client.get("/api/lot/17", headers={"If-None-Match": etag_17}).status_code, 304)
+        self.assertEqual(self.client.get("/api/lot/18", headers={"If-None-Match": etag_18}).status_code, 200)
+
+    def test_last_update_is_mutation_time(self):
+        """Test that last_update only moves when the lot changes"""
+        before = self.client.get("/api/lots").get_json()
+        self.assertEqual(before, self.client.get("/api/lots").get_json())
+
+        self.client.post("/api/lot/14/toggle/2")
+        after = {lot["lot_id"]: lot for lot in self.client.get("/api/lots").get_json()}
+        before = {lot["lot_id"]: lot for lot in before}
+        self.assertGreater(after["14"]["version"], before["14"]["version"])
+        self.assertNotEqual(after["14"]["last_update"], before["14"]["last_update"])
+        self.assertEqual(after["17"], before["17"])
+
+    def test_versions_survive_restart(self):
+        """Test that versions are replayed so ETags never go backwards"""
+        self.client.post("/api/lot/17/toggle/0")
+        self.client.post("/api/lot/17/toggle/1")
+        version = parking_server.STORE.version
+        self.restart()
+        self.assertEqual(parking_server.STORE.version, version)
+        self.assertEqual(parking_server.STORE.lot_version("17"), version)
+
+
+class TestDashboard(ServerTestCase):
+    """Test cases for the aggregated admin dashboard endpoint"""
+
+    def test_dashboard_has_lots_spaces_and_totals(self):
+        """Test that one response covers every lot and the campus totals"""
+        self.client.post("/api/lot/18/fill")
+        self.client.post("/api/lot/17/toggle/0")
+        response = self.client.get("/api/admin/dashboard")
+        data = response.get_json()
+
+        self.assertEqual([lot["lot_id"] for lot in data["lots"]], ["17", "18", "19", "14"])
+        self.assertEqual(data["lots"][0]["spaces_packed"], "AQAAAAA=")
+        self.assertEqual(data["totals"]["total_spaces"], 190)
+        self.assertEqual(data["totals"]["occupied_spaces"], 46)
+        self.assertEqual(data["totals"]["available_spaces"], 144)
+        self.assertEqual(data["totals"]["permits"]["Staff"],
+                         {"total_spaces": 45, "occupied_spaces": 45, "available_spaces": 0})
+
+        etag = response.headers["ETag"]
+        cached = self.client.get("/api/admin/dashboard", headers={"If-None-Match": etag})
+        self.assertEqual(cached.status_code, 304)
+
+
+class TestChanges(ServerTestCase):
+    """Test cases for delta sync via /api/changes"""
+
+    def test_no_since_returns_full_snapshot(self):
+        """Test that a client with no version gets everything"""
+        data = self.client.get("/api/changes").get_json()
+        self.assertTrue(data["full"])
+        self.assertEqual(len(data["lots"]), 4)
+        self.assertEqual(set(data["packed"]), {"17", "18", "19", "14"})
+
+    def test_only_changes_since_version(self):
+        """Test that a delta holds only the lots and spaces that changed"""
+        self.client.post("/api/lot/17/toggle/2")
+        version = parking_server.STORE.version
+        self.client.post("/api/lot/18/toggle/7")
+        self.client.post("/api/lot/14/reset")
+
+        data = self.client.get(f"/api/changes?since={version}").get_json()
+        self.assertFalse(data["full"])
+        self.assertEqual(data["version"], parking_server.STORE.version)
+        self.assertEqual(sorted(lot["lot_id"] for lot in data["lots"]), ["14", "18"])
+        self.assertEqual(data["spaces"], [["18", 7, 1]])
+        self.assertEqual(list(data["packed"]), ["14"])
+
+        data = self.client.get(f"/api/changes?since={data['version']}").get_json()
+        self.assertEqual((data["lots"], data["spaces"], data["packed"]), ([], [], {}))
+
+    def test_evicted_version_falls_back_to_snapshot(self):
+        """Test that a version older than the buffer gets a full snapshot"""
+        version = parking_server.STORE.version
+        self.addCleanup(setattr, parking_server, "FEED", parking_server.FEED)
+        parking_server.FEED = ChangeFeed(capacity=2)
+        parking_server.FEED.reset(version)
+        for space_index in range(3):
+            self.client.post(f"/api/lot/19/toggle/{space_index}")
+
+        data = self.client.get(f"/api/changes?since={version}").get_json()
+        self.assertTrue(data["full"])
+        self.assertEqual(self.client.get("/api/changes?since=abc").status_code, 400)
+
+
+class TestStream(ServerTestCase):
+    """Test cases for the Server-Sent Events change stream"""
+
+    def open_stream(self, url="/api/stream?spaces=1", **kwargs):
+        """Open the stream and return an iterator over parsed events"""
+        response = self.client.get(url, **kwargs)
+        self.assertEqual(response.mimetype, "text/event-stream")
+        self.addCleanup(response.close)
+        chunks = iter(response.response)
+        self.assertTrue(next(chunks).startswith(b"retry:"))
+
+        def events():
+            for chunk in chunks:
+                fields = dict(line.split(": ", 1) for line in chunk.decode().strip().split("\n"))
+                yield fields["event"], int(fields["id"]), json.loads(fields["data"])
+        return events()
+
+    def test_snapshot_then_deltas(self):
+        """Test that a subscriber gets all lots, then only what changed"""
+        events = self.open_stream()
+        name, version, data = next(events)
+        self.assertEqual(name, "snapshot")
+        self.assertEqual(len(data["lots"]), 4)
+
+        self.client.post("/api/lot/17/toggle/4")
+        name, version, data = next(events)
+        self.assertEqual(name, "lots")
+        self.assertEqual(version, parking_server.STORE.version)
+        self.assertEqual([lot["lot_id"] for lot in data["lots"]], ["17"])
+        self.assertEqual(data["lots"][0]["occupied_spaces"], 1)
+        self.assertEqual(data["spaces"], [["17", 4, 1]])
+
+    def test_resume_coalesces_missed_changes(self):
+        """Test that a reconnecting client gets one merged delta"""
+        version = parking_server.STORE.version
+        self.client.post("/api/lot/17/toggle/0")
+        self.client.post("/api/lot/17/toggle/1")
+        self.client.post("/api/lot/18/fill")
+
+        events = self.open_stream(headers={"Last-Event-ID": str(version)})
+        name, _, data = next(events)
+        self.assertEqual(name, "lots")
+        self.assertEqual(sorted(lot["lot_id"] for lot in data["lots"]), ["17", "18"])
+        self.assertEqual(data["spaces"], [["17", 0, 1], ["17", 1, 1]])
+        self.assertIn("18", data["packed"])
+
+    def test_evicted_cursor_gets_snapshot(self):
+        """Test that a client further behind than the buffer resyncs"""
+        version = parking_server.STORE.version
+        self.addCleanup(setattr, parking_server, "FEED", parking_server.FEED)
+        parking_server.FEED = ChangeFeed(capacity=2)
+        parking_server.FEED.reset(version)
+        for space_index in range(5):
+            self.client.post(f"/api/lot/14/toggle/{space_index}")
+
+        name, _, data = next(self.open_stream(headers={"Last-Event-ID": str(version)}))
+        self.assertEqual(name, "snapshot")
+        self.assertEqual(data["version"], parking_server.STORE.version)
+
+    def test_hub_serves_streams(self):
+        """Test that a running hub takes over /api/stream via a redirect"""
+        hub = parking_server.start_stream_hub("127.0.0.1", port=0)
+        self.addCleanup(parking_server.stop_stream_hub)
+
+        response = self.client.get("/api/stream?spaces=1", base_url="http://localhost:5000")
+        self.assertEqual(response.status_code, 307)
+        self.assertEqual(response.headers["Location"],
+                         f"http://localhost:{hub.port}/api/stream?spaces=1")
+
+        with requests.get(f"http://127.0.0.1:{hub.port}/api/stream?spaces=1",
+                          stream=True, timeout=5) as stream:
+            self.assertEqual(stream.headers["Content-Type"], "text/event-stream; charset=utf-8")
+            lines = stream.iter_lines(decode_unicode=True)
+
+            def next_event():
+                fields = {}
+                for line in lines:
+                    if not line:
+                        if "event" in fields:
+                            return fields["event"], json.loads(fields["data"])
+                        fields = {}  # retry hint
+                        continue
+                    name, _, value = line.partition(": ")
+                    fields[name] = value
+
+            name, data = next_event()
+            self.assertEqual(name, "snapshot")
+            self.assertEqual(len(data["lots"]), 4)
+            self.client.post("/api/lot/17/toggle/4")
+            name, data = next_event()
+            self.assertEqual(name, "lots")
+            self.assertEqual(data["spaces"], [["17", 4, 1]])
+
+
+class TestCounters(ServerTestCase):
+    """Test cases for the running occupancy counters"""
+
+    def test_counters_follow_every_mutation(self):
+        """Test that lot, permit and campus counters track each mutation path"""
+        self.client.post("/api/lot/17/toggle/0")
+        self.client.post("/api/lot/18/fill")
+        self.client.post("/api/lot/19/random")
+        self.client.post("/api/events", json={"events": [
+            {"lot_id": "14", "space_index": 1, "occupied": True},
+            {"lot_id": "18", "space_index": 0, "occupied": False}
+        ]})
+        self.client.post("/api/lot/19/reset")
+
+        self.assertEqual(parking_server.get_occupied_count("17"), 1)
+        self.assertEqual(parking_server.STORE.permit_occupied_count("Staff"), 44)
+        self.assertEqual(parking_server.STORE.permit_occupied_count("Both"), 0)
+        self.assertEqual(parking_server.get_campus_occupied_count(), 46)
+        self.assertEqual(parking_server.STORE.check_counters(), [])
+
+    def test_consistency_endpoint_reports_drift(self):
+        """Test that the on-demand check detects a counter that drifted"""
+        response = self.client.get("/api/admin/consistency")
+        self.assertTrue(response.get_json()["consistent"])
+
+        parking_server.STORE._lots["17"]["spaces"][0] = True  # bypass the counters
+        data = self.client.get("/api/admin/consistency").get_json()
+        self.assertFalse(data["consistent"])
+        self.assertEqual({m["scope"] for m in data["mismatches"]}, {"lot", "permit", "campus"})
+
+
+class TestHistory(ServerTestCase):
+    """Test cases for the occupancy time-series endpoint"""
+
+    def test_history_reflects_changes(self):
+        """Test that toggles show up in the latest bucket"""
+        self.client.post("/api/lot/18/toggle/0")
+        self.client.post("/api/lot/18/toggle/1")
+        response = self.client.get("/api/lot/18/history?bucket=1m")
+        self.assertEqual(response.status_code, 200)
+        data = response.get_json()
+        self.assertEqual(data["bucket"], 60)
+        self.assertEqual(data["total_spaces"], 45)
+        self.assertEqual(data["series"]["last"][-1], 2)
+        self.assertEqual(data["series"]["max"][-1], 2)
+        self.assertEqual(len(data["series"]["t"]), len(data["series"]["mean"]))
+
+    def test_default_bucket_fits_range(self):
+        """Test that the default bucket keeps week-long charts small"""
+        data = self.client.get("/api/lot/18/history?from=2026-10-01T00:00:00"
+                               "&to=2026-10-08T00:00:00").get_json()
+        self.assertEqual(data["bucket"], 3600)
+        data = self.client.get("/api/lot/18/history").get_json()
+        self.assertEqual(data["bucket"], 300)
+
+    def test_bad_requests(self):
+        """Test unknown lots and malformed parameters"""
+        self.assertEqual(self.client.get("/api/lot/99/history").status_code, 404)
+        for query in ("bucket=90", "bucket=xm", "from=yesterday", "from=10&to=5",
+                      "from=0&to=100000000&bucket=1m", "from=nan", "to=inf"):
+            response = self.client.get(f"/api/lot/18/history?{query}")
+            self.assertEqual(response.status_code, 400, query)
+
+
+class TestRecommendations(ServerTestCase):
+    """Test cases for the lot recommendation endpoint"""
+
+    def test_ranked_lots_for_user_type(self):
+        """Test scored lots for one user type, best first"""
+        self.client.post("/api/lot/17/fill")
+        data = self.client.get("/api/recommendations?user_type=Student").get_json()
+        self.assertEqual([lot["lot_id"] for lot in data["lots"]], ["19", "14", "17"])
+        self.assertIn("score", data["lots"][0])
+        limited = self.client.get("/api/recommendations?user_type=Student&limit=1").get_json()
+        self.assertEqual(len(limited["lots"]), 1)
+
+    def test_rankings_for_every_user_type(self):
+        """Test the compact all-user-types form and its ETag"""
+        response = self.client.get("/api/recommendations")
+        self.assertEqual(response.get_json()["rankings"]["Visitor"], ["14"])
+        again = self.client.get("/api/recommendations",
+                                headers={"If-None-Match": response.headers["ETag"]})
+        self.assertEqual(again.status_code, 304)
+
+    def test_unknown_user_type(self):
+        """Test that an unknown user type is rejected"""
+        response = self.client.get("/api/recommendations?user_type=Robot")
+        self.assertEqual(response.status_code, 400)
+
+    def test_negative_limit(self):
+        """Test that a negative limit is rejected rather than dropping lots"""
+        response = self.client.get("/api/recommendations?user_type=Student&limit=-1")
+        self.assertEqual(response.status_code, 400)
+
+
+
+class TestLotConfig(ServerTestCase):
+    """Test cases for /api/config and config-light lot polling"""
+
+    def test_config_and_version(self):
+        """Test the served config, its ETag and the X-Lot-Config header"""
+        response = self.client.get("/api/config")
+        config = response.get_json()
+        self.assertEqual([lot["lot_id"] for lot in config["lots"]], ["17", "18", "19", "14"])
+        self.assertEqual(config["lots"][0]["walk_time"], 4)
+        again = self.client.get("/api/config", headers={"If-None-Match": response.headers["ETag"]})
+        self.assertEqual(again.status_code, 304)
+
+        lots = self.client.get("/api/lots")
+        self.assertEqual(lots.headers["X-Lot-Config"], config["version"])
+        cached = self.client.get("/api/lots", headers={"If-None-Match": lots.headers["ETag"]})
+        self.assertEqual(cached.status_code, 304)
+        self.assertEqual(cached.headers["X-Lot-Config"], config["version"])
+
+    def test_occupancy_view(self):
+        """Test that ?view=occupancy leaves out the config fields"""
+        self.client.post("/api/lot/18/fill")
+        response = self.client.get("/api/lots?view=occupancy")
+        lot = response.get_json()[1]
+        self.assertEqual(set(lot), set(parking_server.OCCUPANCY_FIELDS))
+        self.assertEqual(lot["occupied_spaces"], 45)
+        self.assertNotEqual(response.headers["ETag"], self.client.get("/api/lots").headers["ETag"])
+
+    def test_restart_applies_config_changes(self):
+        """Test that a restart keeps occupancy but follows the lot config"""
+        self.client.post("/api/lot/17/toggle/0")
+        self.client.post("/api/lot/14/fill")
+        self.restart()  # leaves a snapshot with the old config
+
+        original = parking_server.PARKING_LOTS
+        self.addCleanup(setattr, parking_server, "PARKING_LOTS", original)
+        lots = copy.deepcopy(original)
+        lots["17"]["name"] = "North Lot"
+        del lots["14"]
+        lots["20"] = dict(copy.deepcopy(lots["18"]), lot_id="20", name="Lot 20")
+        parking_server.PARKING_LOTS = lots
+
+        self.restart()
+        store = parking_server.STORE
+        self.assertEqual(store.lot_ids(), ["17", "18", "19", "20"])
+        self.assertTrue(store.is_occupied("17", 0))
+        self.assertEqual(store.summary("17")["name"], "North Lot")
+        self.assertEqual(parking_server.get_occupied_count("20"), 0)
+        config = self.client.get("/api/config").get_json()
+        self.assertEqual(config["lots"][0]["name"], "North Lot")
+
+
+class TestMetrics(ServerTestCase):
+    """Test cases for the /metrics endpoint"""
+
+    def scrape(self):
+        response = self.client.get("/metrics")
+        self.assertTrue(response.content_type.startswith("text/plain"))
+        samples = {}
+        for line in response.get_data(as_text=True).splitlines():
+            if not line.startswith("#"):
+                name, value = line.rsplit(" ", 1)
+                samples[name] = float(value)
+        return samples
+
+    def test_requests_counted_per_route(self):
+        """Test that responses are counted and timed by route and status class"""
+        before = self.scrape()
+        self.client.post("/api/lot/17/toggle/0")
+        self.client.get("/api/lot/99")
+        self.client.get("/no/such/page")
+        after = self.scrape()
+
+        toggle = 'route="/api/lot/<lot_id>/toggle/<int:space_index>",method="POST"'
+        for name, change in [
+                (f'elc_http_requests_total{{{toggle},status="2xx"}}', 1),
+                (f'elc_http_request_duration_seconds_count{{{toggle}}}', 1),
+                (f'elc_http_response_size_bytes_count{{{toggle}}}', 1),
+                ('elc_http_requests_total{route="/api/lot/<lot_id>",method="GET",status="4xx"}', 1),
+                ('elc_http_requests_total{route="unmatched",method="other",status="4xx"}', 1),
+                ('elc_persist_duration_seconds_count{operation="log_append"}', 1)]:
+            self.assertEqual(after[name] - before[name], change, name)
+
+    def test_occupancy_gauges(self):
+        """Test that occupancy gauges read the live state at scrape time"""
+        self.client.post("/api/lot/18/fill")
+        samples = self.scrape()
+        self.assertEqual(samples['elc_lot_occupied_spaces{lot_id="18"}'], 45)
+        self.assertEqual(samples['elc_lot_total_spaces{lot_id="17"}'], 35)
+        self.assertEqual(samples["elc_state_version"], parking_server.STORE.version)
+
+    def test_snapshot_timed(self):
+        """Test that snapshots are timed"""
+        before = self.scrape()['elc_persist_duration_seconds_count{operation="snapshot"}']
+        parking_server.save_data()
+        after = self.scrape()['elc_persist_duration_seconds_count{operation="snapshot"}']
+        self.assertEqual(after - before, 1)
+
+
+if __name__ == '__main__':
+    unittest.main()
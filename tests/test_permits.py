@@ -0,0 +1,99 @@
+"""
+Unit Tests for Permit Rules
+Author: Jie Liang
+Course: CS2450
+
+Tests the permit bitmasks, time windows and PermitIndex in permits.py
+"""
+
+import unittest
+from datetime import datetime
+import sys
+import os
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "src"))
+
+from permits import (STUDENT, STAFF, VISITOR, PermitIndex, compile_rules,
+                     permit_mask, rules_allow)
+
+
+MONDAY_NOON = datetime(2024, 1, 1, 12, 0)
+MONDAY_EVENING = datetime(2024, 1, 1, 18, 30)
+SATURDAY_NOON = datetime(2024, 1, 6, 12, 0)
+
+# Staff lot that visitors may use on weekday evenings
+STAFF_EVENINGS = [{"permits": ["Staff"]},
+                  {"permits": ["Visitor"], "from": "17:00",
+                   "days": ["Mon", "Tue", "Wed", "Thu", "Fri"]}]
+
+
+class TestPermitRules(unittest.TestCase):
+    """Test cases for compiled permit rules"""
+
+    def test_permit_mask(self):
+        """Test that permit names combine into a bitmask"""
+        self.assertEqual(permit_mask(["Student", "Staff"]), STUDENT | STAFF)
+        self.assertEqual(permit_mask([]), 0)
+        with self.assertRaises(ValueError):
+            permit_mask(["Faculty"])
+
+    def test_permit_types(self):
+        """Test the rules implied by each permit_type"""
+        self.assertTrue(rules_allow(compile_rules("Both"), STAFF))
+        self.assertFalse(rules_allow(compile_rules("Both"), VISITOR))
+        self.assertTrue(rules_allow(compile_rules("Open"), VISITOR))
+        self.assertFalse(rules_allow(compile_rules("Student"), STAFF))
+        self.assertTrue(rules_allow(compile_rules("Student"), STUDENT | STAFF))
+        self.assertFalse(rules_allow(compile_rules("Unknown"), STUDENT | STAFF | VISITOR))
+
+    def test_time_window(self):
+        """Test a rule that only applies on weekday evenings"""
+        rules = compile_rules("Staff", STAFF_EVENINGS)
+        self.assertTrue(rules_allow(rules, STAFF, MONDAY_NOON))
+        self.assertFalse(rules_allow(rules, VISITOR, MONDAY_NOON))
+        self.assertTrue(rules_allow(rules, VISITOR, MONDAY_EVENING))
+        self.assertFalse(rules_allow(rules, VISITOR, datetime(2024, 1, 6, 18, 30)))
+
+    def test_overnight_window(self):
+        """Test that a window past midnight covers both ends of the day"""
+        rules = compile_rules(permit_rules=[{"permits": ["Student"],
+                                             "from": "22:00", "until": "06:00"}])
+        self.assertTrue(rules_allow(rules, STUDENT, datetime(2024, 1, 1, 23, 0)))
+        self.assertTrue(rules_allow(rules, STUDENT, datetime(2024, 1, 7, 5, 59)))
+        self.assertFalse(rules_allow(rules, STUDENT, datetime(2024, 1, 1, 6, 0)))
+
+
+class TestPermitIndex(unittest.TestCase):
+    """Test cases for PermitIndex"""
+
+    def setUp(self):
+        self.index = PermitIndex([("14", compile_rules("Open")),
+                                  ("17", compile_rules("Student")),
+                                  ("18", compile_rules("Staff", STAFF_EVENINGS)),
+                                  ("19", compile_rules("Both"))])
+
+    def test_eligible(self):
+        """Test which lots each permit mask may use, in index order"""
+        self.assertEqual(self.index.eligible(STUDENT, MONDAY_NOON), ("14", "17", "19"))
+        self.assertEqual(self.index.eligible(STAFF, MONDAY_NOON), ("14", "18", "19"))
+        self.assertEqual(self.index.eligible(STUDENT | STAFF, MONDAY_NOON),
+                         ("14", "17", "18", "19"))
+        self.assertEqual(self.index.eligible(0, MONDAY_NOON), ())
+
+    def test_segments_follow_windows(self):
+        """Test that eligibility changes when a window opens"""
+        self.assertEqual(self.index.eligible(VISITOR, MONDAY_NOON), ("14",))
+        self.assertEqual(self.index.eligible(VISITOR, MONDAY_EVENING), ("14", "18"))
+        self.assertEqual(self.index.eligible(VISITOR, SATURDAY_NOON), ("14",))
+        self.assertNotEqual(self.index.segment(MONDAY_NOON), self.index.segment(MONDAY_EVENING))
+        self.assertEqual(self.index.segment(MONDAY_NOON),
+                         self.index.segment(datetime(2024, 1, 1, 16, 59)))
+
+    def test_lookups_cached(self):
+        """Test that repeated lookups return the same tuple"""
+        first = self.index.eligible(STAFF, MONDAY_NOON)
+        self.assertIs(self.index.eligible(STAFF, datetime(2024, 1, 1, 9, 0)), first)
+
+
+if __name__ == '__main__':
+    unittest.main()
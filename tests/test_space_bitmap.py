@@ -0,0 +1,61 @@
+"""
+Unit Tests for the packed space bitmap
+Author: Jie Liang
+Course: CS2450
+
+Tests SpaceBitmap counting, bulk operations and serialization
+"""
+
+import unittest
+import random
+import sys
+import os
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "src"))
+
+from space_bitmap import SpaceBitmap
+
+
+class TestSpaceBitmap(unittest.TestCase):
+    """Test cases for SpaceBitmap"""
+
+    def test_set_get_and_count(self):
+        """Test single-space updates and popcount"""
+        bitmap = SpaceBitmap(35)
+        bitmap[0] = True
+        bitmap[34] = True
+        bitmap[9] = True
+        bitmap[9] = False
+        self.assertTrue(bitmap[34])
+        self.assertFalse(bitmap[9])
+        self.assertEqual(bitmap.count(), 2)
+        with self.assertRaises(IndexError):
+            bitmap[35] = True
+
+    def test_fill_keeps_tail_clear(self):
+        """Test that filling a lot that is not a multiple of 8 counts exactly"""
+        bitmap = SpaceBitmap(45, occupied=True)
+        self.assertEqual(bitmap.count(), 45)
+        bitmap.fill(False)
+        self.assertEqual(bitmap.count(), 0)
+
+    def test_assign_random(self):
+        """Test random assignment places exactly the requested number of cars"""
+        rng = random.Random(7)
+        bitmap = SpaceBitmap(60)
+        for occupied in (0, 12, 45, 60):
+            bitmap.assign_random(occupied, rng)
+            self.assertEqual(bitmap.count(), occupied)
+
+    def test_round_trips(self):
+        """Test list, bytes and base64 round trips"""
+        spaces = [i % 3 == 0 for i in range(50)]
+        bitmap = SpaceBitmap.from_list(spaces)
+        self.assertEqual(bitmap.to_list(), spaces)
+        self.assertEqual(len(bitmap.to_bytes()), 7)
+        self.assertEqual(SpaceBitmap.from_base64(50, bitmap.to_base64()), bitmap)
+        self.assertEqual(bitmap.occupied_indices(), [i for i in range(50) if i % 3 == 0])
+
+
+if __name__ == '__main__':
+    unittest.main()
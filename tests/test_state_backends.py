@@ -0,0 +1,234 @@
+"""
+Unit Tests for the Shared State Backends
+Author: Jie Liang
+Course: CS2450
+
+Runs the same checks against the SQLite backend and the Redis-protocol
+backend (talking to the local stand-in). Two store objects opened on the
+same backend play the part of two server workers.
+"""
+
+import unittest
+from unittest import mock
+import tempfile
+import threading
+import shutil
+import copy
+import time
+import sys
+import os
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "src"))
+
+import state_backends
+from state_backends import SQLiteLotStore, RedisLotStore
+from resp_standin import StandinServer
+from test_lot_store import make_lots
+
+
+class BackendContract:
+    """Checks every shared backend must pass (mixed into a TestCase)"""
+
+    def open_store(self, lots=None):
+        raise NotImplementedError
+
+    def test_writes_are_versioned(self):
+        """Test that each write bumps the shared version and is recorded"""
+        store = self.open_store()
+        self.assertTrue(store.toggle_space("0", 3))
+        store.fill_lot("1", True)
+        changed = store.apply_events([("0", 3, True), ("0", 4, True), ("1", 0, False)])
+
+        self.assertEqual(changed, [False, True, True])
+        self.assertEqual(store.version, 3)
+        self.assertEqual(store.lot_version("0"), 3)
+        self.assertEqual(store.summary("1")["occupied_spaces"], 19)
+        self.assertEqual(store.campus_occupied_count(), 21)
+        self.assertEqual(store.permit_occupied_count("Staff"), 19)
+        records = store.changes_since(0)
+        self.assertEqual([r["ver"] for r in records], [1, 2, 3])
+        self.assertEqual(records[2]["sets"], [["0", 4, 1], ["1", 0, 0]])
+        self.assertEqual(store.changes_since(2), records[2:])
+        self.assertEqual(store.check_counters(), [])
+
+    def test_workers_share_state(self):
+        """Test that a second worker sees the first one's writes"""
+        first = self.open_store()
+        first.randomize_lot("1", 7)
+        # Seeding again must not overwrite the state that is already there
+        second = self.open_store()
+        self.assertEqual(second.occupied_count("1"), 7)
+        second.toggle_space("0", 0)
+        self.assertTrue(first.is_occupied("0", 0))
+        self.assertEqual(first.snapshot("1")[1], second.snapshot("1")[1])
+        self.assertEqual(first.summaries(), second.summaries())
+
+    def test_open_applies_lot_config(self):
+        """Test that reopening with edited lots adds, drops, resizes and renames them"""
+        first = self.open_store(make_lots([10, 20, 30]))
+        first.toggle_space("0", 3)
+        first.fill_lot("1", True)
+        first.fill_lot("2", True)
+
+        lots = make_lots([10, 25, 5, 8])
+        del lots["2"]
+        lots["0"]["name"] = "Renamed"
+        second = self.open_store(lots)
+
+        self.assertEqual(second.lot_ids(), ["0", "1", "3"])
+        self.assertNotIn("2", second)
+        self.assertEqual(second.lot_config("0")["name"], "Renamed")
+        self.assertTrue(second.is_occupied("0", 3))
+        self.assertEqual(second.summary("1")["total_spaces"], 25)
+        self.assertEqual(second.occupied_count("1"), 0)
+        self.assertEqual(second.occupied_count("3"), 0)
+        self.assertEqual(second.check_counters(), [])
+        # The changes get a version of their own, and followers must resync
+        self.assertEqual(second.version, 4)
+        self.assertEqual(second.lot_version("0"), 4)
+        self.assertEqual(second.lot_version("1"), 4)
+        self.assertIsNone(second.changes_since(3))
+        second.toggle_space("3", 0)
+        self.assertEqual([r["ver"] for r in second.changes_since(4)], [5])
+
+        # Opening again with the same lots changes nothing
+        third = self.open_store(lots)
+        self.assertEqual(third.version, 5)
+        self.assertEqual(third.lot_ids(), ["0", "1", "3"])
+        self.assertEqual(third.summaries(), second.summaries())
+
+    def test_history_gap_is_reported(self):
+        """Test that a follower too far behind is told to resync"""
+        self.addCleanup(setattr, state_backends, "CHANGE_HISTORY", state_backends.CHANGE_HISTORY)
+        state_backends.CHANGE_HISTORY = 2
+        store = self.open_store()
+        for space_index in range(4):
+            store.toggle_space("0", space_index)
+        self.assertIsNone(store.changes_since(0))
+        self.assertEqual([r["ver"] for r in store.changes_since(2)], [3, 4])
+        self.assertEqual(store.changes_since(4), [])
+
+    def test_concurrent_workers_lose_nothing(self):
+        """Test that toggles from several workers and threads are all kept"""
+        workers = [self.open_store() for _ in range(2)]
+
+        def toggler(store):
+            for _ in range(51):
+                store.toggle_space("0", 2)
+
+        threads = [threading.Thread(target=toggler, args=(workers[i % 2],)) for i in range(4)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        # 4 threads x 51 toggles is an even number of flips
+        self.assertFalse(workers[0].is_occupied("0", 2))
+        self.assertEqual(workers[1].version, 4 * 51)
+        self.assertEqual([r["ver"] for r in workers[0].changes_since(0)], list(range(1, 205)))
+
+
+class TestSQLiteBackend(BackendContract, unittest.TestCase):
+    """Test cases for SQLiteLotStore"""
+
+    def setUp(self):
+        self.tmpdir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.tmpdir, True)
+
+    def open_store(self, lots=None):
+        store = SQLiteLotStore(os.path.join(self.tmpdir, "state.db"), lots or make_lots([10, 20]))
+        self.addCleanup(store.close)
+        return store
+
+    def test_commit_between_reads(self):
+        """Test that a commit landing mid-read is not taken for a gap"""
+        store, other = self.open_store(), self.open_store()
+        store.toggle_space("0", 0)
+        read_version = store._read_version
+
+        def commit_then_read():
+            other.toggle_space("0", 1)
+            return read_version()
+
+        with mock.patch.object(store, "_read_version", side_effect=commit_then_read):
+            self.assertEqual(store.changes_since(1), [])
+        self.assertEqual([r["ver"] for r in store.changes_since(1)], [2])
+
+    def test_uses_wal_mode(self):
+        """Test that the database runs in write-ahead-log mode"""
+        store = self.open_store()
+        mode = store._conn().execute("PRAGMA journal_mode").fetchone()[0]
+        self.assertEqual(mode, "wal")
+
+
+class TestRedisBackend(BackendContract, unittest.TestCase):
+    """Test cases for RedisLotStore against the local stand-in"""
+
+    def setUp(self):
+        self.server = StandinServer(port=0)
+        threading.Thread(target=self.server.serve_forever, daemon=True).start()
+        self.addCleanup(self.server.server_close)
+        self.addCleanup(self.server.shutdown)
+
+    def open_store(self, lots=None):
+        store = RedisLotStore("127.0.0.1", self.server.port, lots or make_lots([10, 20]))
+        self.addCleanup(store.close)
+        return store
+
+    def test_commit_between_reads(self):
+        """Test that a commit landing mid-read is not taken for a gap"""
+        store, other = self.open_store(), self.open_store()
+        for space_index in range(3):
+            store.toggle_space("0", space_index)
+        read_changes = store._read_changes
+        commits = [lambda: other.toggle_space("0", 5)]
+
+        def read_then_commit(conn, version):
+            records = read_changes(conn, version)
+            if commits:
+                commits.pop()()
+            return records
+
+        with mock.patch.object(store, "_read_changes", side_effect=read_then_commit):
+            records = store.changes_since(0)
+        self.assertEqual([r["ver"] for r in records], [1, 2, 3, 4])
+
+
+class TestServerFollowsBackend(unittest.TestCase):
+    """Test that the server streams changes made by other workers"""
+
+    def setUp(self):
+        import parking_server
+        self.server = parking_server
+        self.tmpdir = tempfile.mkdtemp()
+        path = os.path.join(self.tmpdir, "state.db")
+        self.lots = copy.deepcopy(parking_server.PARKING_LOTS)
+        self.store = SQLiteLotStore(path, copy.deepcopy(self.lots))
+        self.other_worker = SQLiteLotStore(path, copy.deepcopy(self.lots))
+        self.follower = parking_server.install_backend(self.store)
+
+    def tearDown(self):
+        # Installing in-memory lots again also stops the follower thread
+        self.server.install_lots(copy.deepcopy(self.lots))
+        self.follower.join()
+        self.store.close()
+        self.other_worker.close()
+        shutil.rmtree(self.tmpdir, ignore_errors=True)
+
+    def test_changes_from_other_workers_reach_the_feed(self):
+        """Test that /api/changes reports a write made through another worker"""
+        client = self.server.app.test_client()
+        client.post("/api/lot/17/toggle/0")
+        self.other_worker.toggle_space("17", 1)
+
+        deadline = time.time() + 5
+        while self.server.FEED.version < 2 and time.time() < deadline:
+            time.sleep(0.01)
+        data = client.get("/api/changes?since=0").get_json()
+        self.assertEqual(data["version"], 2)
+        self.assertEqual(data["spaces"], [["17", 0, 1], ["17", 1, 1]])
+        self.assertEqual(client.get("/api/lot/17").get_json()["occupied_spaces"], 2)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,170 @@
+"""
+Unit Tests for the Stream Hub
+Author: Jie Liang
+Course: CS2450
+
+Runs the hub on a free port over a bare ChangeFeed, with a subscribe
+callback that sends each event's version as its data.
+"""
+
+import unittest
+import threading
+import socket
+import time
+import sys
+import os
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "src"))
+
+from change_feed import ChangeFeed
+from stream_hub import StreamHub
+
+
+def make_subscribe(feed):
+    """Cursor from ?since, messages listing the versions a client missed"""
+    def subscribe(args, headers):
+        cursor = int(args["since"]) if "since" in args else None
+
+        def next_message(cursor):
+            if cursor is None:
+                return feed.version, f"event: snapshot\ndata: {feed.version}\n\n"
+            events, _ = feed.read_since(cursor)
+            if not events:
+                return cursor, None
+            versions = ",".join(str(version) for version, _ in events)
+            return events[-1][0], f"event: lots\ndata: {versions}\n\n"
+        return cursor, next_message
+    return subscribe
+
+
+class StreamClient:
+    """Raw socket client reading one SSE message at a time"""
+
+    def __init__(self, port, target="/api/stream", method="GET"):
+        self.sock = socket.create_connection(("127.0.0.1", port), timeout=5)
+        self.sock.sendall(f"{method} {target} HTTP/1.1\r\nHost: test\r\n\r\n".encode())
+        self.raw = b""
+        self.body = None  # decoded body once the response head is read
+
+    def read_head(self):
+        """Response status line and headers"""
+        head = self._read_until(b"\r\n\r\n")
+        if "Transfer-Encoding: chunked" in head:
+            self.body = b""
+        return head
+
+    def read_block(self):
+        """Next SSE message, with its trailing blank line removed"""
+        while b"\n\n" not in self.body:
+            size = int(self._read_until(b"\r\n"), 16)
+            self.body += self._read_exactly(size + 2)[:-2]
+        block, self.body = self.body.split(b"\n\n", 1)
+        return block.decode()
+
+    def _read_until(self, separator):
+        while separator not in self.raw:
+            self._receive()
+        data, self.raw = self.raw.split(separator, 1)
+        return data.decode()
+
+    def _read_exactly(self, size):
+        while len(self.raw) < size:
+            self._receive()
+        data, self.raw = self.raw[:size], self.raw[size:]
+        return data
+
+    def _receive(self):
+        data = self.sock.recv(65536)
+        if not data:
+            raise EOFError
+        self.raw += data
+
+    def close(self):
+        self.sock.close()
+
+
+class TestStreamHub(unittest.TestCase):
+    """Test cases for StreamHub"""
+
+    def setUp(self):
+        self.feed = ChangeFeed()
+        self.hub = StreamHub(self.feed, make_subscribe(self.feed), port=0, heartbeat=0.2).start()
+        self.addCleanup(self.hub.stop)
+
+    def connect(self, target="/api/stream", method="GET"):
+        client = StreamClient(self.hub.port, target, method)
+        self.addCleanup(client.close)
+        return client
+
+    def open_stream(self, target="/api/stream"):
+        """Connect and read past the response head and retry hint"""
+        client = self.connect(target)
+        self.assertIn("text/event-stream", client.read_head())
+        self.assertEqual(client.read_block(), "retry: 3000")
+        return client
+
+    def wait_for_subscribers(self, count):
+        deadline = time.time() + 5
+        while self.hub.subscribers != count and time.time() < deadline:
+            time.sleep(0.01)
+        self.assertEqual(self.hub.subscribers, count)
+
+    def test_publish_reaches_every_subscriber(self):
+        """Test that one publish is delivered to all connected clients"""
+        clients = [self.open_stream() for _ in range(20)]
+        for client in clients:
+            self.assertEqual(client.read_block(), "event: snapshot\ndata: 0")
+        self.feed.publish(1, {})
+        self.feed.publish(2, {})
+        for client in clients:
+            block = client.read_block()
+            if block == "event: lots\ndata: 1":  # woken between the two publishes
+                block = client.read_block()
+                self.assertEqual(block, "event: lots\ndata: 2")
+            else:
+                self.assertEqual(block, "event: lots\ndata: 1,2")
+
+    def test_subscribers_do_not_hold_threads(self):
+        """Test that open streams add no threads to the process"""
+        before = threading.active_count()
+        clients = [self.open_stream() for _ in range(50)]
+        self.wait_for_subscribers(50)
+        self.assertEqual(threading.active_count(), before)
+
+        self.feed.publish(1, {})
+        for client in clients:
+            self.assertEqual(client.read_block(), "event: snapshot\ndata: 0")
+            self.assertEqual(client.read_block(), "event: lots\ndata: 1")
+
+    def test_resume_and_heartbeat(self):
+        """Test that ?since resumes from a cursor and idle streams get keep-alives"""
+        self.feed.publish(1, {})
+        self.feed.publish(2, {})
+        client = self.open_stream("/api/stream?since=1")
+        self.assertEqual(client.read_block(), "event: lots\ndata: 2")
+        self.assertEqual(client.read_block(), ": keep-alive")
+
+    def test_disconnect_is_noticed(self):
+        """Test that a closed client stops counting as a subscriber"""
+        client = self.open_stream()
+        self.wait_for_subscribers(1)
+        client.close()
+        # The next heartbeat write fails and ends the coroutine
+        self.wait_for_subscribers(0)
+
+    def test_other_requests_are_answered(self):
+        """Test the responses to other paths, methods and a CORS preflight"""
+        self.assertIn("404 Not Found", self.connect("/api/lots").read_head())
+        self.assertIn("405 Method Not Allowed", self.connect(method="POST").read_head())
+        head = self.connect(method="OPTIONS").read_head()
+        self.assertIn("204 No Content", head)
+        self.assertIn("Access-Control-Allow-Headers: Last-Event-ID", head)
+
+    def test_port_in_use_raises(self):
+        """Test that start() reports a port it could not bind"""
+        with self.assertRaises(OSError):
+            StreamHub(self.feed, make_subscribe(self.feed), port=self.hub.port).start()
+
+
+if __name__ == '__main__':
+    unittest.main()